@@ -0,0 +1,433 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+POST_TYPES = ['reel', 'image', 'carousel', 'video']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+METRICS = ['likes', 'comments', 'shares', 'views']
+# Cube layers: post count, metric sums, and the sum of per-post engagement rates
+LAYERS = ['count'] + METRICS + ['engagement_rate']
+COUNT, RATE = 0, len(LAYERS) - 1
+# Columns the cube needs from the raw data
+CUBE_COLUMNS = ['post_type', 'timestamp', 'hour'] + METRICS
+# Charts served by AnalyticsEngine.chart_data
+CHART_TYPES = ['engagement_by_post_type', 'best_times', 'post_type_distribution', 'engagement_rate_comparison']
+
+
+class EngagementCube:
+    """Pre-aggregated engagement sums over post_type x date x hour.
+
+    Day of week is a function of the date, so it is not stored as its own axis.
+    Instead a weekday-strided prefix sum over the date axis turns any date range
+    into a (post_type, day_of_week, hour) block with one fancy-index lookup.
+    Sums are mergeable, so new batches are added without rescanning old data.
+    """
+
+    def __init__(self, post_types: List[str] = None):
+        self.post_types = list(post_types or POST_TYPES)
+        self.start_date = None  # numpy datetime64[D] of the first date slot
+        self.data = np.zeros((len(LAYERS), len(self.post_types), 0, 24), dtype=np.float64)
+        self.version = 0
+        self._prefix = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "EngagementCube":
+        cube = cls()
+        cube.add_frame(df)
+        return cube
+
+    @classmethod
+    def from_csv(cls, path: str, chunksize: int = 500_000) -> "EngagementCube":
+        # Deferred import: columnar_store imports this module's constants
+        from columnar_store import iter_engagement_frames
+        cube = cls()
+        for chunk in iter_engagement_frames(path, chunksize, CUBE_COLUMNS):
+            cube.add_frame(chunk)
+        return cube
+
+    @property
+    def n_days(self) -> int:
+        return self.data.shape[2]
+
+    @property
+    def total_posts(self) -> int:
+        return int(self.data[COUNT].sum())
+
+    def _post_type_index(self, post_types: pd.Series) -> np.ndarray:
+        unknown = set(post_types.unique()) - set(self.post_types)
+        if unknown:
+            # New post types get a new slice of zeros
+            self.post_types.extend(sorted(unknown))
+            pad = np.zeros((len(LAYERS), len(unknown), self.n_days, 24), dtype=np.float64)
+            self.data = np.concatenate([self.data, pad], axis=1)
+        return pd.Categorical(post_types, categories=self.post_types).codes.astype(np.int64)
+
+    def _ensure_dates(self, first, last):
+        """Grow the date axis so that [first, last] fits"""
+        if self.start_date is None:
+            self.start_date = first
+            self.data = np.zeros(self.data.shape[:2] + (int((last - first).astype(int)) + 1, 24))
+            return
+        before = max(0, int((self.start_date - first).astype(int)))
+        end = self.start_date + np.timedelta64(self.n_days - 1, 'D')
+        after = max(0, int((last - end).astype(int)))
+        if before or after:
+            self.data = np.pad(self.data, ((0, 0), (0, 0), (before, after), (0, 0)))
+            self.start_date = self.start_date - np.timedelta64(before, 'D')
+
+    def add_frame(self, df: pd.DataFrame):
+        """Add a batch of posts to the running sums"""
+        if df.empty:
+            return
+        dates = pd.to_datetime(df['timestamp'], format='%Y-%m-%d %H:%M:%S').values.astype('datetime64[D]')
+        self._ensure_dates(dates.min(), dates.max())
+
+        pt_idx = self._post_type_index(df['post_type'])
+        date_idx = (dates - self.start_date).astype(np.int64)
+        hour_idx = df['hour'].to_numpy(dtype=np.int64)
+        flat = (pt_idx * self.n_days + date_idx) * 24 + hour_idx
+        size = len(self.post_types) * self.n_days * 24
+
+        likes, comments, shares, views = (df[m].to_numpy(dtype=np.float64) for m in METRICS)
+        rate = (likes + comments + shares) / views
+        layers = [None, likes, comments, shares, views, rate]
+        for i, weights in enumerate(layers):
+            added = np.bincount(flat, weights=weights, minlength=size)
+            self.data[i] += added.reshape(len(self.post_types), self.n_days, 24)
+
+        self._prefix = None
+        self.version += 1
+
+    def copy(self) -> "EngagementCube":
+        """An independent cube with the same sums and version, to add a batch to off to the side"""
+        cube = EngagementCube(self.post_types)
+        cube.start_date = self.start_date
+        cube.data = self.data.copy()
+        cube.version = self.version
+        return cube
+
+    def _weekday_prefix(self) -> np.ndarray:
+        """Prefix sums over the date axis with stride 7, padded with 7 leading zero slots.
+
+        ``prefix[..., d + 7, :]`` is the sum of the dates d, d-7, d-14, ... so the
+        total over same-weekday dates in [first, last] is ``prefix[last + 7] - prefix[first]``.
+        """
+        if self._prefix is None:
+            n_weeks = -(-self.n_days // 7)
+            padded = np.pad(self.data, ((0, 0), (0, 0), (0, n_weeks * 7 - self.n_days), (0, 0)))
+            shape = padded.shape
+            weeks = padded.reshape(shape[0], shape[1], n_weeks, 7, 24).cumsum(axis=2)
+            prefix = weeks.reshape(shape)
+            self._prefix = np.concatenate([np.zeros(shape[:2] + (7, 24)), prefix], axis=2)
+        return self._prefix
+
+    @property
+    def end_date(self):
+        """numpy datetime64[D] of the last date slot, or None while the cube is empty"""
+        if self.start_date is None:
+            return None
+        return self.start_date + np.timedelta64(self.n_days - 1, 'D')
+
+    def date_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None):
+        """Inclusive date-slot bounds for the given ISO dates, clipped to the data"""
+        first, last = 0, self.n_days - 1
+        if start_date:
+            first = max(first, int((np.datetime64(start_date, 'D') - self.start_date).astype(int)))
+        if end_date:
+            last = min(last, int((np.datetime64(end_date, 'D') - self.start_date).astype(int)))
+        return first, last
+
+    def by_weekday(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """Sums for the date range as a (layer, post_type, day_of_week, hour) array, Monday first"""
+        out = np.zeros((len(LAYERS), len(self.post_types), 7, 24))
+        if self.start_date is None:
+            return out
+        first, last = self.date_range(start_date, end_date)
+        if first > last:
+            return out
+
+        prefix = self._weekday_prefix()
+        residues = np.arange(7)
+        firsts = first + (residues - first) % 7
+        lasts = last - (last - residues) % 7
+        valid = firsts <= lasts
+        sums = prefix[:, :, lasts[valid] + 7, :] - prefix[:, :, firsts[valid], :]
+
+        start_weekday = int((self.start_date.astype('datetime64[D]').astype(np.int64) + 3) % 7)  # 1970-01-01 was a Thursday
+        weekdays = (start_weekday + residues[valid]) % 7
+        out[:, :, weekdays, :] = sums
+        return out
+
+
+    def rag_stats(self) -> Dict[str, Any]:
+        """Stats in the stats.json format used by SocialMediaEngagementRAG.
+
+        Derived from the running sums, so they stay exact as batches are added.
+        """
+        by_type = self.data.sum(axis=(2, 3))
+        counts = by_type[COUNT]
+        present = [i for i, pt in enumerate(self.post_types) if counts[i] > 0]
+        sums = self.by_weekday()
+        stats = {
+            "total_posts": int(counts.sum()),
+            "post_type_distribution": {self.post_types[i]: int(counts[i]) for i in present},
+            "avg_engagement_by_type": {
+                metric: {self.post_types[i]: float(by_type[layer, i] / counts[i]) for i in present}
+                for layer, metric in enumerate(METRICS, start=1)
+            },
+            "best_time_by_post_type": {},
+            "best_day_by_post_type": {},
+            "engagement_rate_by_type": {},
+        }
+        for i in present:
+            block = sums[:, i]
+            hour_counts = block[COUNT].sum(axis=0)
+            hour_rate = np.where(hour_counts > 0, _ratio(block[RATE].sum(axis=0), hour_counts), -np.inf)
+            day_counts = block[COUNT].sum(axis=1)
+            day_rate = np.where(day_counts > 0, _ratio(block[RATE].sum(axis=1), day_counts), -np.inf)
+            pt = self.post_types[i]
+            stats["best_time_by_post_type"][pt] = int(hour_rate.argmax())
+            stats["best_day_by_post_type"][pt] = DAYS[int(day_rate.argmax())]
+            stats["engagement_rate_by_type"][pt] = float(by_type[RATE, i] / counts[i])
+        return stats
+
+
+def _ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=denominator > 0)
+
+
+class AnalyticsEngine:
+    """Answers the analytics endpoints from an EngagementCube.
+
+    Results are memoized per (query, cube version), so repeated dashboard
+    requests are dictionary lookups. The cube is never modified in place:
+    batches are added to a copy that then replaces ``cube`` in one assignment,
+    and each query reads ``cube`` once, so it sees one version throughout.
+    """
+
+    def __init__(self, cube: EngagementCube, memo_size: int = 256):
+        self.cube = cube
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, path: str) -> "AnalyticsEngine":
+        return cls(EngagementCube.from_csv(path))
+
+    @property
+    def version(self) -> int:
+        return self.cube.version
+
+    def _memoized(self, key, compute):
+        """compute(cube) once per key and cube version"""
+        cube = self.cube
+        key = key + (cube.version,)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        value = compute(cube)
+        with self._lock:
+            self._memo[key] = value
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _validate(post_type=None, start_date=None, end_date=None, metric=None):
+        for value in (start_date, end_date):
+            if value:
+                try:
+                    np.datetime64(value, 'D')
+                except ValueError:
+                    raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+        if metric and metric not in METRICS + ['engagement_rate']:
+            raise ValueError(f"Unknown metric '{metric}'")
+
+    def _post_type_summary(self, block: np.ndarray) -> Dict[str, Any]:
+        """Summary for one post type from its (layer, day, hour) block"""
+        count = block[COUNT].sum()
+        hour_rate = _ratio(block[RATE].sum(axis=0), block[COUNT].sum(axis=0))
+        day_rate = _ratio(block[RATE].sum(axis=1), block[COUNT].sum(axis=1))
+        return {
+            "engagement_rate": round(float(_ratio(block[RATE].sum(), count)) * 100, 2),
+            "avg_likes": round(float(_ratio(block[1].sum(), count)), 1),
+            "avg_comments": round(float(_ratio(block[2].sum(), count)), 1),
+            "avg_shares": round(float(_ratio(block[3].sum(), count)), 1),
+            "avg_views": round(float(_ratio(block[4].sum(), count)), 1),
+            # None rather than the argmax of all zeros when the range has no posts
+            "best_time": f"{int(hour_rate.argmax()):02d}:00" if count else None,
+            "best_day": DAYS[int(day_rate.argmax())] if count else None,
+            "total_posts": int(count),
+        }
+
+    def _metric_breakdown(self, cube: EngagementCube, sums: np.ndarray, metric: str) -> Dict[str, Any]:
+        layer = LAYERS.index(metric)
+        by_type = _ratio(sums[layer].sum(axis=(1, 2)), sums[COUNT].sum(axis=(1, 2)))
+        by_day = _ratio(sums[layer].sum(axis=(0, 2)), sums[COUNT].sum(axis=(0, 2)))
+        by_hour = _ratio(sums[layer].sum(axis=(0, 1)), sums[COUNT].sum(axis=(0, 1)))
+        return {
+            "metric": metric,
+            "by_post_type": {pt: float(v) for pt, v in zip(cube.post_types, by_type)},
+            "by_day": {day: float(v) for day, v in zip(DAYS, by_day)},
+            "by_hour": [float(v) for v in by_hour],
+        }
+
+    def analytics(self, post_type: Optional[str] = None, start_date: Optional[str] = None,
+                  end_date: Optional[str] = None, metric: Optional[str] = None) -> Dict[str, Any]:
+        """Data for /api/analytics: one post type's summary, or a comparison of all types"""
+        self._validate(post_type, start_date, end_date, metric)
+        return self._memoized(("analytics", post_type, start_date, end_date, metric),
+                              lambda cube: self._analytics(cube, post_type, start_date, end_date, metric))
+
+    def _analytics(self, cube, post_type, start_date, end_date, metric):
+        sums = cube.by_weekday(start_date, end_date)
+        summaries = {pt: self._post_type_summary(sums[:, i]) for i, pt in enumerate(cube.post_types)}
+
+        if post_type and post_type in summaries:
+            data = dict(summaries[post_type])
+        else:
+            data = {
+                "engagement_rate_by_type": {pt: s["engagement_rate"] for pt, s in summaries.items()},
+                "best_times": {pt: s["best_time"] for pt, s in summaries.items()},
+                "best_days": {pt: s["best_day"] for pt, s in summaries.items()},
+                "post_distribution": {pt: s["total_posts"] for pt, s in summaries.items()},
+            }
+        if metric:
+            data["metric_breakdown"] = self._metric_breakdown(cube, sums, metric)
+        return data
+
+    def best_times(self, start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+        """Best day and hour per post type, with the lift over that type's average"""
+        self._validate(None, start_date, end_date)
+        return self._memoized(("best_times", start_date, end_date),
+                              lambda cube: self._best_times(cube, start_date, end_date))
+
+    def _best_times(self, cube, start_date, end_date):
+        sums = cube.by_weekday(start_date, end_date)
+        result = {}
+        for i, pt in enumerate(cube.post_types):
+            block = sums[:, i]
+            if not block[COUNT].sum():
+                result[pt] = {"day": None, "time": None, "reason": "No posts in this date range"}
+                continue
+            average = _ratio(block[RATE].sum(), block[COUNT].sum())
+            hour_rate = _ratio(block[RATE].sum(axis=0), block[COUNT].sum(axis=0))
+            day_rate = _ratio(block[RATE].sum(axis=1), block[COUNT].sum(axis=1))
+            best_hour = int(hour_rate.argmax())
+            lift = (hour_rate[best_hour] / average - 1) * 100 if average > 0 else 0.0
+            result[pt] = {
+                "day": DAYS[int(day_rate.argmax())],
+                "time": f"{best_hour:02d}:00",
+                "reason": f"{lift:.0f}% higher engagement than average",
+            }
+        return result
+
+    def metrics_summary(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Totals and headline numbers across all post types"""
+        self._validate(None, start_date, end_date)
+        return self._memoized(("summary", start_date, end_date),
+                              lambda cube: self._metrics_summary(cube, start_date, end_date))
+
+    def _metrics_summary(self, cube, start_date, end_date):
+        sums = cube.by_weekday(start_date, end_date)
+        totals = sums.sum(axis=(1, 2, 3))
+        type_rate = _ratio(sums[RATE].sum(axis=(1, 2)), sums[COUNT].sum(axis=(1, 2)))
+        hour_rate = _ratio(sums[RATE].sum(axis=(0, 1)), sums[COUNT].sum(axis=(0, 1)))
+        day_rate = _ratio(sums[RATE].sum(axis=(0, 2)), sums[COUNT].sum(axis=(0, 2)))
+        has_posts = totals[COUNT] > 0
+        return {
+            "total_posts": int(totals[COUNT]),
+            "total_likes": int(totals[1]),
+            "total_comments": int(totals[2]),
+            "total_shares": int(totals[3]),
+            "total_views": int(totals[4]),
+            "avg_engagement_rate": round(float(_ratio(totals[RATE], totals[COUNT])) * 100, 2),
+            "best_post_type": cube.post_types[int(type_rate.argmax())] if has_posts else None,
+            "best_time_overall": f"{int(hour_rate.argmax()):02d}:00 {DAYS[int(day_rate.argmax())]}" if has_posts else None,
+        }
+
+    def chart_data(self, chart_type: str, post_type: Optional[str] = None, start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Plain-JSON description of a chart, drawn client-side or rasterized by chart_service.
+
+        ``post_type`` narrows the best_times heatmap to one type; the per-type comparisons ignore it.
+        """
+        if chart_type not in CHART_TYPES:
+            raise ValueError(f"Unknown chart type '{chart_type}', expected one of {', '.join(CHART_TYPES)}")
+        self._validate(post_type, start_date, end_date)
+        return self._memoized(("chart", chart_type, post_type, start_date, end_date),
+                              lambda cube: self._chart_data(cube, chart_type, post_type, start_date, end_date))
+
+    def _chart_data(self, cube, chart_type, post_type, start_date, end_date):
+        sums = cube.by_weekday(start_date, end_date)
+        post_types = list(cube.post_types)
+        counts = sums[COUNT].sum(axis=(1, 2))
+        chart = {"chart_type": chart_type,
+                 "filters": {"post_type": post_type, "start_date": start_date, "end_date": end_date}}
+
+        if chart_type == "engagement_by_post_type":
+            chart.update(kind="bar", title="Engagement Metrics by Post Type", labels=post_types, series=[
+                {"name": metric.capitalize(),
+                 "values": [round(float(v), 1) for v in _ratio(sums[layer].sum(axis=(1, 2)), counts)]}
+                for layer, metric in enumerate(METRICS, start=1)
+            ])
+        elif chart_type == "engagement_rate_comparison":
+            rates = _ratio(sums[RATE].sum(axis=(1, 2)), counts) * 100
+            chart.update(kind="bar", title="Engagement Rate by Post Type", labels=post_types,
+                         y_label="Engagement rate (%)",
+                         series=[{"name": "Engagement rate", "values": [round(float(v), 2) for v in rates]}])
+        elif chart_type == "post_type_distribution":
+            chart.update(kind="pie", title="Distribution of Post Types", labels=post_types,
+                         series=[{"name": "Posts", "values": [int(v) for v in counts]}])
+        else:
+            block = sums
+            if post_type in post_types:
+                i = post_types.index(post_type)
+                block = sums[:, i:i + 1]
+            rate = _ratio(block[RATE].sum(axis=0), block[COUNT].sum(axis=0)) * 100
+            title = "Engagement Rate by Day and Hour" + (f" ({post_type})" if post_type in post_types else "")
+            chart.update(kind="heatmap", title=title, x_label="Hour of Day", y_label="Day of Week",
+                         rows=DAYS, columns=[f"{h:02d}:00" for h in range(24)],
+                         values=[[round(float(v), 2) for v in row] for row in rate])
+        return chart
+
+    def last_days(self, days: int, end_date: Optional[str] = None):
+        """ISO (start, end) dates of the ``days``-day window ending at ``end_date`` or the newest data"""
+        if days < 1:
+            raise ValueError(f"Invalid days '{days}', expected a positive number")
+        self._validate(None, None, end_date)
+        end = np.datetime64(end_date, 'D') if end_date else self.cube.end_date
+        if end is None:
+            return None, end_date
+        return str(end - np.timedelta64(days - 1, 'D')), str(end)
+
+    def dashboard(self, post_type: Optional[str] = None, start_date: Optional[str] = None,
+                  end_date: Optional[str] = None, days: Optional[int] = None) -> Dict[str, Any]:
+        """Everything the dashboard shows for one set of filters.
+
+        Built once per (filters, cube version) and shared by every request, so callers
+        must not modify it. ``days`` selects the last N days of data and overrides ``start_date``.
+        """
+        if days is not None:
+            start_date, end_date = self.last_days(days, end_date)
+        self._validate(post_type, start_date, end_date)
+        return self._memoized(("dashboard", post_type, start_date, end_date),
+                              lambda cube: self._dashboard(cube, post_type, start_date, end_date))
+
+    def _dashboard(self, cube, post_type, start_date, end_date):
+        # Built from the one cube rather than through the memoized methods, which could see a newer one
+        return {
+            "version": cube.version,
+            "filters": {"post_type": post_type, "start_date": start_date, "end_date": end_date},
+            "analytics": self._analytics(cube, post_type, start_date, end_date, None),
+            "best_times": self._best_times(cube, start_date, end_date),
+            "metrics_summary": self._metrics_summary(cube, start_date, end_date),
+            "charts": {chart_type: self._chart_data(cube, chart_type, post_type, start_date, end_date)
+                       for chart_type in CHART_TYPES},
+        }
@@ -1,19 +1,103 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import os
+import json
+import time
+import asyncio
+import threading
+from urllib.parse import urlencode
+from contextlib import asynccontextmanager
 from social_media_rag import SocialMediaEngagementRAG  # Import our RAG class
+from query_executor import BoundedQueryExecutor, QueueFullError
+from analytics_engine import AnalyticsEngine
+from chart_service import ChartService
+from http_cache import ResponseCache, negotiate, respond, json_response
+from instrumentation import REGISTRY, CONTENT_TYPE, STAGE_SECONDS, MetricsMiddleware
+import profiling
+from profiling import ProfilingMiddleware
+from ingestion import (IngestionError, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES, parse_batch, validate_batch,
+                       ingest_batch)
+from history_store import create_history_store
+from conversation_summary import ConversationSummarizer
+from artifacts import resolve_path
 from fastapi import Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+# Warmup mode: "background" loads models after startup and reports progress on
+# /api/ready, "blocking" finishes loading before the server accepts connections,
+# "off" keeps loading lazy on the first request
+WARMUP_MODE = os.environ.get("RAG_WARMUP", "background")
+# A failed warmup is retried this many times, waiting twice as long after each failure
+WARMUP_RETRIES = int(os.environ.get("RAG_WARMUP_RETRIES", 5))
+WARMUP_BACKOFF_SECONDS = float(os.environ.get("RAG_WARMUP_BACKOFF_SECONDS", 2.0))
+WARMUP_BACKOFF_MAX_SECONDS = 60.0
+startup_state = {"ready": False, "error": None, "seconds": None, "attempts": 0, "components": {}}
+warmup_task = None
+
+async def warm_up():
+    """Build the analytics cube and load the RAG system so the first request is fast"""
+    start = time.perf_counter()
+    delay = WARMUP_BACKOFF_SECONDS
+    for attempt in range(WARMUP_RETRIES + 1):
+        startup_state["attempts"] += 1
+        try:
+            loaded = time.perf_counter()
+            await query_executor.run_blocking(get_analytics_engine)
+            startup_state["components"]["analytics_engine"] = time.perf_counter() - loaded
+            
+            rag = await query_executor.run_blocking(get_rag_system)
+            startup_state["components"].update(rag.load_timings)
+            startup_state["ready"] = True
+            startup_state["error"] = None
+            break
+        except Exception as e:
+            print(f"Error during warmup (attempt {startup_state['attempts']}): {e}")
+            startup_state["error"] = str(e)
+            if attempt < WARMUP_RETRIES:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, WARMUP_BACKOFF_MAX_SECONDS)
+    startup_state["seconds"] = time.perf_counter() - start
+
+def start_warm_up():
+    """Run warm_up in the background unless a run is already in progress"""
+    global warmup_task
+    if warmup_task is None or warmup_task.done():
+        warmup_task = asyncio.create_task(warm_up())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_MODE == "blocking":
+        await warm_up()
+    elif WARMUP_MODE == "background":
+        start_warm_up()
+    else:
+        startup_state["ready"] = True
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    query_executor.shutdown()
+    chart_service.shutdown()
+    history_store.close()
+    if rag_system is not None:
+        rag_system.close()
 
 # Initialize the FastAPI app
 app = FastAPI(
     title="Social Media Analytics RAG API",
     description="API for social media engagement analytics using RAG",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Request latency by route, for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in CPU profiles of sampled requests or ones sent with the RAG_PROFILE_TOKEN header
+app.add_middleware(ProfilingMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,15 +105,60 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
-    expose_headers=["Content-Length"],
+    expose_headers=["Content-Length", "ETag", "Content-Encoding"],
     max_age=3600,
 )
 
 # Initialize the RAG system - lazy loading
 rag_system = None
+rag_lock = threading.Lock()
+
+# Pre-aggregated analytics over the engagement CSV - lazy loading
+DATA_FILE = "social_media_engagement_data.csv"
+analytics_engine = None
+analytics_lock = threading.Lock()
+
+# Chart data and PNGs, cached per data version and rendered in worker processes
+chart_service = ChartService()
+# Seconds browsers may reuse a chart; the ETag covers revalidation after that
+CHART_MAX_AGE = int(os.environ.get("RAG_CHART_MAX_AGE", 300))
 
-# Simple in-memory chat history store
-chat_histories = {}
+# Serialized analytics responses per data version, served with ETags and compression
+api_cache = ResponseCache()
+# Seconds browsers may reuse analytics responses before revalidating
+API_CACHE_CONTROL = f"private, max-age={int(os.environ.get('RAG_HTTP_MAX_AGE', 60))}"
+
+# Bounded pool so LLM calls and model loading never block the event loop
+query_executor = BoundedQueryExecutor()
+
+# Per-user chat history: in-memory LRU or SQLite, see RAG_HISTORY_BACKEND
+history_store = create_history_store()
+
+# Rolling summary of older turns so prompt size stays flat in long chats
+summarizer = ConversationSummarizer(history_store, executor=query_executor) if os.environ.get("RAG_SUMMARY_ENABLED", "1") == "1" else None
+
+def cache_counts(field: str) -> Dict[tuple, int]:
+    """Hit or miss counts of each cache, read when /metrics is scraped"""
+    counts = {("http",): getattr(api_cache, field), ("charts",): getattr(chart_service, field)}
+    if rag_system is not None and rag_system.response_cache is not None:
+        counts[("semantic",)] = getattr(rag_system.response_cache, field)
+    if rag_system is not None and rag_system.intent_router is not None:
+        router = rag_system.intent_router
+        counts[("router",)] = sum(router.hits.values()) if field == "hits" else router.misses
+    return counts
+
+REGISTRY.collected("rag_queue_depth", "Chat queries waiting for a concurrency slot", lambda: query_executor.queued)
+REGISTRY.collected("rag_queries_active", "Chat queries holding a concurrency slot", lambda: query_executor.active)
+REGISTRY.collected(
+    "rag_queries_total", "Chat queries by outcome",
+    lambda: {("completed",): query_executor.completed, ("failed",): query_executor.failed,
+             ("rejected",): query_executor.rejected},
+    ("outcome",), kind="counter",
+)
+REGISTRY.collected("rag_cache_hits_total", "Cache hits by cache", lambda: cache_counts("hits"), ("cache",), "counter")
+REGISTRY.collected("rag_cache_misses_total", "Cache misses by cache", lambda: cache_counts("misses"), ("cache",),
+                   "counter")
+REGISTRY.collected("rag_ready", "1 once warmup has loaded the models", lambda: int(startup_state["ready"]))
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -38,6 +167,10 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 class ChatMessage(BaseModel):
     message: str
     user_id: str
+    # Optional retrieval controls: number of documents and metadata filters
+    # (document_type, post_type, day, hour)
+    top_k: Optional[int] = None
+    filters: Optional[Dict[str, Any]] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -61,14 +194,51 @@ async def get_current_user():
 def get_rag_system():
     global rag_system
     if rag_system is None:
-        try:
-            rag_system = SocialMediaEngagementRAG()
-            rag_system.load()
-        except Exception as e:
-            print(f"Error initializing RAG system: {e}")
-            raise
+        with rag_lock:
+            if rag_system is None:
+                try:
+                    rag = SocialMediaEngagementRAG()
+                    rag.load()
+                    rag_system = rag
+                except Exception as e:
+                    print(f"Error initializing RAG system: {e}")
+                    raise
     return rag_system
 
+# Helper function to build the analytics cube on demand
+def get_analytics_engine():
+    global analytics_engine
+    if analytics_engine is None:
+        with analytics_lock:
+            if analytics_engine is None:
+                try:
+                    analytics_engine = AnalyticsEngine.from_csv(resolve_path(DATA_FILE))
+                except Exception as e:
+                    print(f"Error initializing analytics engine: {e}")
+                    raise
+    return analytics_engine
+
+async def analytics_response(request: Request, key: tuple, build) -> Response:
+    """Serve build(engine) serialized once per data version, mapping bad filters to 400.
+
+    Hits are answered on the event loop; building, serializing and compressing a
+    miss run on the worker pool.
+    """
+    engine = analytics_engine or await query_executor.run_blocking(get_analytics_engine)
+    key = key + (engine.version,)
+    coding = negotiate(request)
+    cached = api_cache.get(key)
+    if cached is None or not cached.is_encoded(coding):
+        def build_body():
+            body = cached or api_cache.get_or_build(key, lambda: build(engine))
+            body.encoded(coding)
+            return body
+        try:
+            cached = await query_executor.run_blocking(build_body)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return respond(request, cached, API_CACHE_CONTROL)
+
 # Routes
 @app.get("/")
 def root():
@@ -88,34 +258,59 @@ async def options_chat(request: Request):
     }
     return Response(status_code=200, headers=headers)
 
+def start_chat_turn(user_id: str) -> Tuple[List[tuple], str]:
+    """The prior turns formatted for the RAG system, along with the summary of turns older
+    than those. Nothing is recorded until finish_chat_turn, so a failed or abandoned turn
+    leaves no unanswered message in the history."""
+    # Only the most recent turns that fit the token budget go into the prompt
+    with STAGE_SECONDS.time(stage="history"):
+        if summarizer is not None:
+            summary, prior = summarizer.context(user_id)
+        else:
+            summary, prior = "", history_store.window(user_id)
+    
+    # Format chat history for our RAG system
+    formatted_history = [(msg["content"], None) if msg["role"] == "user" else (None, msg["content"]) 
+                         for msg in prior]
+    return formatted_history, summary
+
+def finish_chat_turn(user_id: str, text: str, response: str, rag: SocialMediaEngagementRAG):
+    """Record the completed turn and fold turns that left the verbatim window into the summary"""
+    with STAGE_SECONDS.time(stage="history"):
+        history_store.append(user_id, "user", text)
+        history_store.append(user_id, "assistant", response)
+    if summarizer is not None:
+        summarizer.schedule(user_id, rag.llm)
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one server-sent event; data is JSON so tokens can contain newlines"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(message: ChatMessage, user_id: str = Depends(get_current_user)):
     """Process a chat message and return a response from the RAG system"""
     try:
-        # Get RAG system
-        rag = get_rag_system()
+        # Get RAG system (first call loads models, so run it on the worker pool)
+        with STAGE_SECONDS.time(stage="get_rag_system"):
+            rag = await query_executor.run_blocking(get_rag_system)
         
-        # Get existing chat history or create new one
-        if user_id not in chat_histories:
-            chat_histories[user_id] = []
-        
-        # Add message to history and limit size
-        chat_histories[user_id].append({"role": "user", "content": message.message})
-        # Keep only last 20 messages for context window
-        if len(chat_histories[user_id]) > 20:
-            chat_histories[user_id] = chat_histories[user_id][-20:]
-        
-        # Format chat history for our RAG system
-        formatted_history = [(msg["content"], None) if msg["role"] == "user" else (None, msg["content"]) 
-                             for msg in chat_histories[user_id][:-1]]
+        formatted_history, summary = start_chat_turn(user_id)
         
         # Get response from RAG system
-        response = rag.query(message.message, formatted_history)
+        response = await query_executor.run(
+            rag.aquery, message.message, formatted_history, message.top_k, message.filters, summary
+        )
         
         # Add response to history
-        chat_histories[user_id].append({"role": "assistant", "content": response})
+        finish_chat_turn(user_id, message.message, response, rag)
         
         return ChatResponse(response=response)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The assistant is busy, please try again shortly"
+        )
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
         raise HTTPException(
@@ -123,96 +318,93 @@ async def chat(message: ChatMessage, user_id: str = Depends(get_current_user)):
             detail="An error occurred while processing your request"
         )
 
+@app.options("/api/chat/stream", include_in_schema=False)
+async def options_chat_stream(request: Request):
+    return await options_chat(request)
+
+@app.post("/api/chat/stream")
+async def chat_stream(message: ChatMessage, user_id: str = Depends(get_current_user)):
+    """Stream the assistant's answer token by token as server-sent events.
+
+    Emits ``data: {"token": ...}`` events, then ``event: done`` with the full text,
+    or ``event: error``. If the client disconnects the response task is cancelled,
+    which stops the LLM stream and leaves the whole turn out of the chat history.
+    """
+    try:
+        with STAGE_SECONDS.time(stage="get_rag_system"):
+            rag = await query_executor.run_blocking(get_rag_system)
+    except Exception as e:
+        print(f"Error in chat stream endpoint: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while processing your request"
+        )
+    formatted_history, summary = start_chat_turn(user_id)
+
+    async def event_stream():
+        parts = []
+        try:
+            async with query_executor.slot():
+                async for token in rag.astream(message.message, formatted_history, message.top_k,
+                                                   message.filters, summary):
+                    parts.append(token)
+                    yield sse_event({"token": token})
+        except QueueFullError:
+            yield sse_event({"detail": "The assistant is busy, please try again shortly"}, "error")
+            return
+        except asyncio.CancelledError:
+            print(f"Chat stream cancelled for {user_id}")
+            raise
+        except Exception as e:
+            print(f"Error in chat stream endpoint: {e}")
+            yield sse_event({"detail": "An error occurred while processing your request"}, "error")
+            return
+
+        response = "".join(parts)
+        finish_chat_turn(user_id, message.message, response, rag)
+        yield sse_event({"response": response}, "done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/chat/history")
-async def get_chat_history(user_id: str = Depends(get_current_user)):
+async def get_chat_history(request: Request, user_id: str = Depends(get_current_user)):
     """Get the chat history for a user"""
-    if user_id not in chat_histories:
-        chat_histories[user_id] = []
-    
-    return {"history": chat_histories[user_id]}
-
-# Mock analytics data
-MOCK_ANALYTICS = {
-    "reel": {
-        "engagement_rate": 4.2,
-        "avg_likes": 420,
-        "avg_comments": 32,
-        "avg_shares": 57,
-        "best_time": "19:00",
-        "best_day": "Sunday",
-        "total_posts": 120
-    },
-    "image": {
-        "engagement_rate": 1.9,
-        "avg_likes": 210,
-        "avg_comments": 18,
-        "avg_shares": 12,
-        "best_time": "12:00",
-        "best_day": "Wednesday",
-        "total_posts": 350
-    },
-    "carousel": {
-        "engagement_rate": 3.1,
-        "avg_likes": 315,
-        "avg_comments": 28,
-        "avg_shares": 25,
-        "best_time": "20:00",
-        "best_day": "Saturday",
-        "total_posts": 210
-    },
-    "video": {
-        "engagement_rate": 2.8,
-        "avg_likes": 280,
-        "avg_comments": 24,
-        "avg_shares": 35,
-        "best_time": "21:00",
-        "best_day": "Friday",
-        "total_posts": 90
-    }
-}
+    return json_response(request, {"history": history_store.history(user_id)})
 
 @app.post("/api/analytics", response_model=AnalyticsResponse)
-async def get_analytics(request: AnalyticsRequest, user_id: str = Depends(get_current_user)):
+async def get_analytics(params: AnalyticsRequest, request: Request, user_id: str = Depends(get_current_user)):
     """Get analytics data based on the requested parameters"""
-    if request.post_type and request.post_type in MOCK_ANALYTICS:
-        data = MOCK_ANALYTICS[request.post_type]
-    else:
-        # Summary across all post types
-        data = {
-            "engagement_rate_by_type": {
-                "reel": 4.2,
-                "image": 1.9,
-                "carousel": 3.1,
-                "video": 2.8
-            },
-            "best_times": {
-                "reel": "19:00",
-                "image": "12:00",
-                "carousel": "20:00",
-                "video": "21:00"
-            },
-            "best_days": {
-                "reel": "Sunday",
-                "image": "Wednesday",
-                "carousel": "Saturday",
-                "video": "Friday"
-            },
-            "post_distribution": {
-                "reel": 120,
-                "image": 350,
-                "carousel": 210,
-                "video": 90
-            }
-        }
-    
-    # Generate a chart
-    chart_type = "engagement_by_post_type"
-    if request.post_type:
-        chart_type = f"performance_{request.post_type}"
-    
-    chart_url = f"/mock-charts/{chart_type}.png"
+    # One post type's day/hour heatmap, or the comparison across all post types
+    chart_type = "best_times" if params.post_type else "engagement_by_post_type"
+    filters = {"post_type": params.post_type, "start_date": params.start_date, "end_date": params.end_date}
+    # The JSON data mode, which works without matplotlib; clients add format=png for an image
+    query = urlencode({k: v for k, v in filters.items() if v})
+    chart_url = f"/api/charts/{chart_type}" + (f"?{query}" if query else "")
     
-    return AnalyticsResponse(data=data, chart_url=chart_url)
+    # One post type's summary, or a comparison across all post types
+    args = (params.post_type, params.start_date, params.end_date, params.metric)
+    return await analytics_response(request, ("analytics",) + args, lambda engine: AnalyticsResponse(
+        data=engine.analytics(*args), chart_url=chart_url
+    ).model_dump())
+
+@app.get("/api/charts/{chart_type}")
+async def get_chart(chart_type: str, request: Request, format: str = "json", post_type: Optional[str] = None,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    user_id: str = Depends(get_current_user)):
+    """Chart data as JSON for client-side drawing, or a rendered PNG with format=png"""
+    engine = analytics_engine or await query_executor.run_blocking(get_analytics_engine)
+    try:
+        chart = await chart_service.get(engine, chart_type, format, post_type, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    return respond(request, chart, f"private, max-age={CHART_MAX_AGE}")
 
 # Recommendation data
 RECOMMENDATIONS = {
@@ -255,59 +447,184 @@ RECOMMENDATIONS = {
 
 @app.get("/api/recommendations")
 @app.get("/recommendations")
-async def get_recommendations(post_type: Optional[str] = None, user_id: str = Depends(get_current_user)):
+async def get_recommendations(request: Request, post_type: Optional[str] = None,
+                              user_id: str = Depends(get_current_user)):
     """Get AI-powered recommendations for improving engagement"""
-    if post_type and post_type in RECOMMENDATIONS:
-        return {"recommendations": RECOMMENDATIONS[post_type]}
-    else:
-        return {"recommendations": RECOMMENDATIONS["general"]}
-
-# Best times data
-BEST_TIMES = {
-    "reel": {"day": "Sunday", "time": "19:00", "reason": "31% higher engagement than average"},
-    "image": {"day": "Wednesday", "time": "12:00", "reason": "22% higher engagement than average"},
-    "carousel": {"day": "Saturday", "time": "20:00", "reason": "27% higher engagement than average"},
-    "video": {"day": "Friday", "time": "21:00", "reason": "25% higher engagement than average"}
-}
+    if post_type not in RECOMMENDATIONS:
+        post_type = "general"
+    # Static, so cached without a data version
+    cached = api_cache.get_or_build(("recommendations", post_type),
+                                    lambda: {"recommendations": RECOMMENDATIONS[post_type]})
+    return respond(request, cached, API_CACHE_CONTROL)
 
 @app.get("/api/best-times")
 @app.get("/best-times")
-async def get_best_times(post_type: Optional[str] = None, user_id: str = Depends(get_current_user)):
+async def get_best_times(request: Request, post_type: Optional[str] = None, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None, user_id: str = Depends(get_current_user)):
     """Get recommended best times to post based on historical engagement"""
-    if post_type and post_type in BEST_TIMES:
-        return {"best_time": BEST_TIMES[post_type]}
-    else:
-        return {"best_times": BEST_TIMES}
-
-# Metrics summary data
-METRICS_SUMMARY = {
-    "total_posts": 770,
-    "total_likes": 247500,
-    "total_comments": 21840,
-    "total_shares": 28950,
-    "total_views": 9250000,
-    "avg_engagement_rate": 3.2,
-    "best_post_type": "reel",
-    "best_time_overall": "19:00 Sunday"
-}
+    def build(engine):
+        best_times = engine.best_times(start_date, end_date)
+        if post_type and post_type in best_times:
+            return {"best_time": best_times[post_type]}
+        return {"best_times": best_times}
+    return await analytics_response(request, ("best_times", post_type, start_date, end_date), build)
 
 @app.get("/api/metrics/summary")
 @app.get("/metrics/summary")
-async def get_metrics_summary(user_id: str = Depends(get_current_user)):
+async def get_metrics_summary(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                              user_id: str = Depends(get_current_user)):
     """Get a summary of key metrics across all post types"""
-    return METRICS_SUMMARY
+    return await analytics_response(request, ("summary", start_date, end_date),
+                                    lambda engine: engine.metrics_summary(start_date, end_date))
+
+# Sections of /api/dashboard, all returned unless ?fields= picks some
+DASHBOARD_FIELDS = ("analytics", "best_times", "recommendations", "metrics_summary", "charts")
+
+@app.get("/api/dashboard")
+@app.get("/dashboard")
+async def get_dashboard(request: Request, fields: Optional[str] = None, post_type: Optional[str] = None,
+                        start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        days: Optional[int] = None, user_id: str = Depends(get_current_user)):
+    """Analytics, best times, recommendations, metrics summary and chart data in one response"""
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(DASHBOARD_FIELDS)
+    unknown = sorted(set(selected) - set(DASHBOARD_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields {', '.join(unknown)}, expected any of {', '.join(DASHBOARD_FIELDS)}"
+        )
+
+    def build(engine):
+        snapshot = engine.dashboard(post_type, start_date, end_date, days)
+        body = {"version": snapshot["version"], "filters": snapshot["filters"]}
+        for field in selected:
+            if field == "recommendations":
+                body[field] = RECOMMENDATIONS.get(post_type, RECOMMENDATIONS["general"])
+            else:
+                body[field] = snapshot[field]
+        return body
+    key = ("dashboard", tuple(selected), post_type, start_date, end_date, days)
+    return await analytics_response(request, key, build)
 
 @app.post("/api/upload")
 @app.post("/upload")
-async def upload_data(user_id: str = Depends(get_current_user)):
-    """Endpoint for uploading new social media data (mock)"""
-    return {"status": "success", "message": "Data uploaded and processed successfully"}
+async def upload_data(file: UploadFile = File(...), user_id: str = Depends(get_current_user)):
+    """Upload a CSV or JSONL batch of new posts and fold it into the analytics and index"""
+    chunks, size = [], 0
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail=f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit")
+        chunks.append(chunk)
+    raw = b"".join(chunks)
+    try:
+        batch = validate_batch(parse_batch(file.filename, raw))
+    except IngestionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.errors)
+
+    try:
+        rag = await query_executor.run_blocking(get_rag_system)
+        engine = await query_executor.run_blocking(get_analytics_engine)
+        result = await query_executor.run_blocking(ingest_batch, batch, rag, engine, rag.data_path)
+    except Exception as e:
+        print(f"Error ingesting upload: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while processing the upload"
+        )
+    return {"status": "success", "message": "Data uploaded and processed successfully", **result}
+
+@app.get("/api/metrics/queue")
+async def get_queue_metrics():
+    """Concurrency and queue-depth metrics for the chat worker pool"""
+    return query_executor.metrics()
+
+@app.get("/api/metrics/history")
+async def get_history_metrics():
+    """Users and messages held by the chat history store, and summary refreshes"""
+    metrics = history_store.metrics()
+    if summarizer is not None:
+        metrics["summary"] = summarizer.metrics()
+    return metrics
+
+@app.get("/api/metrics/router")
+async def get_router_metrics():
+    """How many chat questions were answered from templates instead of the LLM"""
+    if rag_system is None or rag_system.intent_router is None:
+        return {"enabled": False}
+    return {"enabled": True, **rag_system.intent_router.metrics()}
+
+@app.get("/api/metrics/cache")
+async def get_cache_metrics():
+    """Hit/miss counts for the semantic response cache"""
+    if rag_system is None or rag_system.response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **rag_system.response_cache.metrics()}
+
+@app.get("/api/metrics/charts")
+async def get_chart_metrics():
+    """Chart cache size, hit/miss counts and PNG renders"""
+    return chart_service.metrics()
+
+@app.get("/api/metrics/http")
+async def get_http_cache_metrics():
+    """Entries, bytes and hit/miss counts of the serialized response cache"""
+    return api_cache.metrics()
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Stage timings, token counts, cache hits and queue waits in Prometheus text format"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def require_profile_admin(request: Request):
+    if not profiling.admin_allowed(request.headers):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profile token required")
+
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request):
+    """Stored profiles, newest first, with the profiling settings"""
+    require_profile_admin(request)
+    return {
+        "profiles": profiling.store.list(),
+        "directory": profiling.store.directory,
+        "keep": profiling.store.keep,
+        "sample_rate": profiling.SAMPLE_RATE,
+        "header": profiling.PROFILE_HEADER,
+        "profile_load": profiling.PROFILE_LOAD,
+    }
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    """Download one profile: speedscope JSON, or a pstats file from the cProfile fallback"""
+    require_profile_admin(request)
+    path = profiling.store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    media_type = "application/json" if path.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=profile_id)
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness probe: 503 until warmup has loaded the models, with per-component load seconds.
+
+    Probing after warmup gave up on its retries starts another round.
+    """
+    if not startup_state["ready"] and WARMUP_MODE != "off":
+        start_warm_up()
+    body = {"warmup": WARMUP_MODE, **startup_state}
+    if rag_system is not None:
+        body["retrieval"] = rag_system.retrieval
+        body["llm_provider"] = rag_system.llm_provider
+        body["components"] = {**startup_state["components"], **rag_system.load_timings}
+    status_code = status.HTTP_200_OK if startup_state["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=body)
+
 # Run with: uvicorn app:app --reload
 if __name__ == "__main__":
     import uvicorn
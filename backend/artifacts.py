@@ -0,0 +1,175 @@
+import os
+import json
+import glob
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locks, atomic renames still apply
+    fcntl = None
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bump when the stats or the indexed documents change shape, so old artifacts stop matching
+STATS_SCHEMA_VERSION = 1
+DOCUMENT_SCHEMA_VERSION = 1
+
+HASH_BLOCK = 1 << 20
+# Bytes at each end of an already-hashed prefix that are re-read to check it is unchanged
+FINGERPRINT_BYTES = 64 << 10
+
+
+def data_dir() -> str:
+    """Directory relative paths are resolved against, independent of the working directory"""
+    return os.environ.get("RAG_DATA_DIR", BACKEND_DIR)
+
+
+def resolve_path(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(data_dir(), path)
+
+
+def _prefix_fingerprint(f, length: int) -> str:
+    """Hash of the first and last FINGERPRINT_BYTES of the file's first ``length`` bytes"""
+    digest = hashlib.sha256()
+    f.seek(0)
+    digest.update(f.read(min(length, FINGERPRINT_BYTES)))
+    start = max(0, length - FINGERPRINT_BYTES)
+    f.seek(start)
+    digest.update(f.read(length - start))
+    return digest.hexdigest()
+
+
+def atomic_write_text(path: str, text: str):
+    """Write through a temporary file in the same directory and rename it into place"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ArtifactManager:
+    """Build artifacts keyed by what they were built from.
+
+    ``stats.json`` is keyed by a hash of the data file, the FAISS index (with its
+    pickled docstore) additionally by the embedding model, the document schema and
+    the index type with its build parameters.
+    A changed input therefore selects a different path instead of loading a stale
+    artifact, and only the artifact whose key changed is rebuilt. Writes go to a
+    temporary path that is renamed into place, and rebuilds take a file lock so
+    concurrent workers build each artifact once.
+    """
+
+    def __init__(self, root: str = None, keep: int = None):
+        self.root = root or resolve_path(os.environ.get("RAG_ARTIFACT_DIR", "artifacts"))
+        # Artifacts of each kind kept on disk, newest first; older keys are pruned
+        self.keep = keep or int(os.environ.get("RAG_ARTIFACT_KEEP", 3))
+        os.makedirs(self.root, exist_ok=True)
+        self._hashes_path = os.path.join(self.root, "data_hashes.json")
+        # path -> (sha256 object, bytes hashed, inode, prefix fingerprint), to extend after appends
+        self._hashers = {}
+        self._lock = threading.Lock()
+
+    def data_hash(self, path: str) -> str:
+        """SHA-256 of a data file, cached by size and mtime so unchanged files aren't re-read"""
+        path = os.path.abspath(path)
+        info = os.stat(path)
+        with self._lock:
+            known = self._known_hashes().get(path)
+            if known and known["size"] == info.st_size and known["mtime_ns"] == info.st_mtime_ns:
+                return known["sha256"]
+
+            # Ingestion only appends, so a file that grew is hashed from where we stopped,
+            # unless it is a different file or its hashed prefix no longer reads the same
+            hasher, hashed, inode, fingerprint = self._hashers.get(path, (None, 0, None, None))
+            with open(path, "rb") as f:
+                if (hasher is None or info.st_size < hashed or info.st_ino != inode
+                        or _prefix_fingerprint(f, hashed) != fingerprint):
+                    hasher, hashed = hashlib.sha256(), 0
+                f.seek(hashed)
+                for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                    hasher.update(block)
+                    hashed += len(block)
+                fingerprint = _prefix_fingerprint(f, hashed)
+            self._hashers[path] = (hasher, hashed, info.st_ino, fingerprint)
+            digest = hasher.hexdigest()
+
+            hashes = self._known_hashes()
+            hashes[path] = {"size": info.st_size, "mtime_ns": info.st_mtime_ns, "sha256": digest}
+            atomic_write_text(self._hashes_path, json.dumps(hashes, indent=2))
+            return digest
+
+    def _known_hashes(self) -> dict:
+        try:
+            with open(self._hashes_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:16]
+
+    def stats_path(self, data_hash: str) -> str:
+        return os.path.join(self.root, f"stats-{self.key(data_hash, STATS_SCHEMA_VERSION)}.json")
+
+    def index_path(self, data_hash: str, embedding_model: str, sample_every: int,
+                   index_build: Dict[str, Any] = None) -> str:
+        key = self.key(data_hash, embedding_model, DOCUMENT_SCHEMA_VERSION, sample_every, index_build)
+        return os.path.join(self.root, f"faiss-{key}")
+
+    def latest(self, kind: str) -> Optional[str]:
+        """Most recently written artifact of a kind ("stats" or "faiss"), whatever its key"""
+        candidates = [p for p in glob.glob(os.path.join(self.root, f"{kind}-*")) if ".tmp-" not in p]
+        return max(candidates, key=os.path.getmtime) if candidates else None
+
+    def write_json(self, path: str, value: Any):
+        atomic_write_text(path, json.dumps(value))
+        self.prune("stats", path)
+
+    def write_dir(self, path: str, write: Callable[[str], None]):
+        """Let ``write`` fill a temporary directory, then rename it to ``path``"""
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=f"{os.path.basename(path)}.tmp-")
+        try:
+            write(tmp)
+            os.rename(tmp, path)
+        except OSError:
+            # The key is content-addressed: if another worker got there first its copy is as good
+            if not os.path.isdir(path):
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.prune("faiss", path)
+
+    def prune(self, kind: str, current: str):
+        """Remove all but the newest ``keep`` artifacts of a kind"""
+        paths = [p for p in glob.glob(os.path.join(self.root, f"{kind}-*")) if ".tmp-" not in p and p != current]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[self.keep - 1:]:
+            try:
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+            except OSError as e:
+                print(f"Error pruning artifact {path}: {e}")
+
+    @contextmanager
+    def lock(self, name: str):
+        """Exclusive lock across processes sharing the artifact directory"""
+        with open(os.path.join(self.root, f"{name}.lock"), "w") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,121 @@
+"""Recall@k vs. latency of the approximate FAISS indexes against the flat baseline.
+
+Run from backend/:
+
+    python -m benchmarks.bench_ann --vectors 100000 1000000
+    python -m benchmarks.bench_ann --vectors-file artifacts/vectors.npy --k 4
+
+Without --vectors-file the vectors are synthetic: unit-length points drawn around
+random centres, which clusters roughly like sentence embeddings do. Each index
+type is built once per size (training time included) and searched with a sweep of
+nprobe / efSearch values; recall is the share of the exact top-k that is returned.
+"""
+import json
+import time
+import argparse
+from typing import Any, Dict, List
+
+import faiss
+import numpy as np
+
+from vector_index import create_index, configure_search, describe, index_spec_from_env
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def search_latencies(index, queries: np.ndarray, k: int):
+    """One query at a time, like retrieval for a chat request"""
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start)
+        results.append(ids[0])
+    ms = np.asarray(latencies) * 1000
+    return np.stack(results), {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+                               "mean_ms": float(ms.mean())}
+
+
+def bench_size(vectors: np.ndarray, queries: np.ndarray, args) -> List[Dict[str, Any]]:
+    base_spec = index_spec_from_env()
+    results = []
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    start = time.perf_counter()
+    flat.add(vectors)
+    flat_build = time.perf_counter() - start
+    truth, flat_latency = search_latencies(flat, queries, args.k)
+    results.append({"type": "flat", "build_s": flat_build, "recall": 1.0, **flat_latency, **describe(flat)})
+
+    sweeps = {"ivf_flat": ("nprobe", args.nprobe), "ivf_pq": ("nprobe", args.nprobe), "hnsw": ("ef_search", args.ef_search)}
+    for kind in args.types:
+        spec = dict(base_spec, type=kind)
+        start = time.perf_counter()
+        index = create_index(spec, vectors)
+        index.add(vectors)
+        build = time.perf_counter() - start
+        info = describe(index)
+        param, values = sweeps[kind]
+        for value in values:
+            configure_search(index, dict(spec, **{param: value}))
+            found, latency = search_latencies(index, queries, args.k)
+            row = {"type": kind, param: value, "build_s": build, "recall": recall_at_k(found, truth),
+                   **latency, "class": info["class"], "bytes": info["bytes"]}
+            results.append(row)
+            print(f"  {kind:<9} {param}={value:<4} recall@{args.k} {row['recall']:.3f}  "
+                  f"p50 {row['p50_ms']:7.3f} ms  p95 {row['p95_ms']:7.3f} ms  "
+                  f"{row['bytes'] / 2**20:8.1f} MB  build {build:6.1f}s", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs. latency of FAISS index types")
+    parser.add_argument("--vectors", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--vectors-file", default=None, help=".npy matrix of real embeddings instead of synthetic ones")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=["ivf_flat", "hnsw", "ivf_pq"], choices=["ivf_flat", "hnsw", "ivf_pq"])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--threads", type=int, default=1, help="FAISS OpenMP threads")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+    faiss.omp_set_num_threads(args.threads)
+
+    if args.vectors_file:
+        datasets = [np.ascontiguousarray(np.load(args.vectors_file), dtype=np.float32)]
+    else:
+        datasets = [synthetic_vectors(n + args.queries, args.dim, args.clusters) for n in args.vectors]
+
+    report = []
+    for data in datasets:
+        # Queries are held out so none of them is its own nearest neighbour
+        vectors, queries = data[:-args.queries], data[-args.queries:]
+        print(f"\n== {len(vectors):,} vectors, dim {vectors.shape[1]}, {len(queries)} queries ==")
+        report.append({"vectors": len(vectors), "results": bench_size(vectors, queries, args)})
+        flat = report[-1]["results"][0]
+        print(f"  flat      baseline         p50 {flat['p50_ms']:7.3f} ms  p95 {flat['p95_ms']:7.3f} ms  "
+              f"{flat['bytes'] / 2**20:8.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
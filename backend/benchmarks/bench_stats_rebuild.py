@@ -0,0 +1,108 @@
+"""Rebuild-time benchmark: per-post-type DataFrame filtering vs. the single grouped pass.
+
+Run from backend/:
+
+    python -m benchmarks.bench_stats_rebuild --rows 1000000 10000000
+
+Frames are built by resampling the bundled CSV, so they need no extra files.
+Sample-post documents are left out of both sides since they cost the same either way.
+"""
+import time
+import argparse
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from streaming_stats import EngagementAccumulator, peak_rss_mb
+
+
+def make_frame(source: pd.DataFrame, rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return source.iloc[rng.integers(0, len(source), rows)].reset_index(drop=True)
+
+
+def legacy_rebuild(df: pd.DataFrame) -> Dict:
+    """The aggregations a rebuild used to run: masks and groupbys repeated per post type"""
+    stats = {
+        "total_posts": int(len(df)),
+        "post_type_distribution": df['post_type'].value_counts().to_dict(),
+        "avg_engagement_by_type": df.groupby('post_type')[['likes', 'comments', 'shares', 'views']].mean().to_dict(),
+        "best_time_by_post_type": {},
+        "best_day_by_post_type": {},
+        "engagement_rate_by_type": {},
+    }
+    df['engagement_rate'] = (df['likes'] + df['comments'] + df['shares']) / df['views']
+
+    # _generate_statistical_summaries
+    for post_type in df['post_type'].unique():
+        post_type_df = df[df['post_type'] == post_type]
+        hour_engagement = post_type_df.groupby('hour')['engagement_rate'].mean().sort_values(ascending=False)
+        stats["best_time_by_post_type"][post_type] = int(hour_engagement.index[0])
+        day_engagement = post_type_df.groupby('day_of_week')['engagement_rate'].mean().sort_values(ascending=False)
+        stats["best_day_by_post_type"][post_type] = str(day_engagement.index[0])
+        stats["engagement_rate_by_type"][post_type] = float(post_type_df['engagement_rate'].mean())
+
+    # _create_documents
+    for post_type in df['post_type'].unique():
+        pt_df = df[df['post_type'] == post_type]
+        pt_df.groupby('hour')['engagement_rate'].mean().sort_values(ascending=False).head(3)
+        pt_df.groupby('day_of_week')['engagement_rate'].mean().sort_values(ascending=False).head(3)
+        [pt_df[m].mean() for m in ['likes', 'comments', 'shares', 'views', 'engagement_rate']]
+    df.groupby('hour')['engagement_rate'].mean().sort_values(ascending=False)
+    df.groupby('day_of_week')['engagement_rate'].mean().sort_values(ascending=False)
+
+    # _get_improvement_recommendations
+    for post_type in df['post_type'].unique():
+        pt_df = df[df['post_type'] == post_type]
+        high_engagement = pt_df.nlargest(max(1, int(len(pt_df) * 0.1)), 'engagement_rate')
+        high_engagement['content'].apply(lambda x: x.count('#') if isinstance(x, str) else 0).mean()
+        high_engagement['content'].apply(lambda x: len(x) if isinstance(x, str) else 0).mean()
+    return stats
+
+
+def single_pass_rebuild(df: pd.DataFrame) -> Dict:
+    """The same aggregations derived from one EngagementAccumulator pass"""
+    summary = EngagementAccumulator.from_frame(df)
+    stats = summary.to_stats()
+    for post_type in summary.post_types():
+        summary.means(post_type)
+        summary.hour_rates(post_type).head(3)
+        summary.day_rates(post_type).head(3)
+        summary.top_decile_content(post_type)
+    summary.hour_rates()
+    summary.day_rates()
+    return stats
+
+
+def timed(fn, df: pd.DataFrame, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        result = fn(frame)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data", default="social_media_engagement_data.csv")
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.data)
+    print(f"{'rows':>12} {'legacy s':>10} {'single s':>10} {'speedup':>8} {'peak MB':>8}")
+    for rows in args.rows:
+        df = make_frame(source, rows)
+        legacy, legacy_stats = timed(legacy_rebuild, df, args.repeat)
+        single, single_stats = timed(single_pass_rebuild, df, args.repeat)
+        assert legacy_stats["best_time_by_post_type"] == single_stats["best_time_by_post_type"]
+        assert legacy_stats["best_day_by_post_type"] == single_stats["best_day_by_post_type"]
+        print(f"{rows:>12,} {legacy:>10.2f} {single:>10.2f} {legacy / single:>7.1f}x {peak_rss_mb():>8.0f}")
+        del df
+
+
+if __name__ == "__main__":
+    main()
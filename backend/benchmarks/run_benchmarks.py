@@ -0,0 +1,297 @@
+"""End-to-end benchmarks for the RAG pipeline and the API.
+
+Run from backend/:
+
+    python -m benchmarks.run_benchmarks --rows 5000 50000 --output bench.json
+    python -m benchmarks.run_benchmarks --rows 5000 --compare bench.json
+
+Each dataset size gets its own working directory with a generated CSV. The chat
+model is the local fake provider (see llm_providers.py), so no network or API
+key is needed; --fake-embeddings also swaps the MiniLM model for a hashing
+embedding when sentence-transformers isn't installed. Results are written as
+JSON so runs can be compared with --compare.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Questions for the query and /api/chat benchmarks: the first half is answered by
+# the intent router, the second half goes through retrieval and the LLM
+QUESTIONS = [
+    "average likes for reels?",
+    "what's the best day for carousels?",
+    "best time to post videos",
+    "compare reels and images",
+    "why do my image posts get fewer shares than reels?",
+    "how should I plan a week of posts to grow my audience?",
+    "what kind of captions work for carousels?",
+    "how can I improve engagement on videos?",
+]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    ms = np.asarray(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def use_fake_embeddings():
+    """Replace the MiniLM model with a deterministic hashing embedding of the same size"""
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    from social_media_rag import SocialMediaEngagementRAG
+    SocialMediaEngagementRAG._load_embeddings = lambda self: DeterministicFakeEmbedding(size=384)
+    # Keeps indexes of the fake embedding apart from real MiniLM ones
+    os.environ["RAG_EMBEDDING_MODEL"] = "fake-hashing-384"
+
+
+def bench_pipeline(args) -> Dict[str, Any]:
+    """load() cold and warm, stats rebuild, documents, FAISS build/search and query()"""
+    from langchain_community.vectorstores import FAISS
+    from social_media_rag import SocialMediaEngagementRAG
+
+    results = {}
+    cold = SocialMediaEngagementRAG()
+    results["load_cold_s"], _ = timed(cold.load)
+    results["load_cold_components_s"] = dict(cold.load_timings)
+
+    warm = SocialMediaEngagementRAG()
+    results["load_warm_s"], _ = timed(warm.load)
+    results["load_warm_components_s"] = dict(warm.load_timings)
+
+    df = pd.read_csv(warm.data_path)
+    results["stats_rebuild_s"], _ = timed(warm._generate_statistical_summaries, df)
+    results["create_documents_s"], documents = timed(warm._create_documents, df)
+    results["documents"] = len(documents)
+
+    results["faiss_build_s"], store = timed(FAISS.from_documents, documents, warm.embeddings)
+    vectors = [warm.embeddings.embed_query(q) for q in QUESTIONS]
+    searches = []
+    for i in range(args.searches):
+        elapsed, _ = timed(store.similarity_search_by_vector, vectors[i % len(vectors)], k=warm.retrieval_k)
+        searches.append(elapsed)
+    results["faiss_search"] = percentiles(searches)
+
+    # Fresh instance without the response cache so every query does the full work
+    os.environ["RAG_CACHE_ENABLED"] = "0"
+    rag = SocialMediaEngagementRAG()
+    rag.load()
+    os.environ.pop("RAG_CACHE_ENABLED")
+    routed, llm = [], []
+    for i in range(args.queries):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        elapsed, _ = timed(rag.query, question)
+        (routed if i % len(QUESTIONS) < len(QUESTIONS) // 2 else llm).append(elapsed)
+    results["query_routed"] = percentiles(routed)
+    results["query_llm"] = percentiles(llm)
+    return results
+
+
+async def drive(client, method: str, path: str, bodies: List[Any], concurrency: int) -> Dict[str, Any]:
+    """Send all requests with at most ``concurrency`` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(body):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            if method == "POST":
+                response = await client.post(path, json=body)
+            else:
+                response = await client.get(path, params=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(body) for body in bodies))
+    elapsed = time.perf_counter() - start
+    return {**percentiles(latencies), "errors": errors, "concurrency": concurrency,
+            "throughput_rps": len(bodies) / elapsed}
+
+
+async def bench_api(args) -> Dict[str, Any]:
+    """Concurrent load on /api/chat and the analytics endpoints, in process over ASGI"""
+    import httpx
+    import app as api
+
+    # Module globals survive between dataset sizes, start each size from scratch
+    api.rag_system = None
+    api.analytics_engine = None
+    api.startup_state.update({"ready": False, "error": None, "seconds": None, "attempts": 0, "components": {}})
+
+    n = args.requests
+    results = {}
+    async with api.app.router.lifespan_context(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            results["warmup_s"] = api.startup_state["seconds"]
+            chat_bodies = [{"message": f"{QUESTIONS[i % len(QUESTIONS)]} ({i})", "user_id": f"bench-{i % 50}"}
+                           for i in range(n)]
+            results["chat"] = await drive(client, "POST", "/api/chat", chat_bodies, args.concurrency)
+            results["analytics"] = await drive(client, "POST", "/api/analytics",
+                                               [{"post_type": [None, "reel", "video"][i % 3]} for i in range(n)],
+                                               args.concurrency)
+            results["best_times"] = await drive(client, "GET", "/api/best-times", [{}] * n, args.concurrency)
+            results["metrics_summary"] = await drive(client, "GET", "/api/metrics/summary", [{}] * n, args.concurrency)
+            results["router"] = (await client.get("/api/metrics/router")).json()
+    return results
+
+
+def bench_dataset(rows: int, args) -> Dict[str, Any]:
+    from mock_data_generator import generate_mock_data, write_mock_data
+
+    workdir = tempfile.mkdtemp(prefix=f"bench_{rows}_", dir=args.workdir)
+    previous = os.getcwd()
+    # The RAG system and API resolve data and artifact paths against RAG_DATA_DIR
+    os.environ["RAG_DATA_DIR"] = workdir
+    os.chdir(workdir)
+    try:
+        result = {"rows": rows, "workdir": workdir}
+        if args.generator == "vectorized":
+            result["generate_s"], _ = timed(write_mock_data, "social_media_engagement_data.csv", rows,
+                                            seed=args.seed)
+        else:
+            result["generate_s"], df = timed(generate_mock_data, rows)
+            df.to_csv("social_media_engagement_data.csv", index=False)
+            del df
+        print(f"[{rows} rows] generated in {result['generate_s']:.1f}s", flush=True)
+        result["pipeline"] = bench_pipeline(args)
+        print(f"[{rows} rows] pipeline done", flush=True)
+        result["api"] = asyncio.run(bench_api(args))
+        print(f"[{rows} rows] api done", flush=True)
+        return result
+    finally:
+        os.chdir(previous)
+
+
+def flatten(prefix: str, value: Any, out: Dict[str, float]):
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            flatten(f"{prefix}.{key}" if prefix else key, inner, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    """Print timing and latency changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old_runs = {run["rows"]: run for run in baseline["datasets"]}
+    for run in current["datasets"]:
+        old = old_runs.get(run["rows"])
+        if old is None:
+            continue
+        new_values, old_values = {}, {}
+        flatten("", run, new_values)
+        flatten("", old, old_values)
+        print(f"\n{run['rows']} rows vs {baseline_path} ({baseline['meta'].get('commit')})")
+        for key, value in new_values.items():
+            if key in old_values and (key.endswith("_s") or key.endswith("_ms") or key.endswith("_rps")) and old_values[key]:
+                change = (value - old_values[key]) / old_values[key]
+                print(f"  {key:<48} {old_values[key]:>12.3f} -> {value:>12.3f} ({change:+.1%})")
+
+
+def print_summary(run: Dict[str, Any]):
+    pipeline, api = run["pipeline"], run["api"]
+    print(f"\n== {run['rows']:,} rows ==")
+    for key in ("load_cold_s", "load_warm_s", "stats_rebuild_s", "create_documents_s", "faiss_build_s"):
+        print(f"  {key:<22} {pipeline[key]:>10.3f}")
+    for key in ("faiss_search", "query_routed", "query_llm"):
+        stats = pipeline[key]
+        print(f"  {key:<22} p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms  p99 {stats['p99_ms']:>9.2f} ms")
+    for key in ("chat", "analytics", "best_times", "metrics_summary"):
+        stats = api[key]
+        print(f"  /api {key:<17} p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms  "
+              f"p99 {stats['p99_ms']:>9.2f} ms  {stats['throughput_rps']:>8.1f} req/s  errors {stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks for the RAG pipeline and API")
+    parser.add_argument("--rows", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--queries", type=int, default=40, help="query() calls per dataset")
+    parser.add_argument("--searches", type=int, default=200, help="FAISS searches per dataset")
+    parser.add_argument("--requests", type=int, default=200, help="requests per API endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=100.0)
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="use a hashing embedding instead of MiniLM")
+    parser.add_argument("--generator", choices=["vectorized", "faker"], default="vectorized",
+                        help="mock data generator, see mock_data_generator.py")
+    parser.add_argument("--seed", type=int, default=42, help="seed for the vectorized generator")
+    parser.add_argument("--workdir", default=None, help="where datasets and indexes are written")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.update({
+        "RAG_LLM_PROVIDER": "fake",
+        "RAG_FAKE_LATENCY_MS": str(args.llm_latency_ms),
+        "RAG_FAKE_TOKENS_PER_SEC": str(args.llm_tokens_per_sec),
+        "RAG_WARMUP": "blocking",
+    })
+    if args.fake_embeddings:
+        use_fake_embeddings()
+
+    results = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "datasets": [],
+    }
+    for rows in args.rows:
+        run = bench_dataset(rows, args)
+        results["datasets"].append(run)
+        print_summary(run)
+
+    output = os.path.abspath(args.output)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import io
+import os
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from analytics_engine import AnalyticsEngine
+from http_cache import CachedBody, dumps
+
+CHART_FORMATS = ("json", "png")
+
+
+def render_png(chart: Dict[str, Any]) -> bytes:
+    """Rasterize an AnalyticsEngine.chart_data() description; runs in the render pool's worker processes"""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        raise RuntimeError("PNG charts need matplotlib: pip install matplotlib")
+
+    plt.style.use("ggplot")
+    kind = chart["kind"]
+    fig, ax = plt.subplots(figsize=(14, 8) if kind == "heatmap" else (10, 6))
+    try:
+        colors = plt.get_cmap("tab10").colors
+        if kind == "heatmap":
+            values = np.asarray(chart["values"])
+            image = ax.imshow(values, cmap="YlGnBu", aspect="auto")
+            ax.set_xticks(range(len(chart["columns"])), [c[:2] for c in chart["columns"]])
+            ax.set_yticks(range(len(chart["rows"])), chart["rows"])
+            ax.grid(False)
+            fig.colorbar(image, ax=ax, label="Engagement rate (%)")
+        elif kind == "pie":
+            ax.pie(chart["series"][0]["values"], labels=chart["labels"], autopct="%1.1f%%", startangle=90,
+                   colors=colors[:len(chart["labels"])])
+            ax.axis("equal")
+        else:
+            series = chart["series"]
+            width = 0.8 / len(series)
+            x = np.arange(len(chart["labels"]))
+            for i, s in enumerate(series):
+                bars = ax.bar(x + (i - (len(series) - 1) / 2) * width, s["values"], width,
+                              label=s["name"], color=colors[i % len(colors)])
+                ax.bar_label(bars, fmt="%.1f", fontsize=8)
+            ax.set_xticks(x, [label.capitalize() for label in chart["labels"]])
+            if len(series) > 1:
+                ax.set_yscale("log")
+                ax.legend()
+        ax.set_title(chart["title"], fontsize=16)
+        ax.set_xlabel(chart.get("x_label", ""))
+        ax.set_ylabel(chart.get("y_label", ""))
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class ChartService:
+    """Chart data and PNGs cached by (chart type, filters, format, data version).
+
+    The cache is an LRU bounded by the total size of the encoded bodies. PNGs are
+    rendered in a process pool so matplotlib never runs on a request thread, and
+    concurrent requests for the same missing chart share one render.
+    """
+
+    def __init__(self, max_bytes: int = None, workers: int = None):
+        self.max_bytes = max_bytes or int(os.environ.get("RAG_CHART_CACHE_BYTES", 32 * 2**20))
+        self.workers = workers or int(os.environ.get("RAG_CHART_WORKERS", 2))
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pool = None
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.evictions = 0
+
+    def _get(self, key) -> Optional[CachedBody]:
+        with self._lock:
+            chart = self._cache.get(key)
+            if chart is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return chart
+
+    def _put(self, key, chart: CachedBody):
+        with self._lock:
+            if key in self._cache:
+                self._bytes -= len(self._cache.pop(key).body)
+            if len(chart.body) > self.max_bytes:
+                return
+            self._cache[key] = chart
+            self._bytes += len(chart.body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+
+    def _render_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def get(self, engine: AnalyticsEngine, chart_type: str, fmt: str = "json",
+                  post_type: Optional[str] = None, start_date: Optional[str] = None,
+                  end_date: Optional[str] = None) -> CachedBody:
+        """The encoded chart; raises ValueError for bad parameters and RuntimeError
+        when PNG rendering is unavailable"""
+        if fmt not in CHART_FORMATS:
+            raise ValueError(f"Unknown chart format '{fmt}', expected one of {', '.join(CHART_FORMATS)}")
+        key = (chart_type, post_type, start_date, end_date, fmt, engine.version)
+        chart = self._get(key)
+        if chart is not None:
+            return chart
+
+        # One render per key, run as its own task that every request for the key awaits.
+        # Shielded, so a cancelled request (e.g. a client disconnect) leaves it running for the others
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.ensure_future(
+                self._build(key, engine, chart_type, fmt, post_type, start_date, end_date))
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    async def _build(self, key, engine: AnalyticsEngine, chart_type: str, fmt: str, post_type: Optional[str],
+                     start_date: Optional[str], end_date: Optional[str]) -> CachedBody:
+        data = engine.chart_data(chart_type, post_type, start_date, end_date)
+        if fmt == "json":
+            chart = CachedBody(dumps(data))
+        else:
+            body = await asyncio.get_running_loop().run_in_executor(self._render_pool(), render_png, data)
+            self.renders += 1
+            chart = CachedBody(body, "image/png")
+        self._put(key, chart)
+        return chart
+
+    def _finished(self, key, task: asyncio.Future):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        # Every request may have gone; mark a failure as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "renders": self.renders,
+                "evictions": self.evictions,
+                "workers": self.workers,
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
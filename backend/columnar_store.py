@@ -0,0 +1,322 @@
+"""Columnar copy of the engagement CSV.
+
+A converted dataset is a directory with one file per column and a manifest:
+
+- numeric columns are ``.npy`` files, opened memory-mapped so reading them is zero-copy
+- ``post_type`` and ``day_of_week`` are int8 category codes, the labels live in the manifest
+- ``timestamp`` is stored as datetime64[s]
+- text columns (``post_id``, ``content``) are one UTF-8 blob of NUL-terminated values
+  plus an int64 ``.offsets.npy`` index, so a row range decodes with a single split
+
+Readers only open the columns a computation asks for. Parquet (through the optional
+pyarrow) is supported as an alternative target.
+
+    python columnar_store.py social_media_engagement_data.csv
+    python columnar_store.py social_media_engagement_data.csv --format parquet
+"""
+import os
+import json
+import shutil
+import argparse
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from analytics_engine import POST_TYPES, DAYS
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+COLUMNAR_SUFFIX = ".columns"
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Column order and kinds of the engagement data, see mock_data_generator.py
+NUMERIC_COLUMNS = {'likes': 'int32', 'comments': 'int32', 'shares': 'int32', 'views': 'int32', 'hour': 'int8'}
+CATEGORY_COLUMNS = {'post_type': POST_TYPES, 'day_of_week': DAYS}
+STRING_COLUMNS = ['post_id', 'content']
+ALL_COLUMNS = ['post_id', 'post_type', 'timestamp', 'likes', 'comments', 'shares',
+               'views', 'content', 'day_of_week', 'hour']
+
+
+def columnar_path(csv_path: str) -> str:
+    """Default location of the columnar copy of a CSV file"""
+    root, _ = os.path.splitext(csv_path)
+    return root + COLUMNAR_SUFFIX
+
+
+def _source_signature(path: str) -> Dict[str, Any]:
+    info = os.stat(path)
+    return {"path": os.path.abspath(path), "size": info.st_size, "mtime_ns": info.st_mtime_ns}
+
+
+class ColumnarTable:
+    """Read-only view of a converted dataset"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {self.manifest.get('format_version')}, "
+                             f"expected {FORMAT_VERSION}; convert the CSV again")
+        self.rows = self.manifest["rows"]
+        self.columns = list(self.manifest["columns"])
+        self._arrays = {}
+
+    def is_fresh(self, csv_path: str) -> bool:
+        """Whether the copy was made from the CSV as it is now"""
+        source = self.manifest.get("source") or {}
+        try:
+            current = _source_signature(csv_path)
+        except OSError:
+            return False
+        return source.get("size") == current["size"] and source.get("mtime_ns") == current["mtime_ns"]
+
+    def _array(self, filename: str) -> np.ndarray:
+        if filename not in self._arrays:
+            self._arrays[filename] = np.load(os.path.join(self.path, filename), mmap_mode='r')
+        return self._arrays[filename]
+
+    def _strings(self, name: str, start: int, stop: int) -> List[str]:
+        offsets = self._array(f"{name}.offsets.npy")
+        if stop <= start:
+            return []
+        with open(os.path.join(self.path, f"{name}.txt"), 'rb') as f:
+            f.seek(int(offsets[start]))
+            blob = f.read(int(offsets[stop] - offsets[start]))
+        # Every value ends with NUL, so the split leaves one empty string at the end
+        return blob.decode('utf-8').split('\x00')[:-1]
+
+    def column(self, name: str, start: int = 0, stop: int = None):
+        """One column for rows [start, stop); numeric columns are memory-mapped views"""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        spec = self.manifest["columns"].get(name)
+        if spec is None:
+            raise KeyError(f"Column '{name}' not in {self.path}")
+        if spec["kind"] == "string":
+            return self._strings(name, start, stop)
+        values = self._array(f"{name}.npy")[start:stop]
+        if spec["kind"] == "category":
+            return pd.Categorical.from_codes(values, categories=spec["categories"])
+        return values
+
+    def frame(self, columns: List[str] = None, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """Rows [start, stop) of the requested columns, in file column order"""
+        columns = [c for c in self.columns if columns is None or c in columns]
+        stop = self.rows if stop is None else min(stop, self.rows)
+        # copy=False keeps numeric columns as views of the memory maps
+        return pd.DataFrame({c: self.column(c, start, stop) for c in columns},
+                            index=pd.RangeIndex(start, max(start, stop)), copy=False)
+
+    def iter_frames(self, chunksize: int, columns: List[str] = None) -> Iterator[pd.DataFrame]:
+        for start in range(0, self.rows, chunksize):
+            yield self.frame(columns, start, start + chunksize)
+
+
+def open_columnar(data_path: str) -> Optional[ColumnarTable]:
+    """Columnar table for a data path: the path itself if it is one, or a fresh copy of the CSV"""
+    if os.path.isdir(data_path):
+        return ColumnarTable(data_path)
+    copy = columnar_path(data_path)
+    if not os.path.exists(os.path.join(copy, MANIFEST)):
+        return None
+    try:
+        table = ColumnarTable(copy)
+    except (OSError, ValueError) as e:
+        print(f"Error opening columnar data {copy}: {e}, reading the CSV")
+        return None
+    if not table.is_fresh(data_path):
+        print(f"Columnar data {copy} is older than {data_path}, reading the CSV; convert it again to speed up loads")
+        return None
+    return table
+
+
+def _read_parquet(path: str, columns: List[str] = None) -> pd.DataFrame:
+    try:
+        return pd.read_parquet(path, columns=columns)
+    except ImportError:
+        raise RuntimeError("Reading Parquet data needs pyarrow: pip install pyarrow") from None
+
+
+def read_engagement_frame(data_path: str, columns: List[str] = None) -> pd.DataFrame:
+    """Engagement data with only the requested columns, from the fastest available format"""
+    table = open_columnar(data_path)
+    if table is not None:
+        return table.frame(columns)
+    if data_path.endswith(".parquet"):
+        return _read_parquet(data_path, columns)
+    return pd.read_csv(data_path, usecols=columns)
+
+
+def iter_engagement_frames(data_path: str, chunksize: int, columns: List[str] = None,
+                           csv_dtypes: Dict[str, Any] = None) -> Iterator[pd.DataFrame]:
+    """Engagement data in chunks of rows, from the fastest available format.
+
+    ``csv_dtypes`` only applies when the CSV itself has to be parsed; the columnar
+    copy already stores compact types.
+    """
+    table = open_columnar(data_path)
+    if table is not None:
+        return table.iter_frames(chunksize, columns)
+    if data_path.endswith(".parquet"):
+        df = _read_parquet(data_path, columns)
+        return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    return pd.read_csv(data_path, usecols=columns, chunksize=chunksize, dtype=csv_dtypes)
+
+
+class _ColumnWriter:
+    """Appends chunks to raw per-column files, turned into .npy files by finish()"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self.categories = {name: list(labels) for name, labels in CATEGORY_COLUMNS.items()}
+        self._files = {}
+        self._text_offsets = {name: 0 for name in STRING_COLUMNS}
+
+    def _file(self, filename: str):
+        if filename not in self._files:
+            self._files[filename] = open(os.path.join(self.path, filename), 'wb')
+        return self._files[filename]
+
+    def write(self, chunk: pd.DataFrame):
+        for name, dtype in NUMERIC_COLUMNS.items():
+            values = chunk[name].to_numpy()
+            info = np.iinfo(dtype)
+            if len(values) and (values.min() < info.min or values.max() > info.max):
+                raise ValueError(f"'{name}' has values outside the {dtype} range")
+            values.astype(dtype).tofile(self._file(f"{name}.raw"))
+
+        for name in CATEGORY_COLUMNS:
+            labels = self.categories[name]
+            new = [v for v in pd.unique(chunk[name].dropna()) if v not in labels]
+            labels.extend(sorted(map(str, new)))
+            codes = pd.Categorical(chunk[name], categories=labels).codes
+            codes.astype(np.int8).tofile(self._file(f"{name}.raw"))
+
+        timestamps = pd.to_datetime(chunk['timestamp'], format=TIMESTAMP_FORMAT, errors='coerce')
+        timestamps.to_numpy(dtype='datetime64[s]').tofile(self._file("timestamp.raw"))
+
+        for name in STRING_COLUMNS:
+            values = ["" if not isinstance(v, str) else v.replace('\x00', '') for v in chunk[name]]
+            encoded = [(v + '\x00').encode('utf-8') for v in values]
+            lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+            ends = self._text_offsets[name] + np.cumsum(lengths)
+            if self.rows == 0:
+                np.zeros(1, dtype=np.int64).tofile(self._file(f"{name}.offsets.raw"))
+            ends.tofile(self._file(f"{name}.offsets.raw"))
+            self._file(f"{name}.txt").write(b"".join(encoded))
+            if len(ends):
+                self._text_offsets[name] = int(ends[-1])
+
+        self.rows += len(chunk)
+
+    def _to_npy(self, name: str, dtype, rows: int):
+        raw = os.path.join(self.path, f"{name}.raw")
+        source = np.fromfile(raw, dtype=dtype) if os.path.exists(raw) else np.zeros(rows, dtype=dtype)
+        target = np.lib.format.open_memmap(os.path.join(self.path, f"{name}.npy"), mode='w+',
+                                           dtype=dtype, shape=(rows,))
+        target[:] = source
+        target.flush()
+        del target
+        if os.path.exists(raw):
+            os.remove(raw)
+
+    def finish(self, source: Dict[str, Any]):
+        for f in self._files.values():
+            f.close()
+        columns = {}
+        for name in ALL_COLUMNS:
+            if name in NUMERIC_COLUMNS:
+                self._to_npy(name, np.dtype(NUMERIC_COLUMNS[name]), self.rows)
+                columns[name] = {"kind": "numeric", "dtype": NUMERIC_COLUMNS[name]}
+            elif name in CATEGORY_COLUMNS:
+                self._to_npy(name, np.dtype(np.int8), self.rows)
+                columns[name] = {"kind": "category", "categories": self.categories[name]}
+            elif name == 'timestamp':
+                self._to_npy(name, np.dtype('datetime64[s]'), self.rows)
+                columns[name] = {"kind": "datetime", "dtype": "datetime64[s]"}
+            else:
+                if self.rows == 0:
+                    open(os.path.join(self.path, f"{name}.txt"), 'wb').close()
+                self._to_npy(f"{name}.offsets", np.dtype(np.int64), self.rows + 1)
+                columns[name] = {"kind": "string"}
+        manifest = {"format_version": FORMAT_VERSION, "rows": self.rows, "source": source, "columns": columns}
+        with open(os.path.join(self.path, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+
+def convert_to_columnar(csv_path: str, output: str = None, chunksize: int = 500_000) -> str:
+    """Convert the engagement CSV in one streaming pass; the output replaces any previous copy"""
+    output = output or columnar_path(csv_path)
+    source = _source_signature(csv_path)
+    staging = f"{output}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        writer = _ColumnWriter(staging)
+        for chunk in pd.read_csv(csv_path, usecols=ALL_COLUMNS, chunksize=chunksize,
+                                 dtype={'post_id': str, 'content': str, 'timestamp': str}, keep_default_na=False):
+            writer.write(chunk)
+        writer.finish(source)
+        # Readers never see a half-written directory
+        if os.path.exists(output):
+            shutil.rmtree(output)
+        os.replace(staging, output)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return output
+
+
+def convert_to_parquet(csv_path: str, output: str = None, chunksize: int = 500_000) -> str:
+    """Convert the engagement CSV to a Parquet file, one row group per chunk"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow") from None
+    output = output or os.path.splitext(csv_path)[0] + ".parquet"
+    staging = f"{output}.tmp-{os.getpid()}"
+    writer = None
+    try:
+        for chunk in pd.read_csv(csv_path, usecols=ALL_COLUMNS, chunksize=chunksize,
+                                 dtype={'post_id': str, 'content': str, 'timestamp': str}, keep_default_na=False):
+            for name, labels in CATEGORY_COLUMNS.items():
+                chunk[name] = chunk[name].astype(pd.CategoricalDtype(labels))
+            for name, dtype in NUMERIC_COLUMNS.items():
+                chunk[name] = chunk[name].astype(dtype)
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], format=TIMESTAMP_FORMAT, errors='coerce')
+            table = pa.Table.from_pandas(chunk[ALL_COLUMNS], preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(staging, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(staging, output)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(staging):
+            os.remove(staging)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the engagement CSV to a columnar format")
+    parser.add_argument("csv_path", nargs="?", default="social_media_engagement_data.csv")
+    parser.add_argument("--format", choices=["columnar", "parquet"], default="columnar",
+                        help="memory-mapped column files (default) or Parquet, which needs pyarrow")
+    parser.add_argument("--output", default=None,
+                        help=f"default: the CSV path with {COLUMNAR_SUFFIX} or .parquet instead of .csv")
+    parser.add_argument("--chunksize", type=int, default=500_000, help="CSV rows per read")
+    args = parser.parse_args()
+
+    convert = convert_to_parquet if args.format == "parquet" else convert_to_columnar
+    output = convert(args.csv_path, args.output, args.chunksize)
+    print(f"Converted {args.csv_path} to {output}")
+
+
+if __name__ == "__main__":
+    main()
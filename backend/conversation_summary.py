@@ -0,0 +1,129 @@
+import os
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from history_store import HistoryStore
+
+SUMMARY_TEMPLATE = """
+        Update the running summary of a conversation between a user and a social media analytics assistant.
+        Keep the questions asked, the post types, metrics and time ranges discussed, and any conclusions
+        or recommendations given. Leave out greetings and formatting. Answer with the summary only,
+        in at most {max_words} words.
+
+        Current summary:
+        {summary}
+
+        New messages:
+        {messages}
+        """
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_template(SUMMARY_TEMPLATE)
+
+
+def _format_messages(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(
+        f"{'Human' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in messages
+    )
+
+
+class ConversationSummarizer:
+    """Folds older chat turns into a rolling per-user summary kept in the history store.
+
+    The last ``keep_messages`` messages always go to the prompt verbatim. Once
+    ``step`` older messages have piled up behind them they are merged into the
+    summary in the background, so the window slides in blocks and the summary is
+    recomputed once per block rather than on every turn. With an ``executor``
+    (BoundedQueryExecutor) each summary LLM call holds one of its query slots,
+    so background refreshes count against the same concurrency limit as chats.
+    """
+
+    def __init__(self, store: HistoryStore, keep_messages: int = None, step: int = None,
+                 max_tokens: int = None, executor=None):
+        self.store = store
+        self.executor = executor
+        self.keep_messages = keep_messages or int(os.environ.get("RAG_SUMMARY_KEEP_MESSAGES", 4))
+        self.step = step or int(os.environ.get("RAG_SUMMARY_STEP", 4))
+        self.max_tokens = max_tokens or int(os.environ.get("RAG_SUMMARY_TOKENS", 250))
+        self.refreshes = 0
+        self.failures = 0
+        self._running = {}  # user_id -> task, at most one refresh per user
+
+    def context(self, user_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """The summary and the messages after it that fit the prompt's token budget"""
+        summary, through = self.store.summary(user_id)
+        return summary, [m for m in self.store.window(user_id) if m["id"] > through]
+
+    def _pending(self, user_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        summary, through = self.store.summary(user_id)
+        unsummarized = [m for m in self.store.messages(user_id) if m["id"] > through]
+        return summary, unsummarized[:-self.keep_messages]
+
+    async def refresh(self, user_id: str, llm=None) -> bool:
+        """Merge the messages that fell out of the verbatim window into the summary"""
+        summary, older = self._pending(user_id)
+        if len(older) < self.step:
+            return False
+        updated = await self._summarize(summary, older, llm)
+        self.store.set_summary(user_id, updated, older[-1]["id"])
+        self.refreshes += 1
+        return True
+
+    async def _summarize(self, summary: str, messages: List[Dict[str, Any]], llm=None) -> str:
+        if llm is not None:
+            try:
+                async with self.executor.slot() if self.executor is not None else nullcontext():
+                    result = await (SUMMARY_PROMPT | llm).ainvoke({
+                        "summary": summary or "(none)",
+                        "messages": _format_messages(messages),
+                        "max_words": int(self.max_tokens * 0.75),
+                    })
+                text = getattr(result, "content", "").strip()
+                if text:
+                    return self._clip(text)
+            except Exception as e:
+                print(f"Error summarizing conversation, using extractive summary: {e}")
+                self.failures += 1
+        return self._extractive(summary, messages)
+
+    def _clip(self, text: str) -> str:
+        # ~4 characters per token, keep the most recent part of the summary
+        limit = self.max_tokens * 4
+        return text if len(text) <= limit else "..." + text[-limit:]
+
+    def _extractive(self, summary: str, messages: List[Dict[str, Any]]) -> str:
+        """Summary without the LLM: the start of each user question and assistant answer"""
+        lines = [summary] if summary else []
+        for m in messages:
+            first_line = m["content"].strip().split("\n", 1)[0]
+            label = "User asked" if m["role"] == "user" else "Assistant answered"
+            lines.append(f"- {label}: {first_line[:160]}")
+        return self._clip("\n".join(lines))
+
+    def schedule(self, user_id: str, llm=None):
+        """Start a background refresh for the user unless one is already running"""
+        task = self._running.get(user_id)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self.refresh(user_id, llm))
+        self._running[user_id] = task
+        task.add_done_callback(lambda t: self._finished(user_id, t))
+
+    def _finished(self, user_id: str, task: asyncio.Task):
+        if self._running.get(user_id) is task:
+            del self._running[user_id]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error refreshing conversation summary: {task.exception()}")
+            self.failures += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "keep_messages": self.keep_messages,
+            "step": self.step,
+            "max_tokens": self.max_tokens,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "running": len(self._running),
+        }
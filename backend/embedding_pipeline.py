@@ -0,0 +1,160 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def load_embedding_model(model_name: str = None, batch_size: int = None):
+    """HuggingFace sentence-transformers embeddings; imports torch, so only call when needed"""
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    encode_kwargs = {"batch_size": batch_size} if batch_size else {}
+    return HuggingFaceEmbeddings(model_name=model_name or DEFAULT_EMBEDDING_MODEL, encode_kwargs=encode_kwargs)
+
+
+def text_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings on disk keyed by a hash of the model name and the text, so rebuilds
+    only embed documents that are new or changed"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL lets workers sharing the artifact directory read while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Set in each pool worker by _init_worker, so the model is loaded once per process
+_worker_model = None
+
+
+def _init_worker(model_name: str, batch_size: int, threads: int):
+    global _worker_model
+    try:
+        import torch
+        # Workers split the CPUs rather than each starting one thread per core
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = load_embedding_model(model_name, batch_size)
+
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    return np.asarray(_worker_model.embed_documents(texts), dtype=np.float32)
+
+
+class EmbeddingPipeline:
+    """Embeds texts in batches, deduplicated and through the disk cache.
+
+    With ``workers`` > 1 and at least ``min_pool_batches`` batches to embed, the
+    batches are spread over a process pool in which each worker loads its own
+    copy of ``model_name``; otherwise ``embeddings`` (the already loaded model)
+    is used in this process. The pool is started on first use and kept until
+    close(), so workers load the model once. It uses the spawn start method by
+    default, since forking a process that runs the API's threads can deadlock.
+    """
+
+    def __init__(self, embeddings, model_name: str, cache: Optional[EmbeddingCache] = None,
+                 batch_size: int = None, workers: int = None, min_pool_batches: int = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+        self.batch_size = batch_size or int(os.environ.get("RAG_EMBED_BATCH_SIZE", 64))
+        self.workers = workers or int(os.environ.get("RAG_EMBED_WORKERS", 1))
+        # Fewer batches than this are embedded in-process; not worth a round trip to the pool
+        self.min_pool_batches = min_pool_batches or int(os.environ.get("RAG_EMBED_POOL_MIN_BATCHES", 4))
+        self.start_method = os.environ.get("RAG_EMBED_START_METHOD", "spawn")
+        self.last_report = None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _worker_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                threads = max(1, (os.cpu_count() or 1) // self.workers)
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(self.start_method),
+                                                 initializer=_init_worker,
+                                                 initargs=(self.model_name, self.batch_size, threads))
+            return self._pool
+
+    def _embed_missing(self, texts: List[str]) -> List[np.ndarray]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.workers <= 1 or len(batches) < max(2, self.min_pool_batches):
+            return [np.asarray(self.embeddings.embed_documents(batch), dtype=np.float32) for batch in batches]
+        return list(self._worker_pool().map(_embed_batch, batches))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """float32 matrix with one row per text, in the order given"""
+        start = time.perf_counter()
+        unique = list(dict.fromkeys(texts))
+        keys = [text_key(self.model_name, t) for t in unique]
+        vectors = self.cache.get_many(keys) if self.cache is not None else {}
+
+        missing = [(key, text) for key, text in zip(keys, unique) if key not in vectors]
+        if missing:
+            embedded = np.concatenate(self._embed_missing([text for _, text in missing]))
+            new = {key: vector for (key, _), vector in zip(missing, embedded)}
+            if self.cache is not None:
+                self.cache.put_many(new)
+            vectors.update(new)
+
+        by_text = {text: vectors[key] for key, text in zip(keys, unique)}
+        matrix = np.stack([by_text[t] for t in texts]) if texts else np.zeros((0, 0), dtype=np.float32)
+        self.last_report = {
+            "texts": len(texts),
+            "unique": len(unique),
+            "cached": len(unique) - len(missing),
+            "embedded": len(missing),
+            "batch_size": self.batch_size,
+            "workers": self.workers,
+            "seconds": time.perf_counter() - start,
+        }
+        return matrix
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.last_report or {})
+
+    def close(self):
+        """Stop the worker pool and close the cache"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+        if self.cache is not None:
+            self.cache.close()
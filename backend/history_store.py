@@ -0,0 +1,252 @@
+import os
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Tuple
+
+from artifacts import resolve_path
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting prompts, ~4 characters per token for English text"""
+    return max(1, len(text or "") // 4)
+
+
+def _window(messages: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+    """Newest messages that fit in the token budget, oldest first"""
+    selected, used = [], 0
+    for message in reversed(messages):
+        used += message["tokens"]
+        if used > max_tokens:
+            break
+        selected.append(message)
+    selected.reverse()
+    return selected
+
+
+class HistoryStore(ABC):
+    """Per-user chat history with a ring buffer per user and eviction of idle users.
+
+    ``max_messages`` bounds each user's history, ``max_tokens`` bounds the part of it
+    that is handed to the prompt, and users idle for ``idle_seconds`` are dropped.
+    """
+
+    def __init__(self, max_messages: int = None, max_tokens: int = None, idle_seconds: float = None):
+        self.max_messages = max_messages or int(os.environ.get("RAG_HISTORY_MAX_MESSAGES", 50))
+        self.max_tokens = max_tokens or int(os.environ.get("RAG_HISTORY_TOKENS", 1500))
+        self.idle_seconds = idle_seconds or float(os.environ.get("RAG_HISTORY_IDLE_SECONDS", 86400))
+        self.evictions = 0
+
+    @abstractmethod
+    def append(self, user_id: str, role: str, content: str):
+        """Add a message to the end of a user's history"""
+
+    @abstractmethod
+    def messages(self, user_id: str) -> List[Dict[str, Any]]:
+        """All retained messages for a user, oldest first.
+
+        Each message has an ``id`` that increases with every append for that user.
+        """
+
+    @abstractmethod
+    def summary(self, user_id: str) -> Tuple[str, int]:
+        """Rolling summary of earlier turns and the id of the last message it covers"""
+
+    @abstractmethod
+    def set_summary(self, user_id: str, summary: str, through: int):
+        """Store a newer rolling summary; older ones than the stored summary are ignored"""
+
+    def history(self, user_id: str) -> List[Dict[str, str]]:
+        """Retained messages in the API's {"role", "content"} shape"""
+        return [{"role": m["role"], "content": m["content"]} for m in self.messages(user_id)]
+
+    def window(self, user_id: str, max_tokens: int = None) -> List[Dict[str, Any]]:
+        """The most recent messages that fit in the prompt's token budget"""
+        return _window(self.messages(user_id), max_tokens or self.max_tokens)
+
+    @abstractmethod
+    def metrics(self) -> Dict[str, Any]:
+        """Counts and limits for /api/metrics/history"""
+
+    def close(self):
+        """Release connections; the in-memory store has none"""
+
+
+class MemoryHistoryStore(HistoryStore):
+    """In-process store: an LRU of users, each with a bounded deque of messages"""
+
+    def __init__(self, max_users: int = None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_users = max_users or int(os.environ.get("RAG_HISTORY_MAX_USERS", 10000))
+        self._users = OrderedDict()  # user_id -> per-user entry, least recently active first
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        # Least recently active users are at the front
+        while self._users:
+            user_id, entry = next(iter(self._users.items()))
+            if len(self._users) <= self.max_users and now - entry["seen"] <= self.idle_seconds:
+                break
+            del self._users[user_id]
+            self.evictions += 1
+
+    def append(self, user_id: str, role: str, content: str):
+        now = time.time()
+        with self._lock:
+            entry = self._users.pop(user_id, None) or {
+                "messages": deque(maxlen=self.max_messages), "next_id": 1, "summary": "", "through": 0,
+            }
+            entry["messages"].append({
+                "id": entry["next_id"], "role": role, "content": content, "tokens": estimate_tokens(content),
+            })
+            entry["next_id"] += 1
+            entry["seen"] = now
+            self._users[user_id] = entry
+            self._evict(now)
+
+    def messages(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            return list(entry["messages"]) if entry else []
+
+    def summary(self, user_id: str) -> Tuple[str, int]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            return (entry["summary"], entry["through"]) if entry else ("", 0)
+
+    def set_summary(self, user_id: str, summary: str, through: int):
+        with self._lock:
+            entry = self._users.get(user_id)
+            # The user may have been evicted while the summary was computed
+            if entry is not None and through > entry["through"]:
+                entry["summary"], entry["through"] = summary, through
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "users": len(self._users),
+                "messages": sum(len(entry["messages"]) for entry in self._users.values()),
+                "max_users": self.max_users,
+                "max_messages": self.max_messages,
+                "max_tokens": self.max_tokens,
+                "evictions": self.evictions,
+            }
+
+
+class SqliteHistoryStore(HistoryStore):
+    """Store in a local SQLite file, shared by uvicorn workers and kept across restarts"""
+
+    # Idle users are purged every this many appends rather than on every write
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = resolve_path(path or os.environ.get("RAG_HISTORY_PATH", "chat_history.db"))
+        self._lock = threading.Lock()
+        self._appends = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        # WAL lets other workers read while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_user ON chat_messages (user_id, id);
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_created ON chat_messages (created);
+            CREATE TABLE IF NOT EXISTS chat_summaries (
+                user_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                through INTEGER NOT NULL
+            );
+        """)
+
+    def append(self, user_id: str, role: str, content: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO chat_messages (user_id, role, content, tokens, created) VALUES (?, ?, ?, ?, ?)",
+                (user_id, role, content, estimate_tokens(content), now),
+            )
+            # Ring buffer: drop everything older than the user's last max_messages rows
+            self._conn.execute(
+                """DELETE FROM chat_messages WHERE user_id = ? AND id <= (
+                       SELECT id FROM chat_messages WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+                (user_id, user_id, self.max_messages),
+            )
+            self._appends += 1
+            if self._appends % self.PURGE_EVERY == 0:
+                self._purge_idle(now)
+
+    def _purge_idle(self, now: float):
+        cursor = self._conn.execute(
+            """DELETE FROM chat_messages WHERE user_id IN (
+                   SELECT user_id FROM chat_messages GROUP BY user_id HAVING MAX(created) < ?)""",
+            (now - self.idle_seconds,),
+        )
+        self.evictions += cursor.rowcount
+        self._conn.execute(
+            "DELETE FROM chat_summaries WHERE user_id NOT IN (SELECT DISTINCT user_id FROM chat_messages)"
+        )
+
+    def messages(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, role, content, tokens FROM chat_messages WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, self.max_messages),
+            ).fetchall()
+        return [{"id": id_, "role": role, "content": content, "tokens": tokens}
+                for id_, role, content, tokens in reversed(rows)]
+
+    def summary(self, user_id: str) -> Tuple[str, int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, through FROM chat_summaries WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+
+    def set_summary(self, user_id: str, summary: str, through: int):
+        with self._lock, self._conn:
+            # Only move forward, another worker may have stored a newer summary meanwhile
+            self._conn.execute(
+                """INSERT INTO chat_summaries (user_id, summary, through) VALUES (?, ?, ?)
+                   ON CONFLICT (user_id) DO UPDATE SET summary = excluded.summary, through = excluded.through
+                   WHERE excluded.through > chat_summaries.through""",
+                (user_id, summary, through),
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            users, messages = self._conn.execute(
+                "SELECT COUNT(DISTINCT user_id), COUNT(*) FROM chat_messages"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "users": users,
+            "messages": messages,
+            "max_messages": self.max_messages,
+            "max_tokens": self.max_tokens,
+            "evicted_messages": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_history_store() -> HistoryStore:
+    """History store selected by RAG_HISTORY_BACKEND ("memory" or "sqlite")"""
+    backend = os.environ.get("RAG_HISTORY_BACKEND", "memory")
+    if backend == "sqlite":
+        return SqliteHistoryStore()
+    if backend != "memory":
+        print(f"Unknown RAG_HISTORY_BACKEND '{backend}', using in-memory history")
+    return MemoryHistoryStore()
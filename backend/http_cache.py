@@ -0,0 +1,192 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as they are; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.environ.get("RAG_COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("RAG_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("RAG_BROTLI_QUALITY", 5))
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes; orjson when installed, several times faster on large payloads"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def accepted_encodings(request: Request) -> Dict[str, float]:
+    """Content codings from Accept-Encoding with their q-values"""
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate(request: Request) -> Optional[str]:
+    """br or gzip if the client takes it, preferring brotli at equal q"""
+    accepted = accepted_encodings(request)
+    best, best_q = None, 0.0
+    for coding in (["br"] if brotli is not None else []) + ["gzip"]:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CachedBody:
+    """A serialized response body with its strong ETag and lazily compressed variants"""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.body) >= COMPRESS_MIN_BYTES and not self.media_type.startswith("image/")
+
+    def encoded(self, coding: Optional[str]) -> bytes:
+        if coding is None or not self.compressible:
+            return self.body
+        with self._lock:
+            if coding not in self._encoded:
+                if coding == "br":
+                    self._encoded[coding] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+                else:
+                    self._encoded[coding] = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+            return self._encoded[coding]
+
+    def is_encoded(self, coding: Optional[str]) -> bool:
+        """Whether encoded(coding) is ready without compressing"""
+        return coding is None or not self.compressible or coding in self._encoded
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(b) for b in self._encoded.values())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 asks for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def respond(request: Request, cached: CachedBody, cache_control: Optional[str] = "private, no-cache",
+            status_code: int = 200) -> Response:
+    """Response for ``cached``: 304 when the client's ETag matches on a GET, else the body
+    in the best encoding the client accepts"""
+    headers = {"ETag": cached.etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if cached.compressible:
+        headers["Vary"] = "Accept-Encoding"
+    if request.method in ("GET", "HEAD") and etag_matches(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+
+    coding = negotiate(request) if cached.compressible else None
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    return Response(content=cached.encoded(coding), status_code=status_code, media_type=cached.media_type,
+                    headers=headers)
+
+
+def json_response(request: Request, obj: Any, cache_control: Optional[str] = "no-store") -> Response:
+    """Serialize with the fast encoder and compress, without caching; for per-user payloads"""
+    return respond(request, CachedBody(dumps(obj)), cache_control)
+
+
+class ResponseCache:
+    """Serialized JSON responses keyed by route, parameters and data version.
+
+    Including the data version in the key means a data change never serves a
+    stale body: new requests miss and the old entries age out of the LRU, which
+    is bounded by the bytes held including compressed variants.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes or int(os.environ.get("RAG_RESPONSE_CACHE_BYTES", 16 * 2**20))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        """The cached body for ``key``, or None on a miss (counted by the get_or_build that follows)"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return cached
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> CachedBody:
+        """The cached body for ``key``, serializing ``build()`` on a miss"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        cached = CachedBody(dumps(build()))
+        with self._lock:
+            self._entries[key] = cached
+            self._trim()
+        return cached
+
+    def _trim(self):
+        # Compressed variants are added after insertion, so sizes are re-read here
+        total = sum(c.size for c in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            total -= evicted.size
+            self.evictions += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim()
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(c.size for c in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "encoder": "orjson" if orjson is not None else "json",
+                "brotli": brotli is not None,
+            }
@@ -0,0 +1,176 @@
+import io
+import os
+import csv
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+
+from analytics_engine import POST_TYPES, DAYS
+from columnar_store import iter_engagement_frames
+from streaming_stats import EngagementAccumulator
+
+# Column order and types written by mock_data_generator.py
+SCHEMA_COLUMNS = ['post_id', 'post_type', 'timestamp', 'likes', 'comments', 'shares',
+                  'views', 'content', 'day_of_week', 'hour']
+INT_COLUMNS = ['likes', 'comments', 'shares', 'views', 'hour']
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+MAX_REPORTED_ERRORS = 10
+# Uploads larger than this are rejected with 413 before parsing
+MAX_UPLOAD_BYTES = int(os.environ.get("RAG_MAX_UPLOAD_BYTES", 50 * 2**20))
+UPLOAD_CHUNK_BYTES = 2**20
+
+# Serializes batches so the cube, stats, index and CSV move forward together
+_ingest_lock = threading.Lock()
+# data path -> ((size, mtime) the ids were read at, post_ids in the file)
+_known_post_ids = {}
+
+
+class IngestionError(ValueError):
+    """Raised when an uploaded batch doesn't match the engagement data schema"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def parse_batch(filename: str, raw: bytes) -> pd.DataFrame:
+    """Read an uploaded CSV or JSONL batch into a DataFrame"""
+    name = (filename or "").lower()
+    try:
+        if name.endswith((".jsonl", ".ndjson", ".json")):
+            return pd.read_json(io.BytesIO(raw), lines=True, dtype=False)
+        return pd.read_csv(io.BytesIO(raw))
+    except ValueError as e:
+        raise IngestionError([f"Could not parse {filename or 'upload'}: {e}"])
+
+
+def validate_batch(df: pd.DataFrame) -> pd.DataFrame:
+    """Check a batch against the schema and return it with normalized column types"""
+    missing = [c for c in SCHEMA_COLUMNS if c not in df.columns]
+    if missing:
+        raise IngestionError([f"Missing columns: {', '.join(missing)}"])
+    if df.empty:
+        raise IngestionError(["Upload contains no rows"])
+
+    df = df[SCHEMA_COLUMNS].copy()
+    errors = []
+
+    def report(mask, message):
+        rows = df.index[mask].tolist()
+        if rows:
+            shown = ", ".join(str(r) for r in rows[:5])
+            errors.append(f"{message} (rows {shown}{', ...' if len(rows) > 5 else ''})")
+
+    for column in INT_COLUMNS:
+        values = pd.to_numeric(df[column], errors='coerce')
+        report(values.isna() | (values != values.round()), f"'{column}' must be an integer")
+        report(values < 0, f"'{column}' must not be negative")
+        df[column] = values.fillna(0).astype('int64')
+    report(df['views'] <= 0, "'views' must be positive")
+    report(~df['hour'].between(0, 23), "'hour' must be between 0 and 23")
+
+    report(~df['post_type'].isin(POST_TYPES), f"'post_type' must be one of {POST_TYPES}")
+    report(~df['day_of_week'].isin(DAYS), "'day_of_week' must be a weekday name")
+    report(df['post_id'].isna() | df['post_id'].astype(str).duplicated(), "'post_id' must be present and unique")
+
+    timestamps = pd.to_datetime(df['timestamp'], format=TIMESTAMP_FORMAT, errors='coerce')
+    report(timestamps.isna(), f"'timestamp' must match {TIMESTAMP_FORMAT}")
+    valid = timestamps.notna()
+    report(valid & (timestamps.dt.hour != df['hour']), "'hour' does not match 'timestamp'")
+    report(valid & (timestamps.dt.day_name() != df['day_of_week']), "'day_of_week' does not match 'timestamp'")
+
+    if errors:
+        raise IngestionError(errors[:MAX_REPORTED_ERRORS])
+
+    df['post_id'] = df['post_id'].astype(str)
+    df['content'] = df['content'].fillna("").astype(str)
+    return df.reset_index(drop=True)
+
+
+def append_to_csv(df: pd.DataFrame, data_path: str):
+    """Append rows in the same format mock_data_generator.py writes"""
+    write_header = not os.path.exists(data_path)
+    df.to_csv(data_path, mode='a', header=write_header, index=False, quoting=csv.QUOTE_NONNUMERIC)
+
+
+def _file_signature(data_path: str):
+    info = os.stat(data_path)
+    return info.st_size, info.st_mtime_ns
+
+
+def known_post_ids(data_path: str) -> Set[str]:
+    """post_ids already in the data file; read once, then kept up to date by ingest_batch"""
+    if not os.path.exists(data_path):
+        return set()
+    signature = _file_signature(data_path)
+    cached = _known_post_ids.get(data_path)
+    if cached is None or cached[0] != signature:
+        ids = set()
+        for chunk in iter_engagement_frames(data_path, 500_000, ['post_id']):
+            ids.update(chunk['post_id'].astype(str))
+        cached = _known_post_ids[data_path] = (signature, ids)
+    return cached[1]
+
+
+def _truncate(data_path: str, size: Optional[int]):
+    """Cut the data file back to ``size`` bytes, removing it if it didn't exist"""
+    try:
+        if size is None:
+            if os.path.exists(data_path):
+                os.remove(data_path)
+        else:
+            os.truncate(data_path, size)
+    except OSError as e:
+        print(f"Error restoring {data_path} after a failed batch: {e}")
+
+
+def ingest_batch(df: pd.DataFrame, rag, engine, data_path: str) -> Dict[str, Any]:
+    """Fold a validated batch into the data file, running aggregates, stats and FAISS index.
+
+    Work is proportional to the batch: a copy of the small cube adds the new
+    rows to its sums and replaces the engine's cube once the batch is stored,
+    stats are re-derived from those sums, and only the batch's sampled posts
+    and the handful of aggregate documents are embedded. Posts whose post_id
+    is already in the data file are skipped, so re-uploading a file doesn't
+    count it twice. If any step fails, the CSV, cube, stats and index
+    (aggregate documents included) are put back as they were before the batch.
+    """
+    with _ingest_lock:
+        known = known_post_ids(data_path)
+        duplicates = df['post_id'].isin(known)
+        df = df[~duplicates].reset_index(drop=True)
+        if df.empty:
+            return {"rows": 0, "duplicates_skipped": int(duplicates.sum()), "documents_added": 0,
+                    "total_posts": engine.cube.total_posts}
+
+        size = os.path.getsize(data_path) if os.path.exists(data_path) else None
+        checkpoint = rag.checkpoint()
+        document_ids, refreshed = [], None
+        try:
+            # The file goes first, so a disk or permission error leaves nothing else changed
+            append_to_csv(df, data_path)
+            # Analytics requests keep reading the current cube until the batch is complete
+            cube = engine.cube.copy()
+            offset = cube.total_posts
+            cube.add_frame(df)
+            rag.update_stats(cube.rag_stats())
+            document_ids = rag.add_sample_posts(df, offset)
+            refreshed = rag.refresh_aggregate_documents(
+                EngagementAccumulator.from_weekday_sums(cube.by_weekday(), cube.post_types))
+            # Store stats and index under the key of the grown data file
+            rag.persist()
+            engine.cube = cube
+        except BaseException:
+            _truncate(data_path, size)
+            rag.rollback(checkpoint, document_ids, refreshed)
+            raise
+        known.update(df['post_id'])
+        _known_post_ids[data_path] = (_file_signature(data_path), known)
+
+    return {
+        "rows": int(len(df)),
+        "duplicates_skipped": int(duplicates.sum()),
+        "documents_added": len(document_ids),
+        "total_posts": engine.cube.total_posts,
+    }
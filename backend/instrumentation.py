@@ -0,0 +1,268 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from history_store import estimate_tokens
+
+# Seconds; covers cache hits in microseconds up to slow LLM answers and index rebuilds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.labelnames), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in items]
+
+
+class Histogram:
+    """Bucketed observations per label set; ``time()`` observes the duration of a block"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(labels.get(n, "") for n in self.labelnames))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Collected:
+    """Values read from a callback at scrape time, for counts other components already keep.
+
+    ``collect`` returns a number, or a dict from label-value tuples to numbers.
+    """
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Any],
+                 labelnames: Tuple[str, ...] = (), kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {e}")
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in sorted(values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering returns the existing metric, so modules can be reloaded
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collected(self, name: str, documentation: str, collect: Callable[[], Any],
+                  labelnames: Tuple[str, ...] = (), kind: str = "gauge") -> Collected:
+        metric = Collected(name, documentation, collect, labelnames, kind)
+        with self._lock:
+            # Callbacks are replaced, since they close over the current objects
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format, version 0.0.4"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Shared metrics; the app adds collected ones for its components
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_seconds", "Seconds spent in each stage of answering a chat message", ("stage",))
+LOAD_SECONDS = REGISTRY.histogram(
+    "rag_load_seconds", "Seconds spent loading each component in SocialMediaEngagementRAG.load()", ("component",))
+QUERY_SECONDS = REGISTRY.histogram(
+    "rag_query_seconds", "End-to-end seconds of SocialMediaEngagementRAG queries", ("mode",))
+ANSWERS = REGISTRY.counter(
+    "rag_answers_total", "Chat answers by where they came from", ("source",))
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "LLM tokens, as reported by the provider or estimated from the text",
+    ("kind", "source"))
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "rag_queue_wait_seconds", "Seconds chat queries waited for a concurrency slot")
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "Seconds to produce a response, by route template", ("method", "route", "status"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request into HTTP_SECONDS.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so streamed responses pass through
+    untouched and are timed until their last chunk. Routes are labelled by their
+    path template to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route,
+                                 status=str(status[0]))
+
+
+_token_counter_class = None
+
+
+def token_callback():
+    """LangChain callback handler counting one call's prompt and completion tokens into LLM_TOKENS.
+
+    A new handler per call, so prompt estimates of runs that never finish (an
+    abandoned stream) go away with it; discard() drops them right away.
+    """
+    global _token_counter_class
+    if _token_counter_class is None:
+        _token_counter_class = _create_token_counter_class()
+    return _token_counter_class()
+
+
+def _create_token_counter_class():
+    # Deferred import: langchain is only needed once there is an LLM to call
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenCounter(BaseCallbackHandler):
+        def __init__(self):
+            self._prompts = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._prompts[run_id] = sum(estimate_tokens(str(m.content)) for batch in messages for m in batch)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            prompt_estimate = self._prompts.pop(run_id, 0)
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            if usage.get("completion_tokens") is not None:
+                LLM_TOKENS.inc(usage.get("prompt_tokens", 0), kind="prompt", source="reported")
+                LLM_TOKENS.inc(usage["completion_tokens"], kind="completion", source="reported")
+                return
+            text = "".join(g.text for generations in response.generations for g in generations)
+            LLM_TOKENS.inc(prompt_estimate, kind="prompt", source="estimated")
+            LLM_TOKENS.inc(estimate_tokens(text), kind="completion", source="estimated")
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._prompts.pop(run_id, None)
+
+        def discard(self):
+            """Forget runs that ended without on_llm_end or on_llm_error"""
+            self._prompts.clear()
+
+    return TokenCounter
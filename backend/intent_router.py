@@ -0,0 +1,248 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from prompt_context import POST_TYPE_ORDER
+
+GREETING_ANSWER = "Hello! How can I help you analyze your social media engagement today?"
+
+GREETINGS = {'hi', 'hello', 'hey', 'greetings', 'good morning', 'good afternoon', 'good evening', 'hi there', 'hello there'}
+
+# Words that name a post type, including plurals and common synonyms
+POST_TYPE_WORDS = {
+    'reel': ['reel', 'reels'],
+    'image': ['image', 'images', 'photo', 'photos', 'picture', 'pictures'],
+    'carousel': ['carousel', 'carousels'],
+    'video': ['video', 'videos'],
+}
+
+METRIC_WORDS = {
+    'engagement_rate': ['engagement rate', 'engagement rates', 'engagement'],
+    'likes': ['likes', 'like'],
+    'comments': ['comments', 'comment'],
+    'shares': ['shares', 'share'],
+    'views': ['views', 'view', 'reach'],
+}
+
+METRIC_LABELS = {'likes': 'Likes', 'comments': 'Comments', 'shares': 'Shares', 'views': 'Views',
+                 'engagement_rate': 'Engagement Rate'}
+
+# Questions that need reasoning, data the stats don't have, or a time range go to the LLM
+OPEN_ENDED = re.compile(
+    r"\b(why|how (can|do|should|to) (i|we)|improve|increase|boost|strategy|recommend\w*|suggest\w*|"
+    r"advice|tips?|hashtags?|caption|content|trend\w*|last|past|since|between|month|week|year|"
+    r"january|february|march|april|may|june|july|august|september|october|november|december|predict|forecast)\b"
+)
+# Worst/avoid questions and totals are not what the best-of and average templates answer
+CONTRAST = re.compile(r"\b(worst|avoid\w*|lowest|least|total|sum|count|not|never|don't|dont)\b")
+# Weekday, time-of-day and subset qualifiers narrow the question below what the all-days,
+# all-posts templates answer
+QUALIFIER = re.compile(
+    r"\b(mondays?|tuesdays?|wednesdays?|thursdays?|fridays?|saturdays?|sundays?|weekends?|"
+    r"(on|during|over)\s+(the\s+)?weekdays?|\d{1,2}(:\d{2})?\s*(am|pm)|\d{1,2}:\d{2}|at\s+\d|"
+    r"mornings?|afternoons?|evenings?|nights?|noon|midnight|tonight|top\s+\d+|"
+    r"my\s+(top|best|worst|latest|recent|most|last))\b"
+)
+# Follow-ups lean on the conversation ("and for videos?", "why is that?"), which the templates don't see
+FOLLOW_UP = re.compile(r"^(and|also|so|then|what about|how about|same)\b|\b(that|those|them|it|this|these|they)\b")
+SUPERLATIVE = r"(best|optimal|ideal|top|peak)"
+BEST_TIME = re.compile(rf"\b{SUPERLATIVE}\s+(posting\s+)?(time|times|hour|hours)\b"
+                       rf"|\b(what|which)\s+(time|times|hour|hours)\b.*\b{SUPERLATIVE}\b")
+BEST_DAY = re.compile(rf"\b{SUPERLATIVE}\s+(posting\s+)?(week)?days?\b|\b(what|which)\s+(week)?days?\b.*\b{SUPERLATIVE}\b")
+COMPARISON = re.compile(r"\b(compare|comparison|vs\.?|versus|better|best performing|outperform\w*|which post type|which type)\b")
+METRIC_LOOKUP = re.compile(r"\b(average|avg|mean|typical)\b")
+
+# Example questions per intent for embedding classification when no keyword rule fires
+INTENT_EXAMPLES = {
+    'metric_lookup': [
+        "average likes for carousel posts",
+        "how many views do reels get",
+        "what is the engagement rate of videos",
+        "typical number of comments on image posts",
+    ],
+    'best_time': [
+        "what hour should I post reels",
+        "best posting time for videos",
+        "when is the best time to publish images",
+    ],
+    'best_day': [
+        "which day of the week is best for carousels",
+        "best weekday to post reels",
+        "what day gets the most engagement for videos",
+    ],
+    'comparison': [
+        "compare reels and images",
+        "which post type performs best",
+        "are videos better than carousels",
+        "reels versus videos performance",
+    ],
+    'open_ended': [
+        "how can I grow my audience",
+        "why are my image posts underperforming",
+        "write a content strategy for next month",
+        "what hashtags should I use",
+    ],
+}
+
+
+def _find(text: str, vocabulary: Dict[str, List[str]]) -> List[str]:
+    """Keys whose words appear in the text, in order of first mention"""
+    found = []
+    for key, words in vocabulary.items():
+        positions = [m.start() for w in words for m in re.finditer(rf"\b{re.escape(w)}\b", text)]
+        if positions:
+            found.append((min(positions), key))
+    return [key for _, key in sorted(found)]
+
+
+class IntentRouter:
+    """Answers common metric questions from the stats without calling the LLM.
+
+    Keyword rules classify the question first; if none fires and an embedding of
+    the question is available it is compared to example questions per intent.
+    Slots (post types, metric) are always read from the text, and anything that
+    looks open-ended, or whose slots can't be filled, falls through to the LLM.
+    """
+
+    def __init__(self, embeddings=None, threshold: float = None, max_words: int = 20):
+        self.threshold = threshold or float(os.environ.get("RAG_ROUTER_THRESHOLD", 0.6))
+        self.max_words = max_words
+        self.embeddings = embeddings
+        self.hits = {}
+        self.misses = 0
+        self._example_vectors = None
+        self._example_intents = None
+
+    def _examples(self) -> Tuple[np.ndarray, List[str]]:
+        if self._example_vectors is None:
+            intents = [intent for intent, texts in INTENT_EXAMPLES.items() for _ in texts]
+            texts = [text for texts in INTENT_EXAMPLES.values() for text in texts]
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            self._example_vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            self._example_intents = intents
+        return self._example_vectors, self._example_intents
+
+    def _embedding_intent(self, embedding) -> Optional[str]:
+        if self.embeddings is None or embedding is None:
+            return None
+        vectors, intents = self._examples()
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = vectors @ (query / max(np.linalg.norm(query), 1e-12))
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return intents[best]
+
+    def classify(self, query: str, embedding=None) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Intent name and slots for a question; the intent is None when the LLM should answer"""
+        text = query.lower().strip()
+        stripped = text.strip(" !.?")
+        if stripped in GREETINGS:
+            return 'greeting', {}
+
+        slots = {'post_types': _find(text, POST_TYPE_WORDS), 'metrics': _find(text, METRIC_WORDS)}
+        if (len(text.split()) > self.max_words or OPEN_ENDED.search(text) or CONTRAST.search(text)
+                or QUALIFIER.search(text) or FOLLOW_UP.search(text)):
+            return None, slots
+
+        if BEST_DAY.search(text):
+            intent = 'best_day'
+        elif BEST_TIME.search(text):
+            intent = 'best_time'
+        elif COMPARISON.search(text):
+            intent = 'comparison'
+        elif slots['metrics'] and METRIC_LOOKUP.search(text):
+            intent = 'metric_lookup'
+        else:
+            intent = self._embedding_intent(embedding)
+
+        if intent == 'metric_lookup' and not slots['metrics']:
+            intent = None
+        if intent == 'open_ended':
+            intent = None
+        return intent, slots
+
+    def route(self, query: str, stats: Dict[str, Any], embedding=None) -> Optional[str]:
+        """Templated answer for the question, or None if it needs the LLM"""
+        intent, slots = self.classify(query, embedding)
+        answer = None
+        if intent == 'greeting':
+            answer = GREETING_ANSWER
+        elif intent is not None and stats is not None:
+            renderer = getattr(self, f"_render_{intent}")
+            answer = renderer(stats, self._post_types(stats, slots['post_types']), slots['metrics'])
+
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits[intent] = self.hits.get(intent, 0) + 1
+        return answer
+
+    @staticmethod
+    def _post_types(stats: Dict[str, Any], mentioned: List[str]) -> List[str]:
+        available = [pt for pt in POST_TYPE_ORDER if pt in stats['engagement_rate_by_type']]
+        available += [pt for pt in stats['engagement_rate_by_type'] if pt not in available]
+        selected = [pt for pt in mentioned if pt in available]
+        return selected or available
+
+    @staticmethod
+    def _value(stats: Dict[str, Any], metric: str, post_type: str) -> float:
+        if metric == 'engagement_rate':
+            return stats['engagement_rate_by_type'][post_type]
+        return stats['avg_engagement_by_type'][metric][post_type]
+
+    @staticmethod
+    def _format(metric: str, value: float) -> str:
+        return f"{value:.2%}" if metric == 'engagement_rate' else f"{value:.1f}"
+
+    def _render_metric_lookup(self, stats, post_types, metrics) -> str:
+        lines = []
+        for metric in metrics:
+            label = METRIC_LABELS[metric].lower()
+            for pt in post_types:
+                value = self._format(metric, self._value(stats, metric, pt))
+                lines.append(f"- **{pt.capitalize()} posts**: average {label} of {value}")
+        return "\n".join(lines)
+
+    def _render_best_time(self, stats, post_types, metrics) -> str:
+        lines = ["Best posting time by post type, based on average engagement rate:", ""]
+        for pt in post_types:
+            lines.append(f"- **{pt.capitalize()}**: {stats['best_time_by_post_type'][pt]:02d}:00")
+        return "\n".join(lines)
+
+    def _render_best_day(self, stats, post_types, metrics) -> str:
+        lines = ["Best posting day by post type, based on average engagement rate:", ""]
+        for pt in post_types:
+            lines.append(f"- **{pt.capitalize()}**: {stats['best_day_by_post_type'][pt]}")
+        return "\n".join(lines)
+
+    def _render_comparison(self, stats, post_types, metrics) -> str:
+        if len(post_types) < 2:
+            # "How do reels compare?" compares against every other post type
+            post_types = self._post_types(stats, [])
+        rows = metrics or list(METRIC_LABELS)
+        header = "| Metric | " + " | ".join(f"{pt.capitalize()} Posts" for pt in post_types) + " | Better Performer |"
+        lines = [header, "|" + "---|" * (len(post_types) + 2)]
+        for metric in rows:
+            values = {pt: self._value(stats, metric, pt) for pt in post_types}
+            best = max(values, key=values.get)
+            cells = " | ".join(self._format(metric, values[pt]) for pt in post_types)
+            lines.append(f"| {METRIC_LABELS[metric]} | {cells} | {best.capitalize()} |")
+
+        rates = {pt: stats['engagement_rate_by_type'][pt] for pt in post_types}
+        leader = max(rates, key=rates.get)
+        lines += ["", f"Overall recommendation: **{leader.capitalize()}** posts have the highest "
+                      f"engagement rate ({rates[leader]:.2%}), so favour them when engagement is the goal."]
+        return "\n".join(lines)
+
+    def metrics(self) -> Dict[str, Any]:
+        routed = sum(self.hits.values())
+        total = routed + self.misses
+        return {
+            "routed": routed,
+            "to_llm": self.misses,
+            "routed_rate": routed / total if total else 0.0,
+            "by_intent": dict(self.hits),
+        }
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+PROVIDERS = ("groq", "fake", "openai")
+
+# Sentences the fake model draws its answers from
+FAKE_SENTENCES = [
+    "Based on the engagement data, reels reach the most viewers per post.",
+    "Image posts convert views into interactions at the highest rate.",
+    "Carousels sit between images and videos on most metrics.",
+    "Videos earn more shares than images but trail reels on views.",
+    "Posting when your audience is most active lifts engagement rate.",
+    "Compare likes, comments, shares and views together before deciding.",
+    "The differences between post types are consistent across the week.",
+    "Overall recommendation: favour the format with the best engagement rate for your goal.",
+]
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic local chat model for offline load tests and benchmarks.
+
+    The answer depends only on the prompt and ``seed``. ``latency_ms`` is the
+    time to the first token and ``tokens_per_second`` paces the rest, for both
+    invoke and streaming, so it behaves like a remote model without the network.
+    """
+
+    latency_ms: float = 200.0
+    tokens_per_second: float = 50.0
+    response_tokens: int = 120
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-local"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode()).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+        words = []
+        while len(words) < self.response_tokens:
+            words.extend(rng.choice(FAKE_SENTENCES).split())
+        words = words[:self.response_tokens]
+        return [w if i == len(words) - 1 else w + " " for i, w in enumerate(words)]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _result(self, tokens: List[str]) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency_ms / 1000 + len(tokens) * self._token_delay())
+        return self._result(tokens)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency_ms / 1000 + len(tokens) * self._token_delay())
+        return self._result(tokens)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000)
+        for token in self._tokens(messages):
+            time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        for token in self._tokens(messages):
+            await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class OpenAICompatibleChatModel(BaseChatModel):
+    """Chat model for any server speaking the OpenAI /chat/completions API (vLLM, llama.cpp, Ollama...)"""
+
+    base_url: str = "http://localhost:8080/v1"
+    model: str = "local-model"
+    api_key: str = ""
+    temperature: float = 0.0
+    max_tokens: Optional[int] = None
+    timeout: float = 60.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "openai-compatible"
+
+    def _payload(self, messages: List[BaseMessage], stop: Optional[List[str]], stream: bool) -> Dict[str, Any]:
+        roles = {"human": "user", "ai": "assistant", "system": "system"}
+        payload = {
+            "model": self.model,
+            "messages": [{"role": roles.get(m.type, "user"), "content": m.content} for m in messages],
+            "temperature": self.temperature,
+            "stream": stream,
+        }
+        if self.max_tokens:
+            payload["max_tokens"] = self.max_tokens
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    def _request(self, messages, stop, stream: bool) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        return {
+            "url": f"{self.base_url.rstrip('/')}/chat/completions",
+            "json": self._payload(messages, stop, stream),
+            "headers": headers,
+        }
+
+    @staticmethod
+    def _result(body: Dict[str, Any]) -> ChatResult:
+        content = body["choices"][0]["message"].get("content") or ""
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    @staticmethod
+    def _delta(line: str) -> Optional[str]:
+        """Text of one server-sent event line, "" for non-content lines, None at the end of the stream"""
+        if not line.startswith("data:"):
+            return ""
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+        choices = json.loads(data).get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content") or ""
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        with httpx.Client(timeout=self.timeout) as client:
+            response = client.post(**self._request(messages, stop, False))
+            response.raise_for_status()
+            return self._result(response.json())
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(**self._request(messages, stop, False))
+            response.raise_for_status()
+            return self._result(response.json())
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        with httpx.Client(timeout=self.timeout) as client:
+            with client.stream("POST", **self._request(messages, stop, True)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    text = self._delta(line)
+                    if text is None:
+                        break
+                    if text:
+                        yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with client.stream("POST", **self._request(messages, stop, True)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    text = self._delta(line)
+                    if text is None:
+                        break
+                    if text:
+                        yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+def create_llm(provider: str = None) -> BaseChatModel:
+    """Chat model for RAG_LLM_PROVIDER: "groq" (default), "fake" or "openai" (any compatible server)"""
+    provider = provider or os.environ.get("RAG_LLM_PROVIDER", "groq")
+    if provider == "groq":
+        # Deferred import: only needed when talking to Groq
+        from langchain_groq import ChatGroq
+        return ChatGroq(model=os.environ.get("RAG_LLM_MODEL", "llama3-8b-8192"))  # Use a smaller model for memory
+    if provider == "fake":
+        return FakeChatModel(
+            latency_ms=float(os.environ.get("RAG_FAKE_LATENCY_MS", 200)),
+            tokens_per_second=float(os.environ.get("RAG_FAKE_TOKENS_PER_SEC", 50)),
+            response_tokens=int(os.environ.get("RAG_FAKE_RESPONSE_TOKENS", 120)),
+            seed=int(os.environ.get("RAG_FAKE_SEED", 0)),
+        )
+    if provider == "openai":
+        return OpenAICompatibleChatModel(
+            base_url=os.environ.get("RAG_LLM_BASE_URL", "http://localhost:8080/v1"),
+            model=os.environ.get("RAG_LLM_MODEL", "local-model"),
+            api_key=os.environ.get("RAG_LLM_API_KEY", ""),
+            timeout=float(os.environ.get("RAG_LLM_TIMEOUT", 60)),
+        )
+    raise ValueError(f"Unknown RAG_LLM_PROVIDER '{provider}', expected one of {', '.join(PROVIDERS)}")
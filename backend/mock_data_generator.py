@@ -3,7 +3,12 @@ import numpy as np
 from faker import Faker
 import random
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from functools import lru_cache
+import argparse
 import csv
+import os
 
 # Initialize Faker
 fake = Faker()
@@ -23,6 +28,24 @@ PEAK_HOURS = [
 # Days with higher engagement probability
 PEAK_DAYS = ['Saturday', 'Sunday', 'Friday']
 
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# (low, high) multiplier ranges per post type, in POST_TYPES order, matching generate_mock_data:
+# likes scale the base likes, the other metrics scale likes
+METRIC_RANGES = {
+    'likes': np.array([(1.5, 3.0), (0.7, 1.5), (1.0, 2.0), (1.2, 2.5)]),
+    'comments': np.array([(0.05, 0.2), (0.03, 0.1), (0.04, 0.15), (0.04, 0.18)]),
+    'shares': np.array([(0.1, 0.3), (0.05, 0.15), (0.08, 0.2), (0.08, 0.25)]),
+    'views': np.array([(10, 30), (3, 10), (5, 15), (8, 25)]),
+}
+PEAK_HOUR_BOOST = (1.2, 1.5)
+PEAK_DAY_BOOST = (1.1, 1.3)
+
+# Captions and hashtag strings are drawn from pools built once per seed with Faker
+CAPTION_POOL_SIZE = 5000
+HASHTAG_POOL_SIZE = 2000
+DEFAULT_CHUNK_SIZE = 250_000
+
 # Generate mock data
 def generate_mock_data(num_records=5000):
     data = []
@@ -103,13 +126,168 @@ def generate_mock_data(num_records=5000):
     
     return pd.DataFrame(data)
 
+@lru_cache(maxsize=4)
+def _content_pools(seed):
+    """Captions of 1-5 sentences and strings of 0-5 hashtags, the same for every chunk of a seed"""
+    pool_fake = Faker()
+    pool_fake.seed_instance(seed)
+    pool_random = random.Random(seed)
+    captions = [" ".join(pool_fake.sentences(pool_random.randint(1, 5))) for _ in range(CAPTION_POOL_SIZE)]
+    hashtags = [" ".join(f"#{pool_fake.word()}" for _ in range(pool_random.randint(0, 5)))
+                for _ in range(HASHTAG_POOL_SIZE)]
+    return captions, hashtags
+
+def _scale(values, rng, low, high):
+    # int() truncation like the row-by-row generator; all values are non-negative
+    return (values * rng.uniform(low, high)).astype(np.int64)
+
+def generate_chunk(task):
+    """One chunk of rows drawn with NumPy; ``task`` is (chunk_index, rows, seed, start_ts, end_ts).
+
+    Each chunk has its own random stream derived from (seed, chunk_index), so the
+    output doesn't depend on how many processes generate it.
+    """
+    index, rows, seed, start_ts, end_ts = task
+    rng = np.random.default_rng([seed, index])
+    
+    seconds = rng.integers(start_ts, end_ts, rows)
+    hours = (seconds % 86400) // 3600
+    # 1970-01-01 was a Thursday
+    day_idx = (seconds // 86400 + 3) % 7
+    type_idx = rng.integers(0, len(POST_TYPES), rows)
+    
+    # Base engagement metrics, adjusted by post type
+    base_likes = rng.integers(10, 1001, rows)
+    likes = _scale(base_likes, rng, *METRIC_RANGES['likes'][type_idx].T)
+    metrics = {'likes': likes}
+    for name in ('comments', 'shares', 'views'):
+        metrics[name] = _scale(likes, rng, *METRIC_RANGES[name][type_idx].T)
+    
+    # Adjust for time of day and day of week
+    is_peak_hour = np.zeros(rows, dtype=bool)
+    for start, end in PEAK_HOURS:
+        is_peak_hour |= (hours >= start) & (hours <= end)
+    is_peak_day = np.isin(day_idx, [DAYS.index(d) for d in PEAK_DAYS])
+    for mask, (low, high) in ((is_peak_hour, PEAK_HOUR_BOOST), (is_peak_day, PEAK_DAY_BOOST)):
+        for name in ('likes', 'comments', 'shares', 'views'):
+            boosted = _scale(metrics[name], rng, low, high)
+            metrics[name] = np.where(mask, boosted, metrics[name])
+    
+    captions, hashtags = _content_pools(seed)
+    caption_idx = rng.integers(0, len(captions), rows)
+    hashtag_idx = rng.integers(0, len(hashtags), rows)
+    content = [f"{captions[c]} {hashtags[h]}" if hashtags[h] else captions[c]
+               for c, h in zip(caption_idx.tolist(), hashtag_idx.tolist())]
+    
+    # Random version 4 UUIDs from the chunk's stream
+    hex_ids = rng.bytes(16 * rows).hex()
+    post_ids = [f"{hex_ids[i:i + 8]}-{hex_ids[i + 8:i + 12]}-4{hex_ids[i + 13:i + 16]}-"
+                f"{'89ab'[int(hex_ids[i + 16], 16) & 3]}{hex_ids[i + 17:i + 20]}-{hex_ids[i + 20:i + 32]}"
+                for i in range(0, 32 * rows, 32)]
+    timestamps = [t.replace('T', ' ') for t in seconds.astype('datetime64[s]').astype(str).tolist()]
+    
+    return pd.DataFrame({
+        'post_id': post_ids,
+        'post_type': np.array(POST_TYPES)[type_idx],
+        'timestamp': timestamps,
+        'likes': metrics['likes'],
+        'comments': metrics['comments'],
+        'shares': metrics['shares'],
+        'views': metrics['views'],
+        'content': content,
+        'day_of_week': np.array(DAYS)[day_idx],
+        'hour': hours,
+    })
+
+def _chunk_tasks(num_records, seed, chunk_size, end_date):
+    # A fixed end date keeps the output reproducible; default to the start of today
+    end_date = end_date or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end_ts = int(end_date.timestamp())
+    start_ts = int((end_date - timedelta(days=365)).timestamp())
+    return [(i, min(chunk_size, num_records - start), seed, start_ts, end_ts)
+            for i, start in enumerate(range(0, num_records, chunk_size))]
+
+def generate_mock_data_vectorized(num_records=5000, seed=42, chunk_size=DEFAULT_CHUNK_SIZE, end_date=None):
+    """Vectorized equivalent of generate_mock_data, returned as one DataFrame"""
+    chunks = [generate_chunk(task) for task in _chunk_tasks(num_records, seed, chunk_size, end_date)]
+    return pd.concat(chunks, ignore_index=True) if chunks else generate_chunk((0, 0, seed, 0, 1))
+
+def _iter_chunks(tasks, workers):
+    """Generated chunks in order, with at most two chunks per worker in flight"""
+    if workers <= 1:
+        for task in tasks:
+            yield generate_chunk(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(generate_chunk, task))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def write_mock_data(output_file, num_records, seed=42, chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+                    end_date=None, file_format=None):
+    """Generate ``num_records`` rows across a process pool and stream them to CSV or Parquet"""
+    file_format = file_format or ('parquet' if output_file.endswith('.parquet') else 'csv')
+    workers = workers or os.cpu_count() or 1
+    tasks = _chunk_tasks(num_records, seed, chunk_size, end_date)
+    
+    writer = None
+    if file_format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow") from None
+    elif file_format != 'csv':
+        raise ValueError(f"Unknown format '{file_format}', expected csv or parquet")
+    
+    written = 0
+    try:
+        for i, chunk in enumerate(_iter_chunks(tasks, workers)):
+            if file_format == 'parquet':
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(output_file, mode='w' if i == 0 else 'a', header=i == 0,
+                             index=False, quoting=csv.QUOTE_NONNUMERIC)
+            written += len(chunk)
+            print(f"  {written:,}/{num_records:,} rows written", flush=True)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
 # Generate and save data
 def main():
-    print("Generating 5000 records of mock social media engagement data...")
-    df = generate_mock_data(5000)
+    parser = argparse.ArgumentParser(description="Generate mock social media engagement data")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--output", default='social_media_engagement_data.csv',
+                        help="CSV file, or Parquet when it ends in .parquet")
+    parser.add_argument("--mode", choices=['vectorized', 'faker'], default='vectorized',
+                        help="vectorized NumPy chunks, or the original row-by-row Faker generator")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=lambda s: datetime.strptime(s, '%Y-%m-%d'), default=None,
+                        help="last day of the generated year (YYYY-MM-DD), default today")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="generator processes, default one per CPU")
+    args = parser.parse_args()
+    
+    print(f"Generating {args.rows} records of mock social media engagement data...")
+    output_file = args.output
+    if args.mode == 'vectorized':
+        write_mock_data(output_file, args.rows, seed=args.seed, chunk_size=args.chunk_size,
+                        workers=args.workers, end_date=args.end_date)
+        print(f"Data successfully saved to {output_file}")
+        return
+    
+    df = generate_mock_data(args.rows)
     
     # Save to CSV
-    output_file = 'social_media_engagement_data.csv'
     df.to_csv(output_file, index=False, quoting=csv.QUOTE_NONNUMERIC)
     print(f"Data successfully saved to {output_file}")
     
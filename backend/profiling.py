@@ -0,0 +1,219 @@
+import os
+import re
+import hmac
+import time
+import random
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from artifacts import resolve_path
+
+# Fraction of HTTP requests profiled at random; 0 leaves only header-triggered profiles
+SAMPLE_RATE = float(os.environ.get("RAG_PROFILE_SAMPLE_RATE", 0))
+# Requests whose header carries RAG_PROFILE_TOKEN are profiled, and the admin endpoints
+# require the same header. Without a token both are off unless
+# RAG_PROFILE_ALLOW_UNAUTHENTICATED=1, meant for local development only.
+PROFILE_HEADER = os.environ.get("RAG_PROFILE_HEADER", "X-Profile").lower()
+PROFILE_TOKEN = os.environ.get("RAG_PROFILE_TOKEN", "")
+ALLOW_UNAUTHENTICATED = os.environ.get("RAG_PROFILE_ALLOW_UNAUTHENTICATED", "0") == "1"
+# Profile the stats/index rebuild inside load()
+PROFILE_LOAD = os.environ.get("RAG_PROFILE_LOAD", "0") == "1"
+# Seconds between pyinstrument samples
+SAMPLE_INTERVAL = float(os.environ.get("RAG_PROFILE_INTERVAL", 0.001))
+
+# Paths that are never profiled: scrapes and the profile downloads themselves
+SKIP_PREFIXES = ("/metrics", "/api/admin/profiles")
+
+PROFILE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class ProfileStore:
+    """Profiles on disk, newest ``keep`` files kept.
+
+    pyinstrument profiles are written as speedscope JSON (open at speedscope.app,
+    which draws them as flame graphs); cProfile ones as pstats files, which
+    flameprof, snakeviz or gprof2dot turn into flame graphs or call graphs.
+    """
+
+    def __init__(self, directory: str = None, keep: int = None):
+        self.directory = directory or resolve_path(os.environ.get("RAG_PROFILE_DIR", "profiles"))
+        self.keep = keep or int(os.environ.get("RAG_PROFILE_KEEP", 50))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id(label: str, extension: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")[:80] or "profile"
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug}{extension}"
+
+    def save(self, name: str, data: bytes):
+        """Write a profile and prune the oldest beyond ``keep``"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = os.path.join(self.directory, f".tmp-{name}")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(self.directory, name))
+            for old in self.list()[self.keep:]:
+                try:
+                    os.remove(os.path.join(self.directory, old["id"]))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Profiles newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                info = entry.stat()
+                profiles.append({"id": entry.name, "bytes": info.st_size, "created": info.st_mtime,
+                                 "format": "speedscope" if entry.name.endswith(".json") else "pstats"})
+        return sorted(profiles, key=lambda p: (p["created"], p["id"]), reverse=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """File of a stored profile, or None; ids are bare file names, never paths"""
+        if not PROFILE_NAME.match(profile_id) or profile_id.startswith("."):
+            return None
+        path = os.path.join(self.directory, profile_id)
+        return path if os.path.isfile(path) else None
+
+
+class _Session:
+    """One running profiler: pyinstrument when installed, cProfile otherwise"""
+
+    def __init__(self, async_mode: bool = False):
+        try:
+            from pyinstrument import Profiler
+            self.kind = "pyinstrument"
+            # async_mode follows the awaiting coroutine instead of whatever else runs on the loop
+            self._profiler = Profiler(interval=SAMPLE_INTERVAL, async_mode="enabled" if async_mode else "disabled")
+            self.extension = ".json"
+        except ImportError:
+            import cProfile
+            self.kind = "cprofile"
+            self._profiler = cProfile.Profile()
+            self.extension = ".pstats"
+
+    def start(self):
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def output(self) -> bytes:
+        """The profile in a flame-graph-compatible format, see ProfileStore"""
+        if self.kind == "pyinstrument":
+            from pyinstrument.renderers import SpeedscopeRenderer
+            return self._profiler.output(SpeedscopeRenderer()).encode()
+        import marshal
+        self._profiler.create_stats()
+        return marshal.dumps(self._profiler.stats)
+
+
+# Profiling hooks are per thread and a second profiler on the same thread would
+# replace the first, so each thread runs one profile at a time; requests arriving
+# on the event loop meanwhile are served unprofiled
+_active_threads = set()
+_active_lock = threading.Lock()
+store = ProfileStore()
+
+
+def _claim_thread() -> bool:
+    with _active_lock:
+        if threading.get_ident() in _active_threads:
+            return False
+        _active_threads.add(threading.get_ident())
+        return True
+
+
+@contextmanager
+def profiled(label: str, enabled: bool = True, async_mode: bool = False):
+    """Profile the block into the store; yields the profile id, or None when skipped"""
+    if not enabled or not _claim_thread():
+        yield None
+        return
+    try:
+        session = _Session(async_mode)
+        try:
+            session.start()
+            name = store.new_id(label, session.extension)
+        except (RuntimeError, ValueError) as e:
+            # e.g. Python 3.12+ allows one cProfile per interpreter, not per thread
+            print(f"Not profiling {label}: {e}")
+            name = None
+        if name is None:
+            yield None
+            return
+        try:
+            yield name
+        finally:
+            session.stop()
+            try:
+                store.save(name, session.output())
+            except Exception as e:
+                print(f"Error saving profile {name}: {e}")
+    finally:
+        with _active_lock:
+            _active_threads.discard(threading.get_ident())
+
+
+def _token_matches(value: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN) and value is not None and hmac.compare_digest(value.encode(), PROFILE_TOKEN.encode())
+
+
+def profile_requested(headers: Dict[str, str]) -> bool:
+    value = headers.get(PROFILE_HEADER)
+    if PROFILE_TOKEN:
+        return _token_matches(value)
+    return ALLOW_UNAUTHENTICATED and value not in (None, "", "0")
+
+
+def admin_allowed(headers: Dict[str, str]) -> bool:
+    if PROFILE_TOKEN:
+        return _token_matches(headers.get(PROFILE_HEADER))
+    return ALLOW_UNAUTHENTICATED
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling sampled or header-flagged requests.
+
+    The profile id is returned in an ``X-Profile-Id`` response header and the
+    file is written once the response has been sent. Only the event-loop thread
+    is profiled, so work handed to the worker pools shows up as time spent
+    awaiting it. pyinstrument attributes samples to the profiled request's
+    coroutine; cProfile also records other requests interleaved on the loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        wanted = profile_requested(headers) or (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE)
+        if not wanted:
+            await self.app(scope, receive, send)
+            return
+
+        with profiled(f"{scope['method']} {scope['path']}", async_mode=True) as name:
+            if name is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", [])) + [(b"x-profile-id", name.encode())]
+                    message = dict(message, headers=headers)
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
@@ -0,0 +1,65 @@
+import json
+from typing import Dict, Iterable, List
+
+# Order used when rendering the full summary; unknown post types are appended after these
+POST_TYPE_ORDER = ['reel', 'image', 'video', 'carousel']
+
+
+class StatsContext:
+    """Pre-rendered prompt context for one version of the engagement stats.
+
+    The full summary and one fragment per post type are formatted once when the
+    stats change, so building a prompt is just a string join.
+    """
+
+    def __init__(self, stats: Dict, version: int = 0):
+        self.version = version
+        self.post_types = self._ordered_post_types(stats)
+        self.header = """
+        SOCIAL MEDIA ANALYTICS SUMMARY
+        ============================
+
+        POST TYPE PERFORMANCE METRICS:
+        """
+        self.fragments = {pt: self._render_post_type(stats, pt) for pt in self.post_types}
+        self.footer = f"""
+        OTHER STATISTICS:
+        - Total posts analyzed: {stats['total_posts']}
+        - Post type distribution: {json.dumps(stats['post_type_distribution'])}
+        """
+        self.full = self._join(self.post_types)
+
+    @staticmethod
+    def _ordered_post_types(stats: Dict) -> List[str]:
+        available = list(stats['engagement_rate_by_type'].keys())
+        ordered = [pt for pt in POST_TYPE_ORDER if pt in available]
+        return ordered + [pt for pt in available if pt not in ordered]
+
+    @staticmethod
+    def _render_post_type(stats: Dict, post_type: str) -> str:
+        averages = stats['avg_engagement_by_type']
+        return f"""
+        {post_type.upper()} POSTS:
+        - Average likes: {averages['likes'][post_type]:.1f}
+        - Average comments: {averages['comments'][post_type]:.1f}
+        - Average shares: {averages['shares'][post_type]:.1f}
+        - Average views: {averages['views'][post_type]:.1f}
+        - Best posting time: {stats['best_time_by_post_type'][post_type]:02d}:00 hours
+        - Best posting day: {stats['best_day_by_post_type'][post_type]}
+        - Average engagement rate: {stats['engagement_rate_by_type'][post_type]:.2%}
+        """
+
+    def _join(self, post_types: List[str]) -> str:
+        return self.header + "".join(self.fragments[pt] for pt in post_types) + self.footer
+
+    def render(self, post_types: Iterable[str] = None) -> str:
+        """Summary restricted to the given post types, or the full summary when none match"""
+        selected = [pt for pt in (post_types or []) if pt in self.fragments]
+        if not selected or len(selected) == len(self.post_types):
+            return self.full
+        return self._join(selected)
+
+    def post_types_in(self, text: str) -> List[str]:
+        """Post types mentioned in free text, e.g. "reels" or "Carousel" """
+        text = text.lower()
+        return [pt for pt in self.post_types if pt in text]
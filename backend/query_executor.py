@@ -0,0 +1,101 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from instrumentation import QUEUE_WAIT_SECONDS
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many queries are already waiting for a slot"""
+
+
+class BoundedQueryExecutor:
+    """Runs RAG work off the event loop with a cap on in-flight and queued queries.
+
+    Async work (``aquery``) is gated by a semaphore, blocking work (model loading,
+    index rebuilds) runs on a small dedicated thread pool so it never stalls the loop.
+    """
+
+    def __init__(self, max_concurrency: int = None, max_workers: int = None, max_queue: int = None):
+        self.max_concurrency = max_concurrency or int(os.environ.get("RAG_MAX_CONCURRENCY", 8))
+        self.max_workers = max_workers or int(os.environ.get("RAG_WORKER_THREADS", 4))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get("RAG_MAX_QUEUE", 100))
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rag-worker")
+
+        # Queue metrics
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def _acquire(self):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"Query queue is full ({self.max_queue} waiting)")
+
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        wait = time.perf_counter() - start
+        QUEUE_WAIT_SECONDS.observe(wait)
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.active += 1
+
+    def _release(self, ok: bool):
+        self.active -= 1
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a concurrency slot for the duration of the block, e.g. a streamed answer"""
+        await self._acquire()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._release(ok)
+
+    async def run(self, coro_fn, *args, **kwargs) -> Any:
+        """Await an async callable once a concurrency slot is free"""
+        async with self.slot():
+            return await coro_fn(*args, **kwargs)
+
+    async def run_blocking(self, fn, *args) -> Any:
+        """Run a blocking callable on the worker pool without holding a query slot"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, fn, *args)
+
+    def metrics(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "worker_threads": self.max_workers,
+            "queue_depth": self.queued,
+            "active": self.active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (self.total_wait / finished * 1000) if finished else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+
+class SemanticResponseCache:
+    """Caches LLM answers keyed by the embedding of the question.
+
+    Past questions live in a small inner-product FAISS index over normalized
+    vectors, so a lookup returns the answer of the closest previous question when
+    its cosine similarity is above ``threshold``. Entries are evicted LRU-first
+    once ``max_entries`` is reached and expire after ``ttl_seconds``. The whole
+    cache is dropped when the stats file changes on disk.
+    """
+
+    def __init__(self, stats_path: str = "stats.json", threshold: float = None,
+                 max_entries: int = None, ttl_seconds: float = None):
+        self.stats_path = stats_path
+        self.threshold = threshold or float(os.environ.get("RAG_CACHE_THRESHOLD", 0.92))
+        self.max_entries = max_entries or int(os.environ.get("RAG_CACHE_SIZE", 512))
+        self.ttl_seconds = ttl_seconds or float(os.environ.get("RAG_CACHE_TTL", 3600))
+
+        self._lock = threading.Lock()
+        self._index = None
+        self._entries = OrderedDict()  # id -> (scope, answer, created_at)
+        self._next_id = 0
+        self._stats_signature = self._signature()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _signature(self):
+        try:
+            st = os.stat(self.stats_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vec)
+        return vec
+
+    def _check_stats(self):
+        signature = self._signature()
+        if signature != self._stats_signature:
+            self._clear()
+            self._stats_signature = signature
+            self.invalidations += 1
+
+    def _clear(self):
+        self._index = None
+        self._entries.clear()
+
+    def _remove(self, entry_id: int):
+        self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def lookup(self, vector, scope: str = "") -> Optional[str]:
+        """Return a cached answer for a near-identical question in the same scope, if any"""
+        vec = self._normalize(vector)
+        with self._lock:
+            self._check_stats()
+            if self._index is None or not self._entries:
+                self.misses += 1
+                return None
+
+            now = time.time()
+            k = min(len(self._entries), 8)
+            scores, ids = self._index.search(vec, k)
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id == -1 or score < self.threshold:
+                    break
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                entry_scope, answer, created_at = entry
+                if now - created_at > self.ttl_seconds:
+                    self._remove(int(entry_id))
+                    continue
+                if entry_scope != scope:
+                    continue
+                self._entries.move_to_end(int(entry_id))
+                self.hits += 1
+                return answer
+
+            self.misses += 1
+            return None
+
+    def store(self, vector, answer: str, scope: str = ""):
+        """Add an answer to the cache, evicting the least recently used entry if full"""
+        vec = self._normalize(vector)
+        with self._lock:
+            self._check_stats()
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vec.shape[1]))
+
+            while len(self._entries) >= self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vec, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (scope, answer, time.time())
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+            self.invalidations += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
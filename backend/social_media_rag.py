@@ -1,40 +1,209 @@
 import os
+import asyncio
+from contextlib import contextmanager
 import pandas as pd
 import numpy as np
-from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from prompt_context import StatsContext
+from intent_router import IntentRouter, GREETING_ANSWER
+from streaming_stats import EngagementAccumulator, read_engagement_csv, peak_rss_mb
+from columnar_store import read_engagement_frame
+from artifacts import ArtifactManager, resolve_path
+from embedding_pipeline import DEFAULT_EMBEDDING_MODEL, EmbeddingCache, EmbeddingPipeline, load_embedding_model
+from instrumentation import ANSWERS, LOAD_SECONDS, QUERY_SECONDS, STAGE_SECONDS, token_callback
+from profiling import PROFILE_LOAD, profiled
 from typing import List, Dict, Any
 
 from datetime import datetime
 import json
+import time
+import textwrap
 
 # Set environment variables for API keys (you should set these in your environment)
 os.environ["GROQ_API_KEY"] = "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"  # Replace with your actual key
 
+QA_TEMPLATE = """
+        You are a Social Media Analytics Expert specializing in post engagement analysis.
+        
+        Here is the current social media performance data:
+        {context}
+        
+        Previous conversation:
+        {chat_history}
+        
+        Based on the above data, answer this question: {input}
+        
+        IMPORTANT GUIDELINES:
+        1. ONLY use metrics shown in the data above. DO NOT make up or hallucinate data.
+        2. For post type comparisons:
+           - ALWAYS compare ALL metrics (likes, comments, shares, views, engagement rate)
+           - Present metrics in a properly formatted markdown table with aligned columns
+           - Use the exact table format shown in the example below
+           - Highlight which type performs better in each metric
+           - Format numbers with appropriate precision (1 decimal for engagement metrics, 2 decimals for percentages)
+           - Provide a clear overall recommendation
+        3. If asked about timing, hashtags, or other data not shown above, state that this information is not available.
+        4. Keep responses factual and data-driven, avoiding speculation.
+        5. If the data shows something different from what you might expect, trust the data.
+        
+        Example comparison format:
+        When comparing different post types:
+        
+        | Metric          | Reel Posts | Image Posts | Video Posts | Carousel Posts | Better Performer |
+        |-----------------|------------|-------------|-------------|----------------|------------------|
+        | Likes           | X          | X           | X           | X              | [Type]           |
+        | Comments        | X          | X           | X           | X              | [Type]           |
+        | Shares          | X          | X           | X           | X              | [Type]           |
+        | Views           | X          | X           | X           | X              | [Type]           |
+        | Engagement Rate | X%         | X%          | X%          | X%             | [Type]           |
+        
+        Overall recommendation: [Clear statement based on the data]
+        
+        Format your response in a clear, structured way using markdown.
+        """
+
+# The prompt only depends on the template, so parse it once
+QA_PROMPT = ChatPromptTemplate.from_template(QA_TEMPLATE)
+
+# Only every Nth post is indexed as a sample document
+SAMPLE_POST_EVERY = 100
+
+# Documents rendered from the aggregates alone, re-rendered when a batch changes the stats
+AGGREGATE_DOCUMENT_TYPES = ("statistics", "post_type_analysis", "time_analysis", "day_analysis")
+
+# Metadata fields that retrieval can be filtered on
+RETRIEVAL_FILTER_KEYS = ("document_type", "post_type", "day", "hour")
+
 class SocialMediaEngagementRAG:
-    def __init__(self, data_path="social_media_engagement_data.csv"):
-        self.data_path = data_path
+    def __init__(self, data_path="social_media_engagement_data.csv", retrieval_k=None, chunksize=None,
+                 retrieval=None, llm_provider=None):
+        self.data_path = resolve_path(data_path)
+        # Rows per chunk for the streaming rebuild; 0/None reads the whole CSV at once
+        self.chunksize = chunksize or int(os.environ.get("RAG_CSV_CHUNKSIZE", 0)) or None
+        self.load_report = None
+        # Seconds spent loading each component, filled in by load()
+        self.load_timings = {}
+        self._summary = None
+        # Without retrieval the embedding model and FAISS index are never loaded and
+        # answers are grounded in the pre-rendered stats only
+        self.retrieval = os.environ.get("RAG_RETRIEVAL", "1") == "1" if retrieval is None else retrieval
+        # Chat model backend: groq, fake (local, deterministic) or openai (compatible HTTP server)
+        self.llm_provider = llm_provider or os.environ.get("RAG_LLM_PROVIDER", "groq")
+        self.retrieval_k = retrieval_k or int(os.environ.get("RAG_TOP_K", 4))
+        self.embedding_model = os.environ.get("RAG_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+        # stats.json and the FAISS index live under keys derived from the data and the model
+        self.artifacts = ArtifactManager()
+        self.stats_path = None
+        self.index_path = None
         self.embeddings = None
+        self.embedding_pipeline = None
+        # FAISS index type and parameters (RAG_INDEX_*), read by load() when retrieval is on
+        self.index_spec = None
+        self.response_cache = None
+        self.intent_router = None
         self.llm = None
         self.vector_store = None
+        self.stats_version = 0
         self.stats = None
         self.prompt = None
+        self._stats_context = None
+        self._qa_chain = None
+        self._qa_chain_llm = None
         self._loaded = False
         self.df = None
+        # (data hash, AnalyticsEngine) behind generate_charts
+        self._chart_engine = None
+
+    @property
+    def stats(self):
+        return self._stats
+
+    @stats.setter
+    def stats(self, value):
+        # Every assignment is a new data version, which invalidates pre-rendered context
+        self._stats = value
+        self.stats_version += 1
+
+    @contextmanager
+    def _timed(self, component: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.load_timings[component] = time.perf_counter() - start
+            LOAD_SECONDS.observe(self.load_timings[component], component=component)
+
+    def _load_embeddings(self):
+        return load_embedding_model(self.embedding_model, int(os.environ.get("RAG_EMBED_BATCH_SIZE", 64)))
+
+    def _create_embedding_pipeline(self) -> EmbeddingPipeline:
+        # Vectors are cached next to the other artifacts, keyed by model and text
+        cache = None
+        if os.environ.get("RAG_EMBED_CACHE", "1") == "1":
+            cache = EmbeddingCache(os.path.join(self.artifacts.root, "embeddings.sqlite"))
+        return EmbeddingPipeline(self.embeddings, self.embedding_model, cache)
+
+    def _embed_documents(self, documents: List[Document]):
+        """Texts, their vectors and metadata for FAISS, embedded through the pipeline"""
+        if self.embedding_pipeline is None:
+            self.embedding_pipeline = self._create_embedding_pipeline()
+        texts = [d.page_content for d in documents]
+        return texts, self.embedding_pipeline.embed(texts), [d.metadata for d in documents]
+
+    def _load_llm(self):
+        from llm_providers import create_llm
+        return create_llm(self.llm_provider)
+
+    def _needs_index(self) -> bool:
+        return self.retrieval and self.vector_store is None
+
+    def _resolve_artifacts(self):
+        """Artifact paths for the current data file, embedding model and document schema"""
+        if not os.path.exists(self.data_path):
+            # Nothing to key on: fall back to whatever was built last
+            print(f"Data file {self.data_path} not found, using the latest artifacts")
+            self.stats_path = self.artifacts.latest("stats")
+            self.index_path = self.artifacts.latest("faiss")
+            return
+        data_hash = self.artifacts.data_hash(self.data_path)
+        self.stats_path = self.artifacts.stats_path(data_hash)
+        self.index_path = self.artifacts.index_path(data_hash, self.embedding_model, SAMPLE_POST_EVERY,
+                                                    self._index_build_key())
+
+    def _index_build_key(self) -> Dict[str, Any]:
+        if self.index_spec is None:
+            return {"type": "flat"}
+        from vector_index import build_key
+        return build_key(self.index_spec)
+
+    def _load_stats(self):
+        if self.stats is None and self.stats_path and os.path.exists(self.stats_path):
+            try:
+                with open(self.stats_path, "r") as f:
+                    self.stats = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Error loading {self.stats_path}, will regenerate")
+                self.stats = None
+
+    def _load_index(self):
+        if self._needs_index() and self.index_path and os.path.exists(self.index_path):
+            from langchain_community.vectorstores import FAISS
+            from vector_index import configure_search
+            try:
+                self.vector_store = FAISS.load_local(self.index_path, self.embeddings)
+                configure_search(self.vector_store.index, self.index_spec)
+            except Exception as e:
+                print(f"Error loading FAISS index: {e}, will regenerate")
+                self.vector_store = None
 
     def load(self):
         if self._loaded:
             return
         
         # Load embeddings and LLM lazily
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        self.llm = ChatGroq(model="llama3-8b-8192")  # Use a smaller model for memory
+        with self._timed("llm"):
+            self.llm = self._load_llm()
         self.prompt = PromptTemplate.from_template(
             """You are a helpful social media analytics assistant. Based on the following context, 
             answer the user's question. If the user is just greeting you (saying hi, hello, etc.), 
@@ -46,233 +215,376 @@ class SocialMediaEngagementRAG:
             Answer: """
         )
         
+        if self.retrieval:
+            from vector_index import index_spec_from_env
+            self.index_spec = index_spec_from_env()
+        with self._timed("fingerprint"):
+            self._resolve_artifacts()
+        
         # Load stats from JSON if available
-        stats_path = "stats.json"
         self.stats = None
-        if os.path.exists(stats_path):
-            try:
-                with open(stats_path, "r") as f:
-                    self.stats = json.load(f)
-            except json.JSONDecodeError:
-                print("Error loading stats.json, will regenerate")
-                self.stats = None
+        with self._timed("stats"):
+            self._load_stats()
         
-        # Load FAISS index if present
-        index_path = "faiss_index"
-        if os.path.exists(index_path):
-            try:
-                self.vector_store = FAISS.load_local(index_path, self.embeddings)
-            except Exception as e:
-                print(f"Error loading FAISS index: {e}, will regenerate")
-                self.vector_store = None
+        if self.retrieval:
+            with self._timed("embeddings"):
+                self.embeddings = self._load_embeddings()
+            
+            # Load FAISS index if present
+            with self._timed("vector_store"):
+                self._load_index()
         
-        # If vector_store is None or stats is None, regenerate from CSV
-        if self.vector_store is None or self.stats is None:
+        # Rebuild whichever of stats and index is missing for the current key
+        if self._needs_index() or self.stats is None:
             if not os.path.exists(self.data_path):
                 raise RuntimeError("Stats not found and data file missing. Cannot initialize analytics.")
             
-            self.df = pd.read_csv(self.data_path)
-            if self.stats is None:
-                self._generate_statistical_summaries(self.df)
-            
-            if self.vector_store is None:
-                documents = self._create_documents(self.df)
-                self.vector_store = FAISS.from_documents(documents, self.embeddings)
-                self.vector_store.save_local(index_path)
+            # RAG_PROFILE_LOAD=1 writes a profile of each rebuild, see /api/admin/profiles
+            with self._timed("rebuild"), self.artifacts.lock("rebuild"), profiled("load-rebuild", PROFILE_LOAD):
+                # Another worker may have built them while we waited for the lock
+                self._load_stats()
+                self._load_index()
+                if self.chunksize and (self._needs_index() or self.stats is None):
+                    self._rebuild_streaming()
+                elif self._needs_index() or self.stats is None:
+                    self.df = read_engagement_frame(self.data_path)
+                    if self.stats is None:
+                        self._generate_statistical_summaries(self.df)
+                    
+                    if self._needs_index():
+                        self._build_index(self._create_documents(self.df))
+        
+        # Semantic cache of past answers, invalidated whenever stats.json changes.
+        # Lookups are keyed by query embeddings, so it needs retrieval enabled.
+        if self.retrieval and os.environ.get("RAG_CACHE_ENABLED", "1") == "1":
+            from semantic_cache import SemanticResponseCache
+            self.response_cache = SemanticResponseCache(self.stats_path)
+        
+        # Templated answers for common metric questions, ahead of the LLM
+        if os.environ.get("RAG_ROUTER_ENABLED", "1") == "1":
+            self.intent_router = IntentRouter(self.embeddings)
         
         self._loaded = True
 
+    def _build_index(self, documents: List[Document]):
+        from langchain_community.vectorstores import FAISS
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from vector_index import create_index
+        texts, vectors, metadatas = self._embed_documents(documents)
+        report = self.embedding_pipeline.metrics()
+        print(f"Embedded {report['embedded']} of {report['texts']} documents "
+              f"({report['cached']} cached) in {report['seconds']:.1f}s")
+        # IVF and PQ quantizers are trained on (a sample of) the vectors before they are added
+        index = create_index(self.index_spec, vectors)
+        self.vector_store = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+        self.vector_store.add_embeddings(list(zip(texts, vectors.tolist())), metadatas=metadatas)
+        self.artifacts.write_dir(self.index_path, self.vector_store.save_local)
+
+    def _rebuild_streaming(self):
+        """Rebuild stats and documents in one bounded-memory pass over the CSV"""
+        start = time.perf_counter()
+        summary = EngagementAccumulator(sample_every=SAMPLE_POST_EVERY)
+        for chunk in read_engagement_csv(self.data_path, self.chunksize):
+            summary.add_chunk(chunk)
+        
+        if self.stats is None:
+            self.stats = summary.to_stats()
+            self._save_stats()
+        
+        if self._needs_index():
+            self._build_index(self._summary_documents(summary))
+        
+        self.load_report = {
+            "mode": "streaming",
+            "rows": summary.rows,
+            "chunks": summary.chunks,
+            "seconds": time.perf_counter() - start,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        print(f"Streamed {summary.rows} rows in {summary.chunks} chunks, peak RSS {self.load_report['peak_rss_mb']:.1f} MB")
+
     def _unload(self):
         """Unload resources to save memory"""
         if self.df is not None:
             del self.df
             self.df = None
+        self._summary = None
+
+    def close(self):
+        """Release the embedding workers and cache; called when the app shuts down"""
+        if self.embedding_pipeline is not None:
+            self.embedding_pipeline.close()
+            self.embedding_pipeline = None
+
+    def _summarize(self, df) -> EngagementAccumulator:
+        """One grouped pass over the frame, shared by the stats and the documents of a rebuild"""
+        if self._summary is None or self._summary[0] is not df:
+            self._summary = (df, EngagementAccumulator.from_frame(df, sample_every=SAMPLE_POST_EVERY))
+        return self._summary[1]
 
     def _generate_statistical_summaries(self, df):
         """Generate statistical summaries to be included in the vector store"""
-        # Convert NumPy types to native Python types
-        def convert_numpy_types(obj):
-            if isinstance(obj, dict):
-                return {k: convert_numpy_types(v) for k, v in obj.items()}
-            elif isinstance(obj, (list, tuple)):
-                return [convert_numpy_types(item) for item in obj]
-            elif isinstance(obj, (np.int8, np.int16, np.int32, np.int64,
-                               np.uint8, np.uint16, np.uint32, np.uint64)):
-                return int(obj)
-            elif isinstance(obj, (np.float16, np.float32, np.float64)):
-                return float(obj)
-            return obj
-
-        # Common statistics across all data
-        self.stats = {
-            "total_posts": int(len(df)),
-            "post_type_distribution": convert_numpy_types(df['post_type'].value_counts().to_dict()),
-            "avg_engagement_by_type": convert_numpy_types(df.groupby('post_type')[['likes', 'comments', 'shares', 'views']].mean().to_dict()),
-            "best_time_by_post_type": {},
-            "best_day_by_post_type": {},
-            "engagement_rate_by_type": {}
-        }
-        
         # Calculate engagement rate (likes + comments + shares) / views
         df['engagement_rate'] = (df['likes'] + df['comments'] + df['shares']) / df['views']
         
-        # Find best posting times by post type
-        for post_type in df['post_type'].unique():
-            post_type_df = df[df['post_type'] == post_type]
-            
-            # Best hour analysis
-            hour_engagement = post_type_df.groupby('hour')['engagement_rate'].mean().sort_values(ascending=False)
-            if not hour_engagement.empty:
-                self.stats["best_time_by_post_type"][post_type] = int(hour_engagement.index[0])
-            else:
-                self.stats["best_time_by_post_type"][post_type] = 12  # Default to noon if no data
-            
-            # Best day analysis
-            day_engagement = post_type_df.groupby('day_of_week')['engagement_rate'].mean().sort_values(ascending=False)
-            if not day_engagement.empty:
-                self.stats["best_day_by_post_type"][post_type] = str(day_engagement.index[0])
-            else:
-                self.stats["best_day_by_post_type"][post_type] = "Monday"  # Default to Monday if no data
-            
-            # Overall engagement rate
-            self.stats["engagement_rate_by_type"][post_type] = float(post_type_df['engagement_rate'].mean())
+        self.stats = self._summarize(df).to_stats()
         
         # Save stats to JSON for reuse
-        with open("stats.json", "w") as f:
-            json.dump(self.stats, f)
+        self._save_stats()
 
     def _create_documents(self, df) -> List[Document]:
         """Convert dataframe rows and statistics into LangChain documents"""
-        documents = []
+        return self._summary_documents(self._summarize(df))
+
+    def _summary_documents(self, summary: EngagementAccumulator) -> List[Document]:
+        """Build the same documents as _create_documents from one-pass aggregates"""
+        documents = self._aggregate_documents(summary)
+        post_types = summary.post_types()
         
-        # Add overall statistics document
-        stat_doc = Document(
+        for post_type in post_types:
+            avg_hashtags, avg_text_length = summary.top_decile_content(post_type)
+            documents.append(self._recommendations_document(
+                post_type, self._recommendations_text(post_type, avg_hashtags, avg_text_length)
+            ))
+        
+        for _, row in summary.sample_frame().iterrows():
+            documents.append(self._sample_post_document(row))
+        
+        return documents
+
+    def _aggregate_documents(self, summary: EngagementAccumulator) -> List[Document]:
+        """The statistics, post type and time analysis documents (AGGREGATE_DOCUMENT_TYPES)"""
+        documents = [self._statistics_document()]
+        post_types = summary.post_types()
+        
+        for post_type in post_types:
+            hour_engagement = summary.hour_rates(post_type)
+            top_hours = hour_engagement.head(3).index.tolist() if not hour_engagement.empty else [12, 18, 9]
+            day_engagement = summary.day_rates(post_type)
+            top_days = day_engagement.head(3).index.tolist() if not day_engagement.empty else ["Monday", "Thursday", "Saturday"]
+            documents.append(self._post_type_document(post_type, summary.means(post_type), top_hours, top_days))
+        
+        documents.extend(self._time_analysis_documents(
+            self._hour_analysis_text(summary.hour_rates(), post_types),
+            self._day_analysis_text(summary.day_rates(), post_types),
+        ))
+        return documents
+
+    def _statistics_document(self) -> Document:
+        """Overall statistics document, built from self.stats"""
+        return Document(
+        page_content=f"""
+        SOCIAL MEDIA ANALYTICS SUMMARY
+        ============================
+        
+        POST TYPE PERFORMANCE METRICS:
+        
+        REEL POSTS:
+        - Average likes: {self.stats['avg_engagement_by_type']['likes']['reel']:.1f}
+        - Average comments: {self.stats['avg_engagement_by_type']['comments']['reel']:.1f}
+        - Average shares: {self.stats['avg_engagement_by_type']['shares']['reel']:.1f}
+        - Average views: {self.stats['avg_engagement_by_type']['views']['reel']:.1f}
+        
+        IMAGE POSTS:
+        - Average likes: {self.stats['avg_engagement_by_type']['likes']['image']:.1f}
+        - Average comments: {self.stats['avg_engagement_by_type']['comments']['image']:.1f}
+        - Average shares: {self.stats['avg_engagement_by_type']['shares']['image']:.1f}
+        - Average views: {self.stats['avg_engagement_by_type']['views']['image']:.1f}
+        
+        VIDEO POSTS:
+        - Average likes: {self.stats['avg_engagement_by_type']['likes']['video']:.1f}
+        - Average comments: {self.stats['avg_engagement_by_type']['comments']['video']:.1f}
+        - Average shares: {self.stats['avg_engagement_by_type']['shares']['video']:.1f}
+        - Average views: {self.stats['avg_engagement_by_type']['views']['video']:.1f}
+        
+        CAROUSEL POSTS:
+        - Average likes: {self.stats['avg_engagement_by_type']['likes']['carousel']:.1f}
+        - Average comments: {self.stats['avg_engagement_by_type']['comments']['carousel']:.1f}
+        - Average shares: {self.stats['avg_engagement_by_type']['shares']['carousel']:.1f}
+        - Average views: {self.stats['avg_engagement_by_type']['views']['carousel']:.1f}
+        
+        OTHER STATISTICS:
+        - Total posts analyzed: {self.stats['total_posts']}
+        - Post type distribution: {json.dumps(self.stats['post_type_distribution'])}
+        """,
+        metadata={
+            "document_type": "statistics",
+            "source": "aggregated_data"
+        }
+    )
+
+    def _post_type_document(self, post_type: str, means: Dict[str, float], top_hours: list, top_days: list) -> Document:
+        """Detailed analysis document for one post type"""
+        return Document(
             page_content=f"""
-            SOCIAL MEDIA ANALYTICS SUMMARY
-            ============================
-            
-            POST TYPE PERFORMANCE METRICS:
-            
-            REEL POSTS:
-            - Average likes: {self.stats['avg_engagement_by_type']['likes']['reel']:.1f}
-            - Average comments: {self.stats['avg_engagement_by_type']['comments']['reel']:.1f}
-            - Average shares: {self.stats['avg_engagement_by_type']['shares']['reel']:.1f}
-            - Average views: {self.stats['avg_engagement_by_type']['views']['reel']:.1f}
-            
-            IMAGE POSTS:
-            - Average likes: {self.stats['avg_engagement_by_type']['likes']['image']:.1f}
-            - Average comments: {self.stats['avg_engagement_by_type']['comments']['image']:.1f}
-            - Average shares: {self.stats['avg_engagement_by_type']['shares']['image']:.1f}
-            - Average views: {self.stats['avg_engagement_by_type']['views']['image']:.1f}
-            
-            VIDEO POSTS:
-            - Average likes: {self.stats['avg_engagement_by_type']['likes']['video']:.1f}
-            - Average comments: {self.stats['avg_engagement_by_type']['comments']['video']:.1f}
-            - Average shares: {self.stats['avg_engagement_by_type']['shares']['video']:.1f}
-            - Average views: {self.stats['avg_engagement_by_type']['views']['video']:.1f}
-            
-            CAROUSEL POSTS:
-            - Average likes: {self.stats['avg_engagement_by_type']['likes']['carousel']:.1f}
-            - Average comments: {self.stats['avg_engagement_by_type']['comments']['carousel']:.1f}
-            - Average shares: {self.stats['avg_engagement_by_type']['shares']['carousel']:.1f}
-            - Average views: {self.stats['avg_engagement_by_type']['views']['carousel']:.1f}
-            
-            OTHER STATISTICS:
-            - Total posts analyzed: {self.stats['total_posts']}
-            - Post type distribution: {json.dumps(self.stats['post_type_distribution'])}
+            Detailed analysis for {post_type} posts:
+            Average likes: {means['likes']:.1f}
+            Average comments: {means['comments']:.1f}
+            Average shares: {means['shares']:.1f}
+            Average views: {means['views']:.1f}
+            Engagement rate: {means['engagement_rate']:.3f}
+            Best posting hours: {top_hours}
+            Best posting days: {top_days}
+            Post count: {means['count']}
+            Performance compared to other types: {self._get_comparative_rank(post_type)}
             """,
             metadata={
-                "document_type": "statistics",
-                "source": "aggregated_data"
+                "document_type": "post_type_analysis",
+                "post_type": post_type
             }
         )
-        documents.append(stat_doc)
-        
-        # Add detailed post type analysis documents
-        for post_type in df['post_type'].unique():
-            pt_df = df[df['post_type'] == post_type]
-            
-            # Time analysis
-            hour_engagement = pt_df.groupby('hour')['engagement_rate'].mean().sort_values(ascending=False)
-            top_hours = hour_engagement.head(3).index.tolist() if not hour_engagement.empty else [12, 18, 9]
-            
-            # Day analysis
-            day_engagement = pt_df.groupby('day_of_week')['engagement_rate'].mean().sort_values(ascending=False)
-            top_days = day_engagement.head(3).index.tolist() if not day_engagement.empty else ["Monday", "Thursday", "Saturday"]
-            
-            doc = Document(
-                page_content=f"""
-                Detailed analysis for {post_type} posts:
-                Average likes: {pt_df['likes'].mean():.1f}
-                Average comments: {pt_df['comments'].mean():.1f}
-                Average shares: {pt_df['shares'].mean():.1f}
-                Average views: {pt_df['views'].mean():.1f}
-                Engagement rate: {pt_df['engagement_rate'].mean():.3f}
-                Best posting hours: {top_hours}
-                Best posting days: {top_days}
-                Post count: {len(pt_df)}
-                Performance compared to other types: {self._get_comparative_rank(df, post_type)}
-                """,
-                metadata={
-                    "document_type": "post_type_analysis",
-                    "post_type": post_type
-                }
-            )
-            documents.append(doc)
-        
-        # Add hour and day of week analysis
+
+    def _time_analysis_documents(self, hour_text: str, day_text: str) -> List[Document]:
+        """Hour of day and day of week analysis documents"""
         hour_doc = Document(
             page_content=f"""
             Hour of day engagement analysis:
-            {self._format_hour_analysis(df)}
+            {hour_text}
             """,
             metadata={"document_type": "time_analysis"}
         )
-        documents.append(hour_doc)
-        
         day_doc = Document(
             page_content=f"""
             Day of week engagement analysis:
-            {self._format_day_analysis(df)}
+            {day_text}
             """,
             metadata={"document_type": "day_analysis"}
         )
-        documents.append(day_doc)
-        
-        # Add "improvement recommendations" documents specific to each post type
-        for post_type in df['post_type'].unique():
-            doc = Document(
-                page_content=self._get_improvement_recommendations(df, post_type),
-                metadata={
-                    "document_type": "recommendations",
-                    "post_type": post_type
-                }
-            )
-            documents.append(doc)
-        
-        # Add sample post data (every 100th post to avoid too many documents)
-        for i, row in df.iloc[::100].iterrows():
-            doc = Document(
-                page_content=f"""
-                Sample {row['post_type']} post:
-                Posted: {row['timestamp']} ({row['day_of_week']} at hour {row['hour']})
-                Content: {row['content']}
-                Performance: {row['likes']} likes, {row['comments']} comments, {row['shares']} shares, {row['views']} views
-                Engagement rate: {(row['likes'] + row['comments'] + row['shares']) / row['views']:.3f}
-                """,
-                metadata={
-                    "document_type": "sample_post",
-                    "post_type": row['post_type'],
-                    "post_id": row['post_id'],
-                    "day": row['day_of_week'],
-                    "hour": row['hour']
-                }
-            )
-            documents.append(doc)
-        
-        return documents
+        return [hour_doc, day_doc]
+
+    def _recommendations_document(self, post_type: str, text: str) -> Document:
+        return Document(
+            page_content=text,
+            metadata={
+                "document_type": "recommendations",
+                "post_type": post_type
+            }
+        )
+
+    def _sample_post_document(self, row) -> Document:
+        """Document for a single sampled post"""
+        return Document(
+            page_content=f"""
+            Sample {row['post_type']} post:
+            Posted: {row['timestamp']} ({row['day_of_week']} at hour {row['hour']})
+            Content: {row['content']}
+            Performance: {row['likes']} likes, {row['comments']} comments, {row['shares']} shares, {row['views']} views
+            Engagement rate: {(row['likes'] + row['comments'] + row['shares']) / row['views']:.3f}
+            """,
+            metadata={
+                "document_type": "sample_post",
+                "post_type": row['post_type'],
+                "post_id": row['post_id'],
+                "day": row['day_of_week'],
+                "hour": int(row['hour'])
+            }
+        )
+
+    def add_sample_posts(self, df, offset: int) -> List[str]:
+        """Embed and index only the sampled posts of a new batch; returns their docstore ids.
+
+        ``offset`` is the number of posts already ingested, so the batch keeps the
+        same every-Nth-post sampling as a full rebuild.
+        """
+        if self.vector_store is None:
+            return []
+        positions = np.arange(offset, offset + len(df))
+        sampled = df[positions % SAMPLE_POST_EVERY == 0]
+        documents = [self._sample_post_document(row) for _, row in sampled.iterrows()]
+        if not documents:
+            return []
+        texts, vectors, metadatas = self._embed_documents(documents)
+        return self.vector_store.add_embeddings(list(zip(texts, vectors.tolist())), metadatas=metadatas)
+
+    def refresh_aggregate_documents(self, summary: EngagementAccumulator) -> Dict[str, Any]:
+        """Replace the indexed aggregate documents with ones rendered from ``summary`` and the
+        current stats, so retrieval agrees with them after a batch; returns what rollback() needs.
+
+        The new documents are embedded and the old ones deleted. Indexes that can't delete
+        vectors (HNSW) keep the old vectors, whose documents are swapped for the new text.
+        """
+        refreshed = {"added": [], "removed": {}, "swapped": {}}
+        if self.vector_store is None:
+            return refreshed
+        from vector_index import supports_removal
+        docstore = self.vector_store.docstore._dict
+        old = {doc_id: doc for doc_id, doc in docstore.items()
+               if doc.metadata.get("document_type") in AGGREGATE_DOCUMENT_TYPES}
+        documents = self._aggregate_documents(summary)
+
+        if not supports_removal(self.vector_store.index):
+            by_key = {(doc.metadata["document_type"], doc.metadata.get("post_type")): doc_id
+                      for doc_id, doc in old.items()}
+            new = []
+            for document in documents:
+                doc_id = by_key.get((document.metadata["document_type"], document.metadata.get("post_type")))
+                if doc_id is None:
+                    new.append(document)
+                else:
+                    refreshed["swapped"][doc_id] = docstore[doc_id]
+                    docstore[doc_id] = document
+            documents = new
+            old = {}
+
+        if documents:
+            texts, vectors, metadatas = self._embed_documents(documents)
+            refreshed["added"] = self.vector_store.add_embeddings(list(zip(texts, vectors.tolist())),
+                                                                  metadatas=metadatas)
+        if old:
+            self.vector_store.delete(list(old))
+            refreshed["removed"] = old
+        return refreshed
+
+    def update_stats(self, stats: Dict[str, Any]):
+        """Replace the stats with an incrementally updated version; persist() saves them"""
+        self.stats = stats
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """What ingesting a batch changes, for rollback() if the batch fails"""
+        return {"stats": self.stats, "stats_path": self.stats_path, "index_path": self.index_path}
+
+    def rollback(self, checkpoint: Dict[str, Any], document_ids: List[str], refreshed: Dict[str, Any] = None):
+        """Undo a failed batch: restore the stats and artifact paths, drop its documents and
+        put back the aggregate documents refresh_aggregate_documents() replaced"""
+        self.stats = checkpoint["stats"]
+        self.stats_path = checkpoint["stats_path"]
+        self.index_path = checkpoint["index_path"]
+        if self.response_cache is not None:
+            self.response_cache.stats_path = self.stats_path
+        if self.vector_store is None:
+            return
+        refreshed = refreshed or {"added": [], "removed": {}, "swapped": {}}
+        try:
+            self.vector_store.docstore._dict.update(refreshed["swapped"])
+            added = list(document_ids) + list(refreshed["added"])
+            if added:
+                self.vector_store.delete(added)
+            removed = refreshed["removed"]
+            if removed:
+                texts, vectors, metadatas = self._embed_documents(list(removed.values()))
+                self.vector_store.add_embeddings(list(zip(texts, vectors.tolist())), metadatas=metadatas,
+                                                 ids=list(removed))
+        except Exception as e:
+            # Not every index type can remove vectors; reload the last saved one instead
+            print(f"Reloading FAISS index after a failed batch: {e}")
+            self.vector_store = None
+            self._load_index()
+
+    def persist(self):
+        """Save stats and index under the keys of the data file as it is now, e.g. after an append"""
+        self._resolve_artifacts()
+        if self.stats is not None:
+            self._save_stats()
+        if self.vector_store is not None:
+            self.artifacts.write_dir(self.index_path, self.vector_store.save_local)
+
+    def _save_stats(self):
+        self.artifacts.write_json(self.stats_path, self.stats)
+        if self.response_cache is not None:
+            # Answers cached against the previous stats are dropped on the next lookup
+            self.response_cache.stats_path = self.stats_path
     
-    def _get_comparative_rank(self, df, post_type):
+    def _get_comparative_rank(self, post_type):
         """Generate comparative analysis text for a given post type"""
         # Get average metrics for this post type
         metrics = self.stats['avg_engagement_by_type']
@@ -303,9 +615,8 @@ class SocialMediaEngagementRAG:
         
         return result
     
-    def _format_hour_analysis(self, df):
-        """Format hour-by-hour engagement analysis"""
-        hour_engagement = df.groupby('hour')['engagement_rate'].mean().sort_values(ascending=False)
+    def _hour_analysis_text(self, hour_engagement, post_types):
+        """Hour analysis from mean engagement per hour, sorted best first"""
         top_hours = hour_engagement.head(5).index.tolist() if not hour_engagement.empty else [12, 18, 9, 19, 20]
         bottom_hours = hour_engagement.tail(5).index.tolist() if not hour_engagement.empty else [3, 4, 5, 2, 1]
         
@@ -314,16 +625,14 @@ class SocialMediaEngagementRAG:
         
         # Add type-specific best hours
         result += "Best hours by post type:\n"
-        for post_type in df['post_type'].unique():
+        for post_type in post_types:
             best_hour = self.stats["best_time_by_post_type"][post_type]
             result += f"- {post_type}: {best_hour}:00\n"
         
         return result
     
-    def _format_day_analysis(self, df):
-        """Format day-by-day engagement analysis"""
-        day_engagement = df.groupby('day_of_week')['engagement_rate'].mean().sort_values(ascending=False)
-        
+    def _day_analysis_text(self, day_engagement, post_types):
+        """Day analysis from mean engagement per weekday, sorted best first"""
         result = "Day of week engagement ranking (best to worst):\n"
         if not day_engagement.empty:
             for i, (day, rate) in enumerate(day_engagement.items(), 1):
@@ -332,29 +641,17 @@ class SocialMediaEngagementRAG:
             result += "(No day-specific engagement data available)\n"
         
         result += "\nBest days by post type:\n"
-        for post_type in df['post_type'].unique():
+        for post_type in post_types:
             best_day = self.stats["best_day_by_post_type"][post_type]
             result += f"- {post_type}: {best_day}\n"
         
         return result
     
-    def _get_improvement_recommendations(self, df, post_type):
-        """Generate improvement recommendations for a specific post type"""
-        pt_df = df[df['post_type'] == post_type]
+    def _recommendations_text(self, post_type, avg_hashtags, avg_text_length):
+        """Recommendation text for a post type given its top-decile content stats"""
         best_hour = self.stats["best_time_by_post_type"][post_type]
         best_day = self.stats["best_day_by_post_type"][post_type]
         
-        # Find high-performing content patterns
-        high_engagement_count = max(1, int(len(pt_df) * 0.1))  # Ensure at least 1 row
-        high_engagement = pt_df.nlargest(high_engagement_count, 'engagement_rate')
-        
-        avg_hashtags = 0
-        avg_text_length = 0
-        
-        if not high_engagement.empty:
-            avg_hashtags = high_engagement['content'].apply(lambda x: x.count('#') if isinstance(x, str) else 0).mean()
-            avg_text_length = high_engagement['content'].apply(lambda x: len(x) if isinstance(x, str) else 0).mean()
-        
         recommendations = f"""
         Improvement recommendations for {post_type} posts:
         
@@ -403,231 +700,294 @@ class SocialMediaEngagementRAG:
         return recommendations
     
     def create_qa_chain(self):
-        """Create a QA chain for answering questions about the engagement data"""
-        # Create a prompt template for answering questions
-        template = """
-        You are a Social Media Analytics Expert specializing in post engagement analysis.
-        
-        Here is the current social media performance data:
-        {context}
-        
-        Previous conversation:
-        {chat_history}
-        
-        Based on the above data, answer this question: {input}
-        
-        IMPORTANT GUIDELINES:
-        1. ONLY use metrics shown in the data above. DO NOT make up or hallucinate data.
-        2. For post type comparisons:
-           - ALWAYS compare ALL metrics (likes, comments, shares, views, engagement rate)
-           - Present metrics in a properly formatted markdown table with aligned columns
-           - Use the exact table format shown in the example below
-           - Highlight which type performs better in each metric
-           - Format numbers with appropriate precision (1 decimal for engagement metrics, 2 decimals for percentages)
-           - Provide a clear overall recommendation
-        3. If asked about timing, hashtags, or other data not shown above, state that this information is not available.
-        4. Keep responses factual and data-driven, avoiding speculation.
-        5. If the data shows something different from what you might expect, trust the data.
-        
-        Example comparison format:
-        When comparing different post types:
-        
-        | Metric          | Reel Posts | Image Posts | Video Posts | Carousel Posts | Better Performer |
-        |-----------------|------------|-------------|-------------|----------------|------------------|
-        | Likes           | X          | X           | X           | X              | [Type]           |
-        | Comments        | X          | X           | X           | X              | [Type]           |
-        | Shares          | X          | X           | X           | X              | [Type]           |
-        | Views           | X          | X           | X           | X              | [Type]           |
-        | Engagement Rate | X%         | X%          | X%          | X%             | [Type]           |
-        
-        Overall recommendation: [Clear statement based on the data]
-        
-        Format your response in a clear, structured way using markdown.
-        """
-        
-        # Create a simple chain that uses the provided context
-        return ChatPromptTemplate.from_template(template) | self.llm
+        """Return the QA chain for answering questions, building it once per LLM instance"""
+        if self._qa_chain is None or self._qa_chain_llm is not self.llm:
+            self._qa_chain = QA_PROMPT | self.llm
+            self._qa_chain_llm = self.llm
+        return self._qa_chain
+
+    def _get_stats_context(self) -> StatsContext:
+        """Pre-rendered stats context, rebuilt only when the stats change"""
+        if self._stats_context is None or self._stats_context.version != self.stats_version:
+            self._stats_context = StatsContext(self.stats, self.stats_version)
+        return self._stats_context
     
-    def query(self, query: str, chat_history: List[tuple] = None) -> str:
+    def _direct_answer(self, query: str):
+        """Return a canned answer for queries that don't need the LLM, otherwise None"""
+        # Check for greetings
+        query_lower = query.lower()
+        greetings = ['hi', 'hello', 'hey', 'greetings']
+        if any(greeting == query_lower.strip() for greeting in greetings):
+            return GREETING_ANSWER
+
+        # Fail gracefully if stats is missing
+        if self.stats is None:
+            return "Sorry, analytics data is currently unavailable. Please try again later or contact support."
+        return None
+
+    def _normalize_filters(self, filters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Keep only supported metadata filters, with values in the types stored on the documents"""
+        if not filters:
+            return {}
+        normalized = {}
+        for key, value in filters.items():
+            if key not in RETRIEVAL_FILTER_KEYS or value is None:
+                continue
+            values = value if isinstance(value, (list, tuple)) else [value]
+            if key == "hour":
+                values = [int(v) for v in values]
+            else:
+                values = [str(v) for v in values]
+            normalized[key] = values if len(values) > 1 else values[0]
+        return normalized
+
+    def retrieve(self, query: str, k: int = None, filters: Dict[str, Any] = None,
+                 embedding: List[float] = None) -> List[Document]:
+        """Run a similarity search against the FAISS index, optionally restricted by metadata"""
+        if self.vector_store is None:
+            return []
+        if embedding is None:
+            embedding = self.embeddings.embed_query(query)
+        k = k or self.retrieval_k
+        filters = self._normalize_filters(filters)
+        if filters:
+            # FAISS filters after the search, so over-fetch to still fill k
+            return self.vector_store.similarity_search_by_vector(
+                embedding, k=k, filter=filters, fetch_k=max(k * 10, 50)
+            )
+        return self.vector_store.similarity_search_by_vector(embedding, k=k)
+
+    def _cache_scope(self, k: int = None, filters: Dict[str, Any] = None) -> str:
+        """Answers are only reused for the same retrieval settings"""
+        return json.dumps([k or self.retrieval_k, self._normalize_filters(filters)], sort_keys=True)
+
+    def _cached_or_retrieve(self, query: str, k: int = None, filters: Dict[str, Any] = None,
+                            use_cache: bool = True):
+        """Embed the query once, try the intent router and the response cache, and fall back to retrieval.
+
+        Returns a ``(answer, embedding, documents)`` tuple where ``answer`` is a routed
+        or cached answer, or None when the LLM has to answer from ``documents``.
+        """
+        embedding = self.embeddings.embed_query(query) if self.embeddings is not None else None
+        # Explicit retrieval filters ask for document-grounded answers, so skip the router
+        if self.intent_router is not None and not filters:
+            routed = self.intent_router.route(query, self.stats, embedding)
+            if routed is not None:
+                ANSWERS.inc(source="routed")
+                return routed, embedding, []
+        if embedding is None:
+            return None, None, []
+        if self.response_cache is not None and use_cache:
+            cached = self.response_cache.lookup(embedding, self._cache_scope(k, filters))
+            if cached is not None:
+                ANSWERS.inc(source="cached")
+                return cached, embedding, []
+        return None, embedding, self.retrieve(query, k, filters, embedding)
+
+    @staticmethod
+    def _cacheable(chat_history: List[tuple] = None, history_summary: str = None) -> bool:
+        """Answers given in a conversation may depend on it, so they are neither served from
+        nor stored in the response cache, which is shared by all users"""
+        return not chat_history and not history_summary
+
+    def _cache_answer(self, embedding, answer: str, k: int = None, filters: Dict[str, Any] = None,
+                      use_cache: bool = True):
+        if self.response_cache is not None and embedding is not None and use_cache:
+            self.response_cache.store(embedding, answer, self._cache_scope(k, filters))
+
+    def _prepare_query(self, query: str, chat_history: List[tuple] = None, documents: List[Document] = None,
+                       filters: Dict[str, Any] = None, history_summary: str = None):
+        """Build the QA chain and its inputs for a query"""
+        chain = self.create_qa_chain()
+        
+        # Format chat history: the rolling summary of older turns, then recent turns verbatim
+        formatted_history = []
+        if history_summary:
+            formatted_history.append(f"Summary of earlier conversation:\n{history_summary}")
+        if chat_history:
+            for human, ai in chat_history:
+                if human is not None:
+                    formatted_history.extend([f"Human: {human}"])
+                if ai is not None:
+                    formatted_history.extend([f"Assistant: {ai}"])
+        
+        if documents:
+            context = "\n\n".join(textwrap.dedent(doc.page_content).strip() for doc in documents)
+        else:
+            # No retrieval results: use the pre-rendered stats, narrowed to the post types asked about
+            stats_context = self._get_stats_context()
+            post_types = self._normalize_filters(filters).get("post_type") or stats_context.post_types_in(query)
+            if isinstance(post_types, str):
+                post_types = [post_types]
+            context = stats_context.render(post_types)
+        
+        inputs = {
+            "input": query,
+            "context": context,
+            "chat_history": "\n".join(formatted_history) if formatted_history else ""
+        }
+        return chain, inputs
+
+    @staticmethod
+    def _result_text(result) -> str:
+        if not result or not hasattr(result, 'content'):
+            raise ValueError("Invalid response from LLM chain")
+        return result.content
+
+    def _record_error(self, e: Exception):
+        import traceback
+        ANSWERS.inc(source="error")
+        print(f"Error in query method: {str(e)}")
+        print(traceback.format_exc())
+
+    def _query_error(self, e: Exception) -> str:
+        self._record_error(e)
+        return f"An error occurred while processing your request: {str(e)}"
+
+    def _direct_or_none(self, query: str):
+        answer = self._direct_answer(query)
+        if answer is not None:
+            ANSWERS.inc(source="direct")
+        return answer
+
+    def _safe_unload(self):
         try:
-            self.load()
-            # Check for greetings
-            query_lower = query.lower()
-            greetings = ['hi', 'hello', 'hey', 'greetings']
-            if any(greeting == query_lower.strip() for greeting in greetings):
-                return "Hello! How can I help you analyze your social media engagement today?"
-
-            # Fail gracefully if stats is missing
-            if self.stats is None:
-                return "Sorry, analytics data is currently unavailable. Please try again later or contact support."
-            
-            # Create the QA chain if not already created
-            chain = self.create_qa_chain()
-            
-            # Format chat history
-            formatted_history = []
-            if chat_history:
-                for human, ai in chat_history:
-                    if human is not None:
-                        formatted_history.extend([f"Human: {human}"])
-                    if ai is not None:
-                        formatted_history.extend([f"Assistant: {ai}"])
-            
-            # Calculate engagement rates as percentages for display
-            engagement_rates = {}
-            for post_type, rate in self.stats['engagement_rate_by_type'].items():
-                engagement_rates[post_type] = f"{rate:.2%}"
-            
-            # Format statistics directly
-            stats_content = f"""
-            SOCIAL MEDIA ANALYTICS SUMMARY
-            ============================
-            
-            POST TYPE PERFORMANCE METRICS:
-            
-            REEL POSTS:
-            - Average likes: {self.stats['avg_engagement_by_type']['likes']['reel']:.1f}
-            - Average comments: {self.stats['avg_engagement_by_type']['comments']['reel']:.1f}
-            - Average shares: {self.stats['avg_engagement_by_type']['shares']['reel']:.1f}
-            - Average views: {self.stats['avg_engagement_by_type']['views']['reel']:.1f}
-            - Best posting time: {self.stats['best_time_by_post_type']['reel']:02d}:00 hours
-            - Best posting day: {self.stats['best_day_by_post_type']['reel']}
-            - Average engagement rate: {engagement_rates['reel']}
-            
-            IMAGE POSTS:
-            - Average likes: {self.stats['avg_engagement_by_type']['likes']['image']:.1f}
-            - Average comments: {self.stats['avg_engagement_by_type']['comments']['image']:.1f}
-            - Average shares: {self.stats['avg_engagement_by_type']['shares']['image']:.1f}
-            - Average views: {self.stats['avg_engagement_by_type']['views']['image']:.1f}
-            - Best posting time: {self.stats['best_time_by_post_type']['image']:02d}:00 hours
-            - Best posting day: {self.stats['best_day_by_post_type']['image']}
-            - Average engagement rate: {engagement_rates['image']}
-            
-            VIDEO POSTS:
-            - Average likes: {self.stats['avg_engagement_by_type']['likes']['video']:.1f}
-            - Average comments: {self.stats['avg_engagement_by_type']['comments']['video']:.1f}
-            - Average shares: {self.stats['avg_engagement_by_type']['shares']['video']:.1f}
-            - Average views: {self.stats['avg_engagement_by_type']['views']['video']:.1f}
-            - Best posting time: {self.stats['best_time_by_post_type']['video']:02d}:00 hours
-            - Best posting day: {self.stats['best_day_by_post_type']['video']}
-            - Average engagement rate: {engagement_rates['video']}
-            
-            CAROUSEL POSTS:
-            - Average likes: {self.stats['avg_engagement_by_type']['likes']['carousel']:.1f}
-            - Average comments: {self.stats['avg_engagement_by_type']['comments']['carousel']:.1f}
-            - Average shares: {self.stats['avg_engagement_by_type']['shares']['carousel']:.1f}
-            - Average views: {self.stats['avg_engagement_by_type']['views']['carousel']:.1f}
-            - Best posting time: {self.stats['best_time_by_post_type']['carousel']:02d}:00 hours
-            - Best posting day: {self.stats['best_day_by_post_type']['carousel']}
-            - Average engagement rate: {engagement_rates['carousel']}
+            with STAGE_SECONDS.time(stage="unload"):
+                self._unload()
+        except Exception as e:
+            print(f"Error during unload: {str(e)}")
+
+    def query(self, query: str, chat_history: List[tuple] = None, k: int = None,
+              filters: Dict[str, Any] = None, history_summary: str = None) -> str:
+        start = time.perf_counter()
+        try:
+            with STAGE_SECONDS.time(stage="load"):
+                self.load()
+            answer = self._direct_or_none(query)
+            if answer is not None:
+                return answer
             
-            OTHER STATISTICS:
-            - Total posts analyzed: {self.stats['total_posts']}
-            - Post type distribution: {json.dumps(self.stats['post_type_distribution'])}
-            """
+            with STAGE_SECONDS.time(stage="retrieve"):
+                use_cache = self._cacheable(chat_history, history_summary)
+                cached, embedding, documents = self._cached_or_retrieve(query, k, filters, use_cache)
+            if cached is not None:
+                return cached
+            with STAGE_SECONDS.time(stage="prepare"):
+                chain, inputs = self._prepare_query(query, chat_history, documents, filters, history_summary)
             
             # Get response from chain
-            result = chain.invoke({
-                "input": query,
-                "context": stats_content,
-                "chat_history": "\n".join(formatted_history) if formatted_history else ""
-            })
+            with STAGE_SECONDS.time(stage="llm"):
+                answer = self._result_text(chain.invoke(inputs, config={"callbacks": [token_callback()]}))
+            ANSWERS.inc(source="llm")
+            self._cache_answer(embedding, answer, k, filters, use_cache)
+            return answer
+
+        except Exception as e:
+            return self._query_error(e)
+
+        finally:
+            self._safe_unload()
+            QUERY_SECONDS.observe(time.perf_counter() - start, mode="sync")
+
+    async def aquery(self, query: str, chat_history: List[tuple] = None, k: int = None,
+                     filters: Dict[str, Any] = None, history_summary: str = None) -> str:
+        """Async variant of query() that awaits the LLM instead of blocking the event loop.
+
+        Errors are raised rather than returned as an answer, so the caller's executor
+        counts the query as failed.
+        """
+        start = time.perf_counter()
+        try:
+            if not self._loaded:
+                # Loading reads files and builds embeddings, keep it off the event loop
+                with STAGE_SECONDS.time(stage="load"):
+                    await asyncio.to_thread(self.load)
+            answer = self._direct_or_none(query)
+            if answer is not None:
+                return answer
             
-            if not result or not hasattr(result, 'content'):
-                raise ValueError("Invalid response from LLM chain")
+            # Embedding the query is CPU-bound
+            with STAGE_SECONDS.time(stage="retrieve"):
+                use_cache = self._cacheable(chat_history, history_summary)
+                cached, embedding, documents = await asyncio.to_thread(self._cached_or_retrieve, query, k, filters,
+                                                                       use_cache)
+            if cached is not None:
+                return cached
+            with STAGE_SECONDS.time(stage="prepare"):
+                chain, inputs = self._prepare_query(query, chat_history, documents, filters, history_summary)
             
-            return result.content
+            with STAGE_SECONDS.time(stage="llm"):
+                answer = self._result_text(await chain.ainvoke(inputs, config={"callbacks": [token_callback()]}))
+            ANSWERS.inc(source="llm")
+            self._cache_answer(embedding, answer, k, filters, use_cache)
+            return answer
 
         except Exception as e:
-            import traceback
-            print(f"Error in query method: {str(e)}")
-            print(traceback.format_exc())
-            return f"An error occurred while processing your request: {str(e)}"
+            self._record_error(e)
+            raise
 
         finally:
-            try:
-                self._unload()
-            except Exception as e:
-                print(f"Error during unload: {str(e)}")
+            self._safe_unload()
+            QUERY_SECONDS.observe(time.perf_counter() - start, mode="async")
     
-    def generate_charts(self, chart_type="engagement_by_post_type"):
-        """Generate visualization charts for various analytics"""
+    async def astream(self, query: str, chat_history: List[tuple] = None, k: int = None,
+                      filters: Dict[str, Any] = None, history_summary: str = None):
+        """Yield the answer in chunks as the LLM produces them.
+
+        Errors are raised to the caller, which owns the transport (e.g. an SSE stream).
+        """
+        start = time.perf_counter()
         try:
-            import matplotlib.pyplot as plt
-            import seaborn as sns
-            
-            # Load data if not already loaded
-            if self.df is None:
-                self.df = pd.read_csv(self.data_path)
+            if not self._loaded:
+                with STAGE_SECONDS.time(stage="load"):
+                    await asyncio.to_thread(self.load)
+            answer = self._direct_or_none(query)
+            if answer is not None:
+                yield answer
+                return
             
-            # Set styling
-            plt.style.use('ggplot')
+            with STAGE_SECONDS.time(stage="retrieve"):
+                use_cache = self._cacheable(chat_history, history_summary)
+                cached, embedding, documents = await asyncio.to_thread(self._cached_or_retrieve, query, k, filters,
+                                                                       use_cache)
+            if cached is not None:
+                yield cached
+                return
+            with STAGE_SECONDS.time(stage="prepare"):
+                chain, inputs = self._prepare_query(query, chat_history, documents, filters, history_summary)
             
-            if chart_type == "engagement_by_post_type":
-                # Create a comparison chart of engagement metrics by post type
-                fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-                fig.suptitle('Engagement Metrics by Post Type', fontsize=16)
-                
-                metrics = ['likes', 'comments', 'shares', 'views']
-                for i, metric in enumerate(metrics):
-                    row, col = i // 2, i % 2
-                    ax = axes[row, col]
-                    
-                    data = [self.stats['avg_engagement_by_type'][metric][pt] for pt in ['image', 'video', 'reel', 'carousel']]
-                    ax.bar(['Image', 'Video', 'Reel', 'Carousel'], data, color=sns.color_palette("husl", 4))
-                    ax.set_title(f'Average {metric.capitalize()}')
-                    ax.set_ylabel(metric.capitalize())
-                    
-                    # Add values on top of bars
-                    for j, v in enumerate(data):
-                        ax.text(j, v + 0.1, f"{v:.1f}", ha='center')
-                
-                plt.tight_layout(rect=[0, 0, 1, 0.95])
-                plt.savefig('engagement_by_post_type.png')
-                return 'engagement_by_post_type.png'
-                
-            elif chart_type == "best_times":
-                # Create a heatmap of engagement by hour and day
-                pivot = self.df.pivot_table(
-                    index='day_of_week', 
-                    columns='hour', 
-                    values='engagement_rate', 
-                    aggfunc='mean'
-                )
-                
-                # Define day order
-                days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                pivot = pivot.reindex(days)
-                
-                plt.figure(figsize=(14, 8))
-                sns.heatmap(pivot, cmap="YlGnBu", annot=True, fmt=".3f", linewidths=.5)
-                plt.title('Engagement Rate by Day and Hour', fontsize=16)
-                plt.xlabel('Hour of Day')
-                plt.ylabel('Day of Week')
-                plt.tight_layout()
-                plt.savefig('best_posting_times.png')
-                return 'best_posting_times.png'
-                
-            elif chart_type == "post_type_distribution":
-                # Create a pie chart of post type distribution
-                counts = self.stats['post_type_distribution']
-                labels = list(counts.keys())
-                sizes = list(counts.values())
-                
-                plt.figure(figsize=(10, 8))
-                plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("husl", len(labels)))
-                plt.axis('equal')
-                plt.title('Distribution of Post Types', fontsize=16)
-                plt.tight_layout()
-                plt.savefig('post_type_distribution.png')
-                return 'post_type_distribution.png'
-                
-            elif chart_type == "engagement_rate_comparison":
-                # Create a bar chart comparing engagement rates
-                plt.figure(figsize=(10, 6))
-                rates = [self.stats['engagement_rate_by_type'][pt] for pt in ['image', 'video', 'reel', 'carousel']]
-                plt.bar(['Image', 'Video', 'Reel', 'Carousel'], rates, color=sns.color_palette("husl", 4))
-                plt.title('Engagement Rate by Post Type', fontsize=16)
-                plt.ylabel('Engagement Rate')
+            parts = []
+            # The llm stage includes time the consumer spends sending each chunk
+            llm_start = time.perf_counter()
+            tokens = token_callback()
+            try:
+                async for chunk in chain.astream(inputs, config={"callbacks": [tokens]}):
+                    text = getattr(chunk, "content", None)
+                    if text:
+                        if not parts:
+                            STAGE_SECONDS.observe(time.perf_counter() - llm_start, stage="llm_first_token")
+                        parts.append(text)
+                        yield text
+            finally:
+                # An abandoned stream never reaches on_llm_end
+                tokens.discard()
+            STAGE_SECONDS.observe(time.perf_counter() - llm_start, stage="llm")
+            ANSWERS.inc(source="llm")
+            # Only complete answers are cached, a cancelled stream never gets here
+            self._cache_answer(embedding, "".join(parts), k, filters, use_cache)
+
         finally:
-            print("Charts Generated")   # Add percentage values on top of
\ No newline at end of file
+            self._safe_unload()
+            QUERY_SECONDS.observe(time.perf_counter() - start, mode="stream")
+    
+    def generate_charts(self, chart_type="engagement_by_post_type", post_type=None,
+                        start_date=None, end_date=None) -> bytes:
+        """Render one chart as PNG bytes; the API serves the same charts from /api/charts"""
+        from analytics_engine import AnalyticsEngine
+        from chart_service import render_png
+        data_hash = self.artifacts.data_hash(self.data_path)
+        if self._chart_engine is None or self._chart_engine[0] != data_hash:
+            # The cube is small and only rebuilt when the data file changes
+            self._chart_engine = (data_hash, AnalyticsEngine.from_csv(self.data_path))
+        engine = self._chart_engine[1]
+        return render_png(engine.chart_data(chart_type, post_type, start_date, end_date))
@@ -0,0 +1,256 @@
+import sys
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics_engine import POST_TYPES, DAYS, METRICS, LAYERS, COUNT, RATE
+from columnar_store import iter_engagement_frames
+
+# Compact dtypes for the engagement CSV; categoricals keep one byte per row for the labels
+COMPACT_DTYPES = {
+    'post_type': pd.CategoricalDtype(POST_TYPES),
+    'day_of_week': pd.CategoricalDtype(DAYS),
+    'hour': 'int8',
+    'likes': 'int32',
+    'comments': 'int32',
+    'shares': 'int32',
+    'views': 'int32',
+}
+
+# Engagement rates are bucketed to find the top decile in one pass.
+# Rates above RATE_MAX land in the last bucket.
+RATE_BINS = 10_000
+RATE_MAX = 1.0
+TOP_FRACTION = 0.1
+
+
+def read_engagement_csv(path: str, chunksize: int, columns: List[str] = None) -> Iterator[pd.DataFrame]:
+    """Iterate over the engagement data in chunks with compact dtypes.
+
+    Reads the columnar copy instead of parsing the CSV when an up-to-date one exists.
+    """
+    dtypes = {c: t for c, t in COMPACT_DTYPES.items() if columns is None or c in columns}
+    return iter_engagement_frames(path, chunksize, columns, csv_dtypes=dtypes)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB; 0.0 where it can't be read"""
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module; psutil reports the peak working set there
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _content_metrics(content: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashtag count and length per post; non-string content counts as empty"""
+    values = [x if isinstance(x, str) else "" for x in content]
+    hashtags = np.fromiter((x.count('#') for x in values), dtype=np.float64, count=len(values))
+    lengths = np.fromiter((len(x) for x in values), dtype=np.float64, count=len(values))
+    return hashtags, lengths
+
+
+class EngagementAccumulator:
+    """Mergeable one-pass aggregates for rebuilding stats and documents.
+
+    Holds sums per (post_type, day_of_week, hour), per-post-type histograms of
+    engagement rate carrying hashtag and length sums (for top-decile content
+    stats), and every ``sample_every``-th row for the sample-post documents.
+    Memory does not grow with the number of rows apart from the samples.
+    """
+
+    def __init__(self, sample_every: int = 100):
+        self.sample_every = sample_every
+        self.table = np.zeros((len(LAYERS), len(POST_TYPES), 7, 24))
+        # count, hashtag sum, content length sum per rate bucket
+        self.rate_hist = np.zeros((3, len(POST_TYPES), RATE_BINS))
+        self.rows = 0
+        self.chunks = 0
+        self._samples = []
+        self._seen = []  # post type indexes in order of first appearance
+        self._exact_top_decile = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, sample_every: int = 100) -> "EngagementAccumulator":
+        """Aggregates for an in-memory frame; the top decile is exact since all rows are at hand"""
+        summary = cls(sample_every)
+        # The rate histogram only approximates the top decile, so skip its per-row string work
+        pt_idx, rate = summary._add(df, content_histogram=False)
+        summary._exact_top_decile = summary._top_decile_from_rows(df['content'], pt_idx, rate)
+        return summary
+
+    def _top_decile_from_rows(self, content: pd.Series, codes: np.ndarray,
+                              rate: np.ndarray) -> Dict[str, Tuple[float, float]]:
+        """Exact top-decile content stats from one sort by (post_type, engagement rate)"""
+        # Stable sort keeps the first of tied rows, like DataFrame.nlargest
+        order = np.lexsort((-rate, codes))
+        sorted_codes = codes[order]
+
+        result = {}
+        for i in self._seen:
+            start, end = np.searchsorted(sorted_codes, [i, i + 1])
+            n = max(1, int((end - start) * TOP_FRACTION))
+            hashtags, lengths = _content_metrics(content.iloc[order[start:start + n]])
+            result[POST_TYPES[i]] = (float(hashtags.mean()), float(lengths.mean()))
+        return result
+
+    def add_chunk(self, df: pd.DataFrame):
+        """Fold one chunk of rows into the aggregates"""
+        if not df.empty:
+            self._add(df)
+
+    def _add(self, df: pd.DataFrame, content_histogram: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Fold rows in and return their post type codes and engagement rates"""
+        pt_idx = self._codes(df['post_type'], POST_TYPES)
+        day_idx = self._codes(df['day_of_week'], DAYS)
+        hour_idx = df['hour'].to_numpy(dtype=np.int64)
+        valid = (pt_idx >= 0) & (day_idx >= 0)
+        for i in pd.unique(pt_idx[valid]):
+            if i not in self._seen:
+                self._seen.append(int(i))
+
+        likes, comments, shares, views = (df[m].to_numpy(dtype=np.float64) for m in METRICS)
+        rate = np.divide(likes + comments + shares, views, out=np.zeros(len(df)), where=views > 0)
+
+        flat = ((pt_idx * 7 + day_idx) * 24 + hour_idx)[valid]
+        size = len(POST_TYPES) * 7 * 24
+        for i, weights in enumerate([None, likes, comments, shares, views, rate]):
+            w = None if weights is None else weights[valid]
+            self.table[i] += np.bincount(flat, weights=w, minlength=size).reshape(len(POST_TYPES), 7, 24)
+
+        if content_histogram and 'content' in df.columns:
+            hashtags, lengths = _content_metrics(df['content'])
+            bins = np.minimum((rate / RATE_MAX * RATE_BINS).astype(np.int64), RATE_BINS - 1)
+            flat_bins = (pt_idx * RATE_BINS + bins)[valid]
+            size = len(POST_TYPES) * RATE_BINS
+            for i, weights in enumerate([None, hashtags, lengths]):
+                w = None if weights is None else weights[valid]
+                self.rate_hist[i] += np.bincount(flat_bins, weights=w, minlength=size).reshape(len(POST_TYPES), RATE_BINS)
+
+        # Keep the same global every-Nth-row sample a full rebuild would index
+        positions = np.arange(self.rows, self.rows + len(df))
+        sampled = df[positions % self.sample_every == 0]
+        if not sampled.empty:
+            self._samples.append(sampled)
+
+        self.rows += len(df)
+        self.chunks += 1
+        return pt_idx, rate
+
+    @staticmethod
+    def _codes(values: pd.Series, categories: List[str]) -> np.ndarray:
+        if isinstance(values.dtype, pd.CategoricalDtype) and list(values.cat.categories) == categories:
+            return values.cat.codes.to_numpy(dtype=np.int64)
+        return pd.Categorical(values, categories=categories).codes.astype(np.int64)
+
+    @classmethod
+    def from_weekday_sums(cls, sums: np.ndarray, post_types: List[str]) -> "EngagementAccumulator":
+        """Aggregates from EngagementCube.by_weekday() sums, enough for the statistics documents;
+        there are no content histograms or samples"""
+        accumulator = cls()
+        for i, post_type in enumerate(post_types):
+            if post_type in POST_TYPES and sums[COUNT, i].sum() > 0:
+                accumulator.table[:, POST_TYPES.index(post_type)] = sums[:, i]
+                accumulator._seen.append(POST_TYPES.index(post_type))
+        accumulator.rows = int(accumulator.table[COUNT].sum())
+        return accumulator
+
+    def merge(self, other: "EngagementAccumulator"):
+        """Combine with an accumulator built over rows that come after this one's"""
+        self.table += other.table
+        self.rate_hist += other.rate_hist
+        self._samples.extend(other._samples)
+        self._seen.extend(i for i in other._seen if i not in self._seen)
+        self.rows += other.rows
+        self.chunks += other.chunks
+        # Exact values no longer cover all rows
+        self._exact_top_decile = None
+
+    def sample_frame(self) -> pd.DataFrame:
+        if not self._samples:
+            return pd.DataFrame()
+        return pd.concat(self._samples, ignore_index=True)
+
+    def post_types(self) -> List[str]:
+        """Post types with data, in order of first appearance like ``df['post_type'].unique()``"""
+        return [POST_TYPES[i] for i in self._seen]
+
+    def _block(self, post_type: str = None) -> np.ndarray:
+        if post_type is None:
+            return self.table.sum(axis=1)
+        return self.table[:, POST_TYPES.index(post_type)]
+
+    def means(self, post_type: str = None) -> Dict[str, float]:
+        """Average metrics and engagement rate, overall or for one post type"""
+        sums = self._block(post_type).sum(axis=(1, 2))
+        count = sums[COUNT]
+        result = {name: float(sums[i] / count) if count else 0.0 for i, name in enumerate(LAYERS) if i != COUNT}
+        result['count'] = int(count)
+        return result
+
+    def hour_rates(self, post_type: str = None) -> pd.Series:
+        """Mean engagement rate per hour, best first, for hours that have posts"""
+        block = self._block(post_type)
+        counts = block[COUNT].sum(axis=0)
+        hours = np.nonzero(counts)[0]
+        rates = block[RATE].sum(axis=0)[hours] / counts[hours]
+        return pd.Series(rates, index=hours).sort_values(ascending=False)
+
+    def day_rates(self, post_type: str = None) -> pd.Series:
+        """Mean engagement rate per day of week, best first, for days that have posts"""
+        block = self._block(post_type)
+        counts = block[COUNT].sum(axis=1)
+        days = np.nonzero(counts)[0]
+        rates = block[RATE].sum(axis=1)[days] / counts[days]
+        return pd.Series(rates, index=[DAYS[d] for d in days]).sort_values(ascending=False)
+
+    def top_decile_content(self, post_type: str) -> Tuple[float, float]:
+        """Average hashtag count and content length of the top 10% of posts by engagement rate.
+
+        Walks the rate histogram from the top; the boundary bucket contributes pro rata.
+        """
+        if self._exact_top_decile is not None:
+            return self._exact_top_decile.get(post_type, (0.0, 0.0))
+        i = POST_TYPES.index(post_type)
+        counts, hashtags, lengths = (h[i][::-1] for h in self.rate_hist)
+        total = counts.sum()
+        if total == 0:
+            return 0.0, 0.0
+        target = max(1, int(total * TOP_FRACTION))
+        cumulative = np.cumsum(counts)
+        last = int(np.searchsorted(cumulative, target))
+        taken = cumulative[last - 1] if last > 0 else 0
+        fraction = (target - taken) / counts[last] if counts[last] else 0.0
+        hashtag_sum = hashtags[:last].sum() + hashtags[last] * fraction
+        length_sum = lengths[:last].sum() + lengths[last] * fraction
+        return float(hashtag_sum / target), float(length_sum / target)
+
+    def to_stats(self) -> Dict[str, Any]:
+        """Stats in the stats.json format"""
+        post_types = self.post_types()
+        type_means = {pt: self.means(pt) for pt in post_types}
+        stats = {
+            "total_posts": int(self.table[COUNT].sum()),
+            # Most common first, like value_counts()
+            "post_type_distribution": {pt: type_means[pt]['count']
+                                       for pt in sorted(post_types, key=lambda pt: -type_means[pt]['count'])},
+            "avg_engagement_by_type": {m: {pt: type_means[pt][m] for pt in post_types} for m in METRICS},
+            "best_time_by_post_type": {},
+            "best_day_by_post_type": {},
+            "engagement_rate_by_type": {},
+        }
+        for pt in post_types:
+            hour_rates = self.hour_rates(pt)
+            day_rates = self.day_rates(pt)
+            stats["best_time_by_post_type"][pt] = int(hour_rates.index[0]) if not hour_rates.empty else 12
+            stats["best_day_by_post_type"][pt] = str(day_rates.index[0]) if not day_rates.empty else "Monday"
+            stats["engagement_rate_by_type"][pt] = type_means[pt]['engagement_rate']
+        return stats
@@ -0,0 +1,42 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# The backend modules import each other by bare name, as when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_FILE = "social_media_engagement_data.csv"
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A data directory with a small seeded engagement CSV; artifacts are written beside it"""
+    from mock_data_generator import write_mock_data
+    monkeypatch.setenv("RAG_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("RAG_LLM_PROVIDER", "fake")
+    monkeypatch.setenv("RAG_FAKE_LATENCY_MS", "0")
+    monkeypatch.setenv("RAG_FAKE_TOKENS_PER_SEC", "0")
+    monkeypatch.setenv("RAG_FAKE_RESPONSE_TOKENS", "20")
+    write_mock_data(str(tmp_path / DATA_FILE), 3000, seed=7, workers=1, end_date=datetime(2024, 6, 1))
+    return tmp_path
+
+
+@pytest.fixture
+def make_rag(data_dir, monkeypatch):
+    """SocialMediaEngagementRAG over data_dir, with a hashing embedding instead of MiniLM"""
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    from social_media_rag import SocialMediaEngagementRAG
+    monkeypatch.setattr(SocialMediaEngagementRAG, "_load_embeddings",
+                        lambda self: DeterministicFakeEmbedding(size=64))
+    created = []
+
+    def make(**kwargs):
+        rag = SocialMediaEngagementRAG(**kwargs)
+        created.append(rag)
+        return rag
+
+    yield make
+    for rag in created:
+        rag.close()
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import httpx
+import pandas as pd
+import pytest
+
+import app as app_module
+from analytics_engine import CHART_TYPES, AnalyticsEngine
+from conftest import DATA_FILE
+from http_cache import ResponseCache
+
+
+@pytest.fixture
+def api(data_dir, monkeypatch):
+    """Send requests to the app with the analytics engine built over data_dir"""
+    monkeypatch.setattr(app_module, "analytics_engine", AnalyticsEngine.from_csv(str(data_dir / DATA_FILE)))
+    monkeypatch.setattr(app_module, "api_cache", ResponseCache())
+
+    def send(method, path, **kwargs):
+        async def request():
+            transport = httpx.ASGITransport(app=app_module.app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, path, **kwargs)
+        return asyncio.run(request())
+
+    return send
+
+
+@pytest.mark.parametrize("post_type", [None, "reel"])
+def test_analytics_chart_url_serves_without_matplotlib(api, post_type):
+    response = api("POST", "/api/analytics", json={"post_type": post_type})
+    assert response.status_code == 200
+    chart_url = response.json()["chart_url"]
+    assert "format=png" not in chart_url
+
+    chart = api("GET", chart_url)
+    assert chart.status_code == 200
+    assert chart.headers["content-type"].startswith("application/json")
+
+
+def test_cache_miss_is_built_off_the_event_loop(api, monkeypatch):
+    threads = []
+    analytics = AnalyticsEngine.analytics
+
+    def recording(self, *args):
+        threads.append(threading.current_thread())
+        return analytics(self, *args)
+
+    monkeypatch.setattr(AnalyticsEngine, "analytics", recording)
+    headers = {"Accept-Encoding": "gzip"}
+    first = api("POST", "/api/analytics", json={}, headers=headers)
+    second = api("POST", "/api/analytics", json={}, headers=headers)
+
+    assert first.json() == second.json()
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    assert app_module.api_cache.hits == 1
+
+
+def test_dashboard_returns_only_the_requested_fields(api):
+    full = api("GET", "/api/dashboard").json()
+    assert set(full) == {"version", "filters"} | set(app_module.DASHBOARD_FIELDS)
+    assert set(full["charts"]) == set(CHART_TYPES)
+
+    partial = api("GET", "/api/dashboard", params={"fields": "best_times, metrics_summary"}).json()
+    assert set(partial) == {"version", "filters", "best_times", "metrics_summary"}
+    assert partial["best_times"] == full["best_times"]
+    assert partial["metrics_summary"] == api("GET", "/api/metrics/summary").json()
+
+
+def test_dashboard_rejects_unknown_fields(api):
+    response = api("GET", "/api/dashboard", params={"fields": "analytics,bogus"})
+    assert response.status_code == 400
+    assert "bogus" in response.json()["detail"]
+
+
+def test_dashboard_filters(api):
+    body = api("GET", "/api/dashboard", params={"fields": "recommendations,metrics_summary", "post_type": "reel",
+                                                "days": 7}).json()
+    assert body["filters"] == {"post_type": "reel", "start_date": "2024-05-25", "end_date": "2024-05-31"}
+    assert body["recommendations"] == app_module.RECOMMENDATIONS["reel"]
+    assert 0 < body["metrics_summary"]["total_posts"] < 3000
+
+
+def test_matching_etag_gets_304(api):
+    first = api("GET", "/api/best-times")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    again = api("GET", "/api/best-times", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag and again.content == b""
+    assert api("GET", "/api/best-times", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert api("GET", "/api/best-times", headers={"If-None-Match": f'W/{etag}'}).status_code == 304
+
+
+def test_new_data_changes_the_etag(api):
+    etag = api("GET", "/api/metrics/summary").headers["ETag"]
+    engine = app_module.analytics_engine
+    cube = engine.cube.copy()
+    cube.add_frame(pd.DataFrame([{'post_type': 'reel', 'timestamp': '2024-05-30 12:00:00', 'day_of_week': 'Thursday',
+                                  'hour': 12, 'likes': 1, 'comments': 1, 'shares': 1, 'views': 10}]))
+    engine.cube = cube
+
+    response = api("GET", "/api/metrics/summary", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["total_posts"] == 3001
+
+
+def test_large_bodies_are_compressed_for_clients_that_accept_it(api):
+    plain = api("GET", "/api/dashboard", headers={"Accept-Encoding": "identity"})
+    compressed = api("GET", "/api/dashboard", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    assert compressed.json() == plain.json()
+    assert compressed.headers["ETag"] == plain.headers["ETag"]
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from analytics_engine import AnalyticsEngine, EngagementCube
+
+
+@pytest.fixture
+def engine():
+    rows = [
+        ('reel', '2024-03-04 18:00:00', 'Monday', 18, 90),
+        ('image', '2024-03-05 09:00:00', 'Tuesday', 9, 20),
+    ]
+    df = pd.DataFrame([{'post_type': pt, 'timestamp': ts, 'day_of_week': day, 'hour': hour,
+                        'likes': likes, 'comments': 5, 'shares': 5, 'views': 1000}
+                       for pt, ts, day, hour, likes in rows])
+    return AnalyticsEngine(EngagementCube.from_frame(df))
+
+
+def test_summary_picks_best_slot(engine):
+    summary = engine.metrics_summary()
+    assert summary["total_posts"] == 2
+    assert summary["best_post_type"] == "reel"
+    assert summary["best_time_overall"] == "18:00 Monday"
+
+
+def test_empty_range_reports_no_best(engine):
+    summary = engine.metrics_summary(start_date="2099-01-01")
+    assert summary["total_posts"] == 0
+    assert summary["best_post_type"] is None
+    assert summary["best_time_overall"] is None
+
+    analytics = engine.analytics(post_type="reel", start_date="2099-01-01")
+    assert analytics["best_time"] is None and analytics["best_day"] is None
+    assert engine.best_times(start_date="2099-01-01")["reel"]["time"] is None
+
+
+def test_post_type_without_posts_in_range(engine):
+    best = engine.best_times(end_date="2024-03-04")
+    assert best["reel"] == {"day": "Monday", "time": "18:00", "reason": best["reel"]["reason"]}
+    assert best["image"]["day"] is None
+
+
+def test_batch_on_a_copy_leaves_readers_on_the_old_cube(engine):
+    before = engine.metrics_summary()
+    cube = engine.cube.copy()
+    cube.add_frame(pd.DataFrame([{'post_type': 'story', 'timestamp': '2024-03-10 12:00:00', 'day_of_week': 'Sunday',
+                                  'hour': 12, 'likes': 500, 'comments': 5, 'shares': 5, 'views': 1000}]))
+    assert engine.metrics_summary() == before
+    assert engine.cube.post_types == ['reel', 'image', 'carousel', 'video']
+
+    engine.cube = cube
+    summary = engine.metrics_summary()
+    assert summary["total_posts"] == 3
+    assert summary["best_post_type"] == "story"
+    assert engine.dashboard()["version"] == cube.version > 1
@@ -0,0 +1,47 @@
+import os
+import hashlib
+
+import pytest
+
+from artifacts import ArtifactManager
+
+
+def sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return ArtifactManager(str(tmp_path / "artifacts"))
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"post_id,likes\n" + b"".join(b"p%d,%d\n" % (i, i) for i in range(20000)))
+    return str(path)
+
+
+def test_appended_file_is_hashed_incrementally(manager, data_path):
+    manager.data_hash(data_path)
+    with open(data_path, "ab") as f:
+        f.write(b"p-new,1\n")
+    assert manager.data_hash(data_path) == sha256(data_path)
+
+
+def test_file_rewritten_in_place_with_longer_content_is_rehashed(manager, data_path):
+    manager.data_hash(data_path)
+    with open(data_path, "r+b") as f:
+        content = f.read().replace(b"p19999,", b"edited,") + b"p-new,1\n"
+        f.seek(0)
+        f.write(content)
+    assert manager.data_hash(data_path) == sha256(data_path)
+
+
+def test_replaced_file_with_longer_content_is_rehashed(manager, data_path, tmp_path):
+    manager.data_hash(data_path)
+    replacement = tmp_path / "regenerated.csv"
+    replacement.write_bytes(b"post_id,likes\n" + b"".join(b"q%d,%d\n" % (i, i) for i in range(30000)))
+    os.replace(replacement, data_path)
+    assert manager.data_hash(data_path) == sha256(data_path)
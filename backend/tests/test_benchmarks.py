@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+
+from benchmarks.run_benchmarks import compare, drive, flatten, percentiles
+
+
+def test_percentiles_are_in_milliseconds():
+    summary = percentiles([0.001, 0.002, 0.003, 0.004])
+    assert summary["count"] == 4
+    assert summary["mean_ms"] == pytest.approx(2.5)
+    assert summary["p50_ms"] == pytest.approx(2.5)
+    assert summary["max_ms"] == pytest.approx(4.0)
+
+
+def test_flatten_keeps_numbers_only():
+    out = {}
+    flatten("", {"a": {"b_s": 1.5, "ok": True, "name": "x"}, "c": 2}, out)
+    assert out == {"a.b_s": 1.5, "c": 2}
+
+
+def test_compare_reports_timing_changes(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"meta": {"commit": "abc"},
+                                    "datasets": [{"rows": 10, "load_s": 2.0, "documents": 5}]}))
+    compare({"datasets": [{"rows": 10, "load_s": 1.0, "documents": 6}, {"rows": 20, "load_s": 1.0}]}, str(baseline))
+    output = capsys.readouterr().out
+    assert "10 rows" in output and "(abc)" in output
+    assert "load_s" in output and "-50.0%" in output
+    assert "documents" not in output and "20 rows" not in output
+
+
+def test_drive_counts_errors_and_bounds_concurrency():
+    app = FastAPI()
+    in_flight, peak = [0], [0]
+
+    @app.get("/item")
+    async def item(fail: int = 0):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.005)
+        in_flight[0] -= 1
+        if fail:
+            return Response(status_code=500)
+        return {"ok": True}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await drive(client, "GET", "/item", [{}] * 6 + [{"fail": 1}] * 2, concurrency=3)
+
+    result = asyncio.run(run())
+    assert result["count"] == 8
+    assert result["errors"] == 2
+    assert peak[0] <= 3
+    assert result["throughput_rps"] > 0
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import chart_service
+from chart_service import ChartService
+
+
+class FakeEngine:
+    version = "v1"
+
+    def chart_data(self, chart_type, post_type=None, start_date=None, end_date=None):
+        if chart_type == "missing":
+            raise ValueError("Unknown chart type")
+        return {"kind": "bar", "title": chart_type, "labels": ["reel"], "series": [{"name": "likes", "values": [1]}]}
+
+
+@pytest.fixture
+def blocked_render(monkeypatch):
+    """A ChartService whose PNG renders wait for the returned event, in a thread pool"""
+    release = threading.Event()
+    monkeypatch.setattr(chart_service, "render_png", lambda chart: release.wait(5) and b"png")
+    service = ChartService(workers=1)
+    pool = ThreadPoolExecutor(1)
+    monkeypatch.setattr(service, "_render_pool", lambda: pool)
+    yield service, release
+    release.set()
+    pool.shutdown()
+
+
+def test_cancelled_first_request_does_not_strand_waiters(blocked_render):
+    service, release = blocked_render
+
+    async def scenario():
+        first = asyncio.ensure_future(service.get(FakeEngine(), "likes", "png"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(service.get(FakeEngine(), "likes", "png"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        chart = await asyncio.wait_for(second, 5)
+        assert first.cancelled()
+        return chart
+
+    chart = asyncio.run(scenario())
+    assert chart.body == b"png"
+    assert service.renders == 1
+    assert service._pending == {}
+
+
+def test_concurrent_requests_share_one_render(blocked_render):
+    service, release = blocked_render
+
+    async def scenario():
+        requests = [asyncio.ensure_future(service.get(FakeEngine(), "likes", "png")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*requests)
+
+    charts = asyncio.run(scenario())
+    assert all(chart is charts[0] for chart in charts)
+    assert service.renders == 1
+
+
+def test_failures_reach_every_waiter():
+    service = ChartService()
+
+    async def scenario():
+        return await asyncio.gather(*(service.get(FakeEngine(), "missing") for _ in range(2)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert service._pending == {}
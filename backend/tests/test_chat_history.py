@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+import app as app_module
+from history_store import MemoryHistoryStore
+
+
+class FakeRAG:
+    llm = None
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def aquery(self, query, chat_history=None, k=None, filters=None, history_summary=None):
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        return f"answer to {query}"
+
+    async def astream(self, query, chat_history=None, k=None, filters=None, history_summary=None):
+        yield "answer "
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        yield f"to {query}"
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    store = MemoryHistoryStore()
+    monkeypatch.setattr(app_module, "history_store", store)
+    monkeypatch.setattr(app_module, "summarizer", None)
+
+    def post(path, rag, message="hi there?"):
+        monkeypatch.setattr(app_module, "get_rag_system", lambda: rag)
+
+        async def send():
+            transport = httpx.ASGITransport(app=app_module.app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(path, json={"message": message, "user_id": "u"})
+        return asyncio.run(send())
+
+    return post, store
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream"])
+def test_completed_turn_is_recorded(chat, path):
+    post, store = chat
+    assert post(path, FakeRAG()).status_code == 200
+    assert store.history("test_user-123") == [
+        {"role": "user", "content": "hi there?"},
+        {"role": "assistant", "content": "answer to hi there?"},
+    ]
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream"])
+def test_failed_turn_leaves_no_orphan_message(chat, path):
+    post, store = chat
+    post(path, FakeRAG(fail=True))
+    assert store.history("test_user-123") == []
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from columnar_store import (FORMAT_VERSION, MANIFEST, ColumnarTable, columnar_path, convert_to_columnar,
+                            iter_engagement_frames, open_columnar, read_engagement_frame)
+from conftest import DATA_FILE
+from ingestion import append_to_csv, validate_batch
+
+
+@pytest.fixture
+def csv_path(data_dir):
+    return str(data_dir / DATA_FILE)
+
+
+def test_columnar_copy_reads_back_the_csv(csv_path):
+    convert_to_columnar(csv_path, chunksize=700)
+    table = open_columnar(csv_path)
+    assert table is not None and table.rows == 3000
+
+    expected = pd.read_csv(csv_path)
+    actual = read_engagement_frame(csv_path)
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        assert actual[column].astype(str).tolist() == expected[column].astype(str).tolist()
+
+    chunks = list(iter_engagement_frames(csv_path, 1000, ['post_type', 'likes']))
+    assert [len(c) for c in chunks] == [1000, 1000, 1000]
+    assert list(chunks[0].columns) == ['post_type', 'likes']
+
+
+def test_stale_copy_falls_back_to_the_csv(csv_path):
+    convert_to_columnar(csv_path)
+    row = pd.read_csv(csv_path).iloc[:1].assign(post_id="appended")
+    append_to_csv(validate_batch(row), csv_path)
+
+    assert not ColumnarTable(columnar_path(csv_path)).is_fresh(csv_path)
+    assert open_columnar(csv_path) is None
+    assert read_engagement_frame(csv_path)['post_id'].iloc[-1] == "appended"
+
+    # Converting again picks up the new row
+    convert_to_columnar(csv_path)
+    assert open_columnar(csv_path).rows == 3001
+
+
+def test_copy_from_another_format_version_is_ignored(csv_path):
+    output = convert_to_columnar(csv_path)
+    manifest = os.path.join(output, MANIFEST)
+    with open(manifest) as f:
+        fields = json.load(f)
+    with open(manifest, "w") as f:
+        json.dump(dict(fields, format_version=FORMAT_VERSION - 1), f)
+    assert open_columnar(csv_path) is None
+    assert len(read_engagement_frame(csv_path)) == 3000
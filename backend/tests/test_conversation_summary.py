@@ -0,0 +1,77 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from conversation_summary import ConversationSummarizer
+from history_store import MemoryHistoryStore
+from query_executor import BoundedQueryExecutor
+
+
+def fill(store, user_id, count):
+    for i in range(count):
+        store.append(user_id, "user" if i % 2 == 0 else "assistant", f"message {i}")
+
+
+def test_summary_llm_call_holds_a_query_slot():
+    store = MemoryHistoryStore()
+    fill(store, "u", 8)
+    executor = BoundedQueryExecutor(max_concurrency=1, max_workers=1)
+    active = []
+
+    def llm(prompt):
+        active.append(executor.active)
+        return AIMessage(content="Talked about reels")
+
+    summarizer = ConversationSummarizer(store, keep_messages=4, step=4, executor=executor)
+    assert asyncio.run(summarizer.refresh("u", RunnableLambda(llm)))
+    assert active == [1]
+    assert executor.completed == 1 and executor.active == 0
+    assert store.summary("u")[0] == "Talked about reels"
+
+
+def test_summary_rolls_over_in_blocks():
+    store = MemoryHistoryStore()
+    summarizer = ConversationSummarizer(store, keep_messages=4, step=4)
+    fill(store, "u", 7)
+    # Only three messages have left the verbatim window, short of a block
+    assert not asyncio.run(summarizer.refresh("u"))
+    assert store.summary("u") == ("", 0)
+
+    fill(store, "u", 1)
+    assert asyncio.run(summarizer.refresh("u"))
+    summary, through = store.summary("u")
+    assert "message 0" in summary and "message 3" in summary
+    context_summary, recent = summarizer.context("u")
+    assert context_summary == summary
+    assert [m["id"] for m in recent] == [m["id"] for m in store.messages("u")[-4:]]
+    assert all(m["id"] > through for m in recent)
+
+
+def test_failed_llm_falls_back_to_an_extractive_summary():
+    store = MemoryHistoryStore()
+    fill(store, "u", 8)
+
+    def llm(prompt):
+        raise RuntimeError("LLM unavailable")
+
+    summarizer = ConversationSummarizer(store, keep_messages=4, step=4)
+    assert asyncio.run(summarizer.refresh("u", RunnableLambda(llm)))
+    assert summarizer.failures == 1
+    assert store.summary("u")[0].startswith("- User asked: message 0")
+
+
+def test_schedule_runs_one_refresh_per_user():
+    store = MemoryHistoryStore()
+    fill(store, "u", 8)
+    summarizer = ConversationSummarizer(store, keep_messages=4, step=4)
+
+    async def main():
+        summarizer.schedule("u")
+        summarizer.schedule("u")
+        assert summarizer.metrics()["running"] == 1
+        await asyncio.gather(*summarizer._running.values())
+
+    asyncio.run(main())
+    assert summarizer.refreshes == 1
+    assert summarizer.metrics()["running"] == 0
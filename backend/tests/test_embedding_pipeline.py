@@ -0,0 +1,25 @@
+import numpy as np
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from embedding_pipeline import EmbeddingCache, EmbeddingPipeline
+
+
+def test_small_jobs_stay_in_process(tmp_path):
+    pipeline = EmbeddingPipeline(DeterministicFakeEmbedding(size=8), "fake", EmbeddingCache(str(tmp_path / "e.sqlite")),
+                                 batch_size=2, workers=4, min_pool_batches=4)
+    vectors = pipeline.embed(["a", "b", "c", "a"])
+    assert vectors.shape == (4, 8)
+    assert np.array_equal(vectors[0], vectors[3])
+    assert pipeline._pool is None
+    assert pipeline.embed(["a", "b"]).shape == (2, 8)
+    assert pipeline.last_report["cached"] == 2
+    pipeline.close()
+
+
+def test_pool_is_created_once_with_spawn(tmp_path):
+    pipeline = EmbeddingPipeline(DeterministicFakeEmbedding(size=8), "fake", workers=2)
+    pool = pipeline._worker_pool()
+    assert pipeline._worker_pool() is pool
+    assert pool._mp_context.get_start_method() == "spawn"
+    pipeline.close()
+    assert pipeline._pool is None
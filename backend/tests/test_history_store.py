@@ -0,0 +1,30 @@
+import pytest
+
+from history_store import HistoryStore, MemoryHistoryStore, SqliteHistoryStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = (MemoryHistoryStore(max_messages=4) if request.param == "memory"
+             else SqliteHistoryStore(str(tmp_path / "history.db"), max_messages=4))
+    yield store
+    store.close()
+
+
+def test_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        HistoryStore()
+
+
+def test_history_is_a_bounded_ring(store):
+    for i in range(6):
+        store.append("u", "user" if i % 2 == 0 else "assistant", f"message {i}")
+    assert [m["content"] for m in store.messages("u")] == [f"message {i}" for i in range(2, 6)]
+    assert store.history("other") == []
+
+
+def test_summaries_only_move_forward(store):
+    store.append("u", "user", "hi")
+    store.set_summary("u", "newer", 5)
+    store.set_summary("u", "older", 3)
+    assert store.summary("u") == ("newer", 5)
@@ -0,0 +1,38 @@
+import gzip
+
+from http_cache import CachedBody, ResponseCache, dumps
+
+
+def test_cache_keys_by_version_and_trims_to_its_byte_budget():
+    cache = ResponseCache(max_bytes=300)
+    built = []
+
+    def build(value):
+        built.append(value)
+        return {"value": value, "padding": "x" * 100}
+
+    first = cache.get_or_build(("a", 1), lambda: build(1))
+    assert cache.get_or_build(("a", 1), lambda: build(2)) is first
+    assert cache.get(("a", 2)) is None
+    cache.get_or_build(("a", 2), lambda: build(2))
+    cache.get_or_build(("a", 3), lambda: build(3))
+    assert built == [1, 2, 3]
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1 and metrics["misses"] == 3
+    assert metrics["evictions"] == 1 and metrics["bytes"] <= 300
+
+
+def test_etag_follows_the_body():
+    body = CachedBody(dumps({"a": 1}))
+    assert body.etag == CachedBody(dumps({"a": 1})).etag
+    assert body.etag != CachedBody(dumps({"a": 2})).etag
+
+
+def test_encodings_are_compressed_once():
+    body = CachedBody(dumps({"padding": "x" * 5000}))
+    assert not body.is_encoded("gzip")
+    compressed = body.encoded("gzip")
+    assert body.is_encoded("gzip") and body.encoded("gzip") is compressed
+    assert gzip.decompress(compressed) == body.body
+    small = CachedBody(dumps({"a": 1}))
+    assert small.is_encoded("gzip") and small.encoded("gzip") == small.body
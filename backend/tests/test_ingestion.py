@@ -0,0 +1,119 @@
+import pandas as pd
+import pytest
+
+from analytics_engine import AnalyticsEngine, EngagementCube
+from ingestion import append_to_csv, ingest_batch, validate_batch
+from social_media_rag import AGGREGATE_DOCUMENT_TYPES
+
+
+def batch(*post_ids):
+    return validate_batch(pd.DataFrame([{
+        'post_id': post_id, 'post_type': 'reel', 'timestamp': '2024-03-04 10:00:00',
+        'likes': 10, 'comments': 2, 'shares': 1, 'views': 100, 'content': 'post',
+        'day_of_week': 'Monday', 'hour': 10,
+    } for post_id in post_ids]))
+
+
+class FakeRAG:
+    """The parts of SocialMediaEngagementRAG that ingest_batch drives"""
+
+    def __init__(self, fail_persist=False):
+        self.stats = None
+        self.fail_persist = fail_persist
+        self.rolled_back = None
+
+    def checkpoint(self):
+        return {"stats": self.stats}
+
+    def rollback(self, checkpoint, document_ids, refreshed=None):
+        self.stats = checkpoint["stats"]
+        self.rolled_back = document_ids
+
+    def update_stats(self, stats):
+        self.stats = stats
+
+    def add_sample_posts(self, df, offset):
+        return [f"doc-{offset + i}" for i in range(len(df))]
+
+    def refresh_aggregate_documents(self, summary):
+        return {"added": [], "removed": {}, "swapped": {}}
+
+    def persist(self):
+        if self.fail_persist:
+            raise OSError("disk full")
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = str(tmp_path / "data.csv")
+    append_to_csv(batch("a", "b"), path)
+    return path
+
+
+@pytest.fixture
+def engine(data_path):
+    return AnalyticsEngine(EngagementCube.from_frame(pd.read_csv(data_path)))
+
+
+def test_reuploaded_posts_are_skipped(data_path, engine):
+    result = ingest_batch(batch("b", "c"), FakeRAG(), engine, data_path)
+    assert result["rows"] == 1
+    assert result["duplicates_skipped"] == 1
+    assert engine.cube.total_posts == 3
+
+    result = ingest_batch(batch("b", "c"), FakeRAG(), engine, data_path)
+    assert result["rows"] == 0
+    assert engine.cube.total_posts == 3
+    assert pd.read_csv(data_path)['post_id'].tolist() == ["a", "b", "c"]
+
+
+def test_failed_batch_is_rolled_back(data_path, engine):
+    with open(data_path, "rb") as f:
+        before = f.read()
+    cube = engine.cube
+    data = cube.data.copy()
+    rag = FakeRAG(fail_persist=True)
+
+    with pytest.raises(OSError):
+        ingest_batch(batch("c", "d"), rag, engine, data_path)
+
+    with open(data_path, "rb") as f:
+        assert f.read() == before
+    assert engine.cube is cube
+    assert (cube.data == data).all()
+    assert rag.stats is None
+    assert rag.rolled_back == ["doc-2", "doc-3"]
+
+    # The posts were never stored, so they can be uploaded again
+    assert ingest_batch(batch("c", "d"), FakeRAG(), engine, data_path)["rows"] == 2
+
+
+def aggregate_texts(rag):
+    return sorted(doc.page_content for doc in rag.vector_store.docstore._dict.values()
+                  if doc.metadata["document_type"] in AGGREGATE_DOCUMENT_TYPES)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_aggregate_documents_follow_the_batch(make_rag, data_dir, monkeypatch, index_type):
+    monkeypatch.setenv("RAG_INDEX_TYPE", index_type)
+    rag = make_rag()
+    rag.load()
+    path = str(data_dir / "social_media_engagement_data.csv")
+    engine = AnalyticsEngine.from_csv(path)
+    before = aggregate_texts(rag)
+    count = len(before)
+    assert "Total posts analyzed: 3000" in "".join(before)
+
+    persist = rag.persist
+    rag.persist = FakeRAG(fail_persist=True).persist
+    with pytest.raises(OSError):
+        ingest_batch(batch("x1", "x2"), rag, engine, path)
+    assert aggregate_texts(rag) == before
+
+    rag.persist = persist
+    ingest_batch(batch("x1", "x2"), rag, engine, path)
+    after = aggregate_texts(rag)
+    assert len(after) == count
+    assert "Total posts analyzed: 3002" in "".join(after)
+    if index_type == "flat":
+        assert rag.vector_store.index.ntotal == len(rag.vector_store.docstore._dict)
@@ -0,0 +1,32 @@
+import uuid
+
+from langchain_core.messages import HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.messages import AIMessage
+
+from instrumentation import LLM_TOKENS, Histogram, token_callback
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.samples()[:3] == ['test_seconds_bucket{le="0.1"} 1', 'test_seconds_bucket{le="1.0"} 2',
+                                       'test_seconds_bucket{le="+Inf"} 3']
+
+
+def test_token_counter_estimates_and_forgets_unfinished_runs():
+    before = LLM_TOKENS.value(kind="completion", source="estimated")
+    counter = token_callback()
+    assert token_callback() is not counter
+
+    finished, abandoned = uuid.uuid4(), uuid.uuid4()
+    counter.on_chat_model_start({}, [[HumanMessage(content="what works for reels?")]], run_id=finished)
+    counter.on_chat_model_start({}, [[HumanMessage(content="and images?")]], run_id=abandoned)
+    result = LLMResult(generations=[[ChatGeneration(message=AIMessage(content="Post reels at 18:00"))]])
+    counter.on_llm_end(result, run_id=finished)
+    assert LLM_TOKENS.value(kind="completion", source="estimated") > before
+    assert list(counter._prompts) == [abandoned]
+
+    counter.discard()
+    assert counter._prompts == {}
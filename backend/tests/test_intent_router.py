@@ -0,0 +1,44 @@
+import pytest
+
+from intent_router import IntentRouter
+
+
+@pytest.fixture
+def router():
+    return IntentRouter()
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("hello", "greeting"),
+    ("what is the best time to post reels?", "best_time"),
+    ("best posting hour for videos", "best_time"),
+    ("which day is best for carousels?", "best_day"),
+    ("best day to post images", "best_day"),
+    ("best weekday to post reels", "best_day"),
+    ("compare reels and videos", "comparison"),
+    ("average likes for carousel posts", "metric_lookup"),
+])
+def test_routes_common_questions(router, query, intent):
+    assert router.classify(query)[0] == intent
+
+
+@pytest.mark.parametrize("query", [
+    "which day is worst for reels?",
+    "Which day should I avoid posting videos?",
+    "what time do images perform worst?",
+    "what is the total number of views?",
+    "which day gets the lowest engagement?",
+    "what time should I not post carousels?",
+    "what day did I post most?",
+    "is it better to post reels at 9am or 6pm?",
+    "which post type gets the best engagement on sundays?",
+    "average likes for reels on mondays",
+    "what is the best hour to post on saturday?",
+    "Best day for reels at 6pm?",
+    "average views of my top 10 reels",
+    "best time to post videos in the evening",
+    "and for videos?",
+    "what about the best time for that?",
+])
+def test_narrowed_negated_and_follow_up_questions_fall_through(router, query):
+    assert router.classify(query)[0] is None
@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+import llm_providers
+from llm_providers import FakeChatModel, OpenAICompatibleChatModel, create_llm
+
+MESSAGES = [SystemMessage(content="Be brief."), HumanMessage(content="Which post type is best?")]
+
+
+def test_fake_model_is_deterministic_per_prompt_and_seed():
+    model = FakeChatModel(latency_ms=0, tokens_per_second=0, response_tokens=12)
+    answer = model.invoke(MESSAGES).content
+    assert len(answer.split()) == 12
+    assert model.invoke(MESSAGES).content == answer
+    assert "".join(chunk.content for chunk in model.stream(MESSAGES)) == answer
+    assert FakeChatModel(latency_ms=0, tokens_per_second=0, response_tokens=12, seed=1).invoke(MESSAGES).content != answer
+
+
+def test_create_llm_reads_the_provider_settings(monkeypatch):
+    monkeypatch.setenv("RAG_FAKE_RESPONSE_TOKENS", "5")
+    monkeypatch.setenv("RAG_LLM_BASE_URL", "http://llm.test/v1")
+    assert create_llm("fake").response_tokens == 5
+    assert create_llm("openai").base_url == "http://llm.test/v1"
+    with pytest.raises(ValueError):
+        create_llm("unknown")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Route the OpenAI-compatible model's HTTP calls to an in-process handler; returns the requests seen"""
+    requests = []
+
+    def handle(request):
+        body = json.loads(request.content)
+        requests.append((request, body))
+        if not body["stream"]:
+            return httpx.Response(200, json={"choices": [{"message": {"content": "Reels."}}]})
+        events = [{"choices": [{"delta": {"role": "assistant"}}]},
+                  {"choices": [{"delta": {"content": "Re"}}]},
+                  {"choices": [{"delta": {"content": "els."}}]}]
+        text = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=text, headers={"Content-Type": "text/event-stream"})
+
+    transport = httpx.MockTransport(handle)
+    client, async_client = httpx.Client, httpx.AsyncClient
+    monkeypatch.setattr(llm_providers.httpx, "Client", lambda **kwargs: client(transport=transport, **kwargs))
+    monkeypatch.setattr(llm_providers.httpx, "AsyncClient",
+                        lambda **kwargs: async_client(transport=transport, **kwargs))
+    return requests
+
+
+def test_openai_compatible_request_and_answer(server):
+    model = OpenAICompatibleChatModel(base_url="http://llm.test/v1/", model="m", api_key="k", max_tokens=50)
+    assert model.invoke(MESSAGES).content == "Reels."
+
+    request, body = server[0]
+    assert str(request.url) == "http://llm.test/v1/chat/completions"
+    assert request.headers["Authorization"] == "Bearer k"
+    assert body["messages"] == [{"role": "system", "content": "Be brief."},
+                                {"role": "user", "content": "Which post type is best?"}]
+    assert body["max_tokens"] == 50 and body["stream"] is False
+
+
+def test_openai_compatible_streaming(server):
+    model = OpenAICompatibleChatModel(base_url="http://llm.test/v1")
+    assert [chunk.content for chunk in model.stream(MESSAGES)] == ["Re", "els."]
+
+    async def collect():
+        return [chunk.content async for chunk in model.astream(MESSAGES)]
+
+    assert asyncio.run(collect()) == ["Re", "els."]
+    assert "Authorization" not in server[0][0].headers
+
+
+def test_openai_compatible_errors_are_raised(monkeypatch):
+    transport = httpx.MockTransport(lambda request: httpx.Response(500))
+    client = httpx.AsyncClient
+    monkeypatch.setattr(llm_providers.httpx, "AsyncClient", lambda **kwargs: client(transport=transport, **kwargs))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(OpenAICompatibleChatModel().ainvoke(MESSAGES))
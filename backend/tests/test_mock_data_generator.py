@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from ingestion import SCHEMA_COLUMNS, validate_batch
+from mock_data_generator import generate_mock_data_vectorized, write_mock_data
+
+END = datetime(2024, 6, 1)
+
+
+def test_same_seed_gives_the_same_rows():
+    first = generate_mock_data_vectorized(500, seed=3, chunk_size=200, end_date=END)
+    again = generate_mock_data_vectorized(500, seed=3, chunk_size=200, end_date=END)
+    other = generate_mock_data_vectorized(500, seed=4, chunk_size=200, end_date=END)
+    pd.testing.assert_frame_equal(first, again)
+    assert not first['post_id'].isin(other['post_id']).any()
+
+
+def test_rows_match_the_engagement_schema():
+    df = generate_mock_data_vectorized(400, seed=1, chunk_size=150, end_date=END)
+    assert list(df.columns) == SCHEMA_COLUMNS
+    assert df['post_id'].is_unique
+    timestamps = pd.to_datetime(df['timestamp'])
+    assert (timestamps < END).all()
+    assert (timestamps.dt.hour == df['hour']).all()
+    assert (timestamps.dt.day_name() == df['day_of_week']).all()
+    # The batch validator accepts generated data as an upload
+    assert len(validate_batch(df)) == 400
+
+
+def test_written_file_does_not_depend_on_workers(tmp_path):
+    single, pooled = str(tmp_path / "single.csv"), str(tmp_path / "pooled.csv")
+    write_mock_data(single, 900, seed=5, chunk_size=200, workers=1, end_date=END)
+    write_mock_data(pooled, 900, seed=5, chunk_size=200, workers=2, end_date=END)
+    with open(single, "rb") as a, open(pooled, "rb") as b:
+        assert a.read() == b.read()
+    assert len(pd.read_csv(single)) == 900
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_mock_data(str(tmp_path / "data.json"), 10, file_format="json")
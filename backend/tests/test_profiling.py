@@ -0,0 +1,44 @@
+import pytest
+
+import profiling
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    def configure(token="", allow_unauthenticated=False):
+        monkeypatch.setattr(profiling, "PROFILE_TOKEN", token)
+        monkeypatch.setattr(profiling, "ALLOW_UNAUTHENTICATED", allow_unauthenticated)
+    return configure
+
+
+def test_closed_without_token(settings):
+    settings()
+    assert not profiling.profile_requested({"x-profile": "1"})
+    assert not profiling.admin_allowed({"x-profile": "1"})
+    assert not profiling.admin_allowed({})
+
+
+def test_token_required_when_set(settings):
+    settings(token="secret")
+    assert profiling.profile_requested({"x-profile": "secret"})
+    assert profiling.admin_allowed({"x-profile": "secret"})
+    assert not profiling.profile_requested({"x-profile": "1"})
+    assert not profiling.admin_allowed({"x-profile": "wrong"})
+    assert not profiling.admin_allowed({})
+
+
+def test_explicit_unauthenticated_mode(settings):
+    settings(allow_unauthenticated=True)
+    assert profiling.profile_requested({"x-profile": "1"})
+    assert not profiling.profile_requested({"x-profile": "0"})
+    assert not profiling.profile_requested({})
+    assert profiling.admin_allowed({})
+
+
+def test_profile_ids_are_bare_names(tmp_path):
+    store = profiling.ProfileStore(str(tmp_path), keep=2)
+    for i in range(3):
+        store.save(f"p{i}.pstats", b"x")
+    assert len(store.list()) == 2
+    assert store.path("../app.py") is None
+    assert store.path(".tmp-p0.pstats") is None
@@ -0,0 +1,45 @@
+import pytest
+
+from llm_providers import create_llm
+from prompt_context import StatsContext
+
+
+@pytest.fixture
+def rag(make_rag):
+    rag = make_rag(retrieval=False)
+    rag.load()
+    return rag
+
+
+def test_chain_and_context_are_built_once_per_data_version(rag):
+    chain = rag.create_qa_chain()
+    context = rag._get_stats_context()
+    rag._prepare_query("how do reels do?")
+    assert rag.create_qa_chain() is chain
+    assert rag._get_stats_context() is context
+
+    rag.stats = dict(rag.stats, total_posts=1)
+    refreshed = rag._get_stats_context()
+    assert refreshed is not context
+    assert "Total posts analyzed: 1" in refreshed.full
+    assert rag.create_qa_chain() is chain
+
+    rag.llm = create_llm("fake")
+    assert rag.create_qa_chain() is not chain
+
+
+def test_context_is_narrowed_to_the_post_types_asked_about(rag):
+    context = rag._get_stats_context()
+    _, inputs = rag._prepare_query("how do reels compare with images?")
+    assert inputs["context"] == context.render(["reel", "image"])
+    assert "VIDEO POSTS" not in inputs["context"]
+
+    _, inputs = rag._prepare_query("how do my posts do?")
+    assert inputs["context"] == context.full
+
+
+def test_render_falls_back_to_the_full_summary(rag):
+    context = StatsContext(rag.stats)
+    assert context.render(["story"]) == context.full
+    assert context.render(context.post_types) == context.full
+    assert sorted(context.post_types_in("Carousel or VIDEO?")) == ["carousel", "video"]
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from query_executor import BoundedQueryExecutor, QueueFullError
+
+
+def test_failed_query_is_counted(make_rag, monkeypatch):
+    rag = make_rag(retrieval=False)
+    rag.load()
+
+    def unavailable(*args):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(rag, "_prepare_query", unavailable)
+    executor = BoundedQueryExecutor(max_concurrency=2, max_workers=1)
+
+    async def ask():
+        await executor.run(rag.aquery, "Write a caption for my next reel")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ask())
+    assert executor.metrics()["failed"] == 1
+    assert executor.metrics()["completed"] == 0
+    assert executor.active == 0
+
+
+def test_concurrency_is_bounded_and_overflow_rejected():
+    executor = BoundedQueryExecutor(max_concurrency=2, max_workers=1, max_queue=1)
+    peak = []
+
+    async def work():
+        peak.append(executor.active)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        tasks = [asyncio.create_task(executor.run(work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        # Two running and one waiting, so a fourth can't queue
+        with pytest.raises(QueueFullError):
+            await executor.run(work)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert max(peak) == 2
+    metrics = executor.metrics()
+    assert metrics["completed"] == 3
+    assert metrics["rejected"] == 1
+    assert metrics["queue_depth"] == 0
+
+
+def test_blocking_work_runs_on_the_pool():
+    executor = BoundedQueryExecutor(max_workers=1)
+    name = asyncio.run(executor.run_blocking(lambda: threading.current_thread().name))
+    executor.shutdown()
+    assert name.startswith("rag-worker")
@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+
+import app as app_module
+
+
+class FakeRAG:
+    retrieval = False
+    llm_provider = "fake"
+    load_timings = {"llm": 0.0}
+
+
+@pytest.fixture
+def warmup(monkeypatch):
+    """Warmup with no backoff, whose RAG load fails ``failures[0]`` times before succeeding"""
+    monkeypatch.setattr(app_module, "startup_state",
+                        {"ready": False, "error": None, "seconds": None, "attempts": 0, "components": {}})
+    monkeypatch.setattr(app_module, "warmup_task", None)
+    monkeypatch.setattr(app_module, "WARMUP_MODE", "background")
+    monkeypatch.setattr(app_module, "WARMUP_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(app_module, "get_analytics_engine", lambda: None)
+    failures = [0]
+
+    def get_rag_system():
+        if failures[0]:
+            failures[0] -= 1
+            raise RuntimeError("model download failed")
+        return FakeRAG()
+
+    monkeypatch.setattr(app_module, "get_rag_system", get_rag_system)
+    return failures
+
+
+def test_warmup_retries_after_a_failure(warmup):
+    warmup[0] = 2
+    asyncio.run(app_module.warm_up())
+    assert app_module.startup_state["ready"]
+    assert app_module.startup_state["attempts"] == 3
+    assert app_module.startup_state["error"] is None
+
+
+def test_ready_probe_restarts_a_failed_warmup(warmup, monkeypatch):
+    monkeypatch.setattr(app_module, "WARMUP_RETRIES", 0)
+    warmup[0] = 1
+
+    async def probe():
+        await app_module.warm_up()
+        assert not app_module.startup_state["ready"]
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/api/ready")
+            await app_module.warmup_task
+            second = await client.get("/api/ready")
+        return first, second
+
+    first, second = asyncio.run(probe())
+    assert first.status_code == 503
+    assert first.json()["error"] == "model download failed"
+    assert second.status_code == 200
+    assert second.json()["attempts"] == 2
+
+
+def test_ready_probe_reports_loading_then_ready(warmup, monkeypatch):
+    monkeypatch.setattr(app_module, "rag_system", None)
+
+    async def probe():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            loading = await client.get("/api/ready")
+            await app_module.warmup_task
+            monkeypatch.setattr(app_module, "rag_system", FakeRAG())
+            ready = await client.get("/api/ready")
+        return loading, ready
+
+    loading, ready = asyncio.run(probe())
+    assert loading.status_code == 503
+    assert loading.json()["ready"] is False
+    assert ready.status_code == 200
+    assert ready.json()["llm_provider"] == "fake"
+    assert "llm" in ready.json()["components"]
+
+
+def test_second_load_reuses_prebuilt_artifacts(make_rag):
+    first = make_rag()
+    first.load()
+    assert "rebuild" in first.load_timings
+
+    second = make_rag()
+    second.load()
+    assert "rebuild" not in second.load_timings
+    assert second.stats == first.stats
+    assert second.vector_store.index.ntotal == first.vector_store.index.ntotal
+
+
+def test_without_retrieval_no_embedding_model_is_loaded(make_rag):
+    rag = make_rag(retrieval=False)
+    rag.load()
+    assert rag.embeddings is None and rag.vector_store is None
+    assert rag.stats["total_posts"] == 3000
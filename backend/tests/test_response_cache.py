@@ -0,0 +1,30 @@
+import asyncio
+
+QUESTION = "why do reels get more views than images?"
+
+
+def test_repeated_question_is_answered_from_the_cache(make_rag):
+    rag = make_rag()
+    first = asyncio.run(rag.aquery(QUESTION))
+    assert asyncio.run(rag.aquery(QUESTION)) == first
+    assert rag.response_cache.hits == 1
+
+
+def test_answers_in_a_conversation_bypass_the_cache(make_rag):
+    rag = make_rag()
+    asyncio.run(rag.aquery(QUESTION))
+    history = [("which post type is best?", None), (None, "Reels.")]
+
+    asyncio.run(rag.aquery(QUESTION, history))
+    asyncio.run(rag.aquery(QUESTION, history_summary="The user asked about reels."))
+    assert rag.response_cache.hits == 0
+    assert len(rag.response_cache._entries) == 1
+
+
+def test_filters_and_top_k_scope_the_cache(make_rag):
+    rag = make_rag()
+    asyncio.run(rag.aquery(QUESTION))
+    asyncio.run(rag.aquery(QUESTION, filters={"post_type": "reel"}))
+    asyncio.run(rag.aquery(QUESTION, k=2))
+    assert rag.response_cache.hits == 0
+    assert len(rag.response_cache._entries) == 3
@@ -0,0 +1,40 @@
+import pytest
+
+QUESTION = "when do my posts get the most likes?"
+
+
+@pytest.fixture
+def rag(make_rag):
+    rag = make_rag(retrieval_k=5)
+    rag.load()
+    return rag
+
+
+def test_unfiltered_search_returns_top_k(rag):
+    assert len(rag.retrieve(QUESTION)) == 5
+    assert len(rag.retrieve(QUESTION, k=2)) == 2
+
+
+def test_filters_restrict_metadata(rag):
+    documents = rag.retrieve(QUESTION, filters={"document_type": "sample_post", "post_type": "reel"})
+    assert len(documents) == 5
+    assert all(d.metadata["document_type"] == "sample_post" and d.metadata["post_type"] == "reel"
+               for d in documents)
+
+
+def test_filter_values_are_normalized(rag):
+    # Hours arrive as strings from JSON clients and lists match any value
+    documents = rag.retrieve(QUESTION, k=10, filters={"document_type": "sample_post", "hour": ["9", 18],
+                                                      "unknown": "ignored", "day": None})
+    assert documents
+    assert {d.metadata["hour"] for d in documents} <= {9, 18}
+
+
+def test_filtered_queries_skip_the_intent_router(rag):
+    routed, _, documents = rag._cached_or_retrieve("what is the best time to post reels?")
+    assert routed is not None and documents == []
+
+    answer, _, documents = rag._cached_or_retrieve("what is the best time to post reels?",
+                                                   filters={"post_type": "reel"})
+    assert answer is None
+    assert documents and all(d.metadata.get("post_type") == "reel" for d in documents)
@@ -0,0 +1,50 @@
+import numpy as np
+
+from semantic_cache import SemanticResponseCache
+
+
+def vector(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_near_duplicates_hit_and_distant_questions_miss(tmp_path):
+    cache = SemanticResponseCache(str(tmp_path / "stats.json"), threshold=0.95)
+    cache.store(vector(1, 0, 0), "reels")
+    assert cache.lookup(vector(1, 0.05, 0)) == "reels"
+    assert cache.lookup(vector(0, 1, 0)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_answers_are_only_reused_in_their_scope(tmp_path):
+    cache = SemanticResponseCache(str(tmp_path / "stats.json"))
+    cache.store(vector(1, 0, 0), "top 4", scope="[4, {}]")
+    assert cache.lookup(vector(1, 0, 0), scope='[4, {"post_type": "reel"}]') is None
+    assert cache.lookup(vector(1, 0, 0), scope="[4, {}]") == "top 4"
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = SemanticResponseCache(str(tmp_path / "stats.json"), max_entries=2)
+    cache.store(vector(1, 0, 0), "a")
+    cache.store(vector(0, 1, 0), "b")
+    cache.lookup(vector(1, 0, 0))
+    cache.store(vector(0, 0, 1), "c")
+    assert cache.evictions == 1
+    assert cache.lookup(vector(0, 1, 0)) is None
+    assert cache.lookup(vector(1, 0, 0)) == "a"
+
+
+def test_expired_answers_miss(tmp_path):
+    cache = SemanticResponseCache(str(tmp_path / "stats.json"), ttl_seconds=1e-9)
+    cache.store(vector(1, 0, 0), "stale")
+    assert cache.lookup(vector(1, 0, 0)) is None
+    assert cache.metrics()["entries"] == 0
+
+
+def test_changed_stats_file_clears_the_cache(tmp_path):
+    stats = tmp_path / "stats.json"
+    stats.write_text("{}")
+    cache = SemanticResponseCache(str(stats))
+    cache.store(vector(1, 0, 0), "old")
+    stats.write_text('{"total_posts": 1}')
+    assert cache.lookup(vector(1, 0, 0)) is None
+    assert cache.invalidations == 1
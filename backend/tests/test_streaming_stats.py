@@ -0,0 +1,46 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_FILE
+from streaming_stats import EngagementAccumulator, peak_rss_mb, read_engagement_csv
+
+
+def test_peak_rss_without_resource_module(monkeypatch):
+    assert peak_rss_mb() > 0
+    # As on Windows, where there is no resource module
+    monkeypatch.setitem(sys.modules, "resource", None)
+    monkeypatch.setitem(sys.modules, "psutil", None)
+    assert peak_rss_mb() == 0.0
+
+
+def test_chunked_pass_matches_the_whole_frame(data_dir):
+    path = str(data_dir / DATA_FILE)
+    whole = EngagementAccumulator.from_frame(pd.read_csv(path))
+    chunked = EngagementAccumulator()
+    for chunk in read_engagement_csv(path, 700):
+        chunked.add_chunk(chunk)
+
+    assert chunked.chunks == 5
+    assert chunked.rows == whole.rows == 3000
+    assert np.allclose(chunked.table, whole.table)
+    chunked_stats, whole_stats = chunked.to_stats(), whole.to_stats()
+    averages = chunked_stats.pop("avg_engagement_by_type")
+    for metric, by_type in whole_stats.pop("avg_engagement_by_type").items():
+        assert averages[metric] == pytest.approx(by_type)
+    assert chunked_stats.pop("engagement_rate_by_type") == pytest.approx(whole_stats.pop("engagement_rate_by_type"))
+    assert chunked_stats == whole_stats
+    for post_type in whole.post_types():
+        # The histogram estimate of the top decile stays close to the exact one
+        assert chunked.top_decile_content(post_type) == pytest.approx(whole.top_decile_content(post_type), rel=0.1)
+
+
+def test_streaming_rebuild_reports_chunks(make_rag):
+    rag = make_rag(chunksize=1000, retrieval=False)
+    rag.load()
+    assert rag.load_report["mode"] == "streaming"
+    assert rag.load_report["rows"] == 3000
+    assert rag.load_report["chunks"] == 3
+    assert rag.stats["total_posts"] == 3000
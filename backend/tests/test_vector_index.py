@@ -0,0 +1,65 @@
+import faiss
+import numpy as np
+import pytest
+
+from benchmarks.bench_ann import recall_at_k, synthetic_vectors
+from vector_index import (INDEX_TYPES, build_key, configure_search, create_index, describe, index_spec_from_env,
+                          supports_removal)
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return synthetic_vectors(20_000, 32, clusters=50)
+
+
+def spec(kind, **overrides):
+    return dict(index_spec_from_env(), type=kind, **overrides)
+
+
+@pytest.mark.parametrize("kind", INDEX_TYPES)
+def test_index_types_recall_the_exact_neighbours(vectors, kind):
+    index = create_index(spec(kind, nprobe=16), vectors)
+    index.add(vectors)
+    queries = vectors[:100]
+    _, truth = faiss.knn(queries, vectors, 4)
+    _, found = index.search(queries, 4)
+    assert recall_at_k(found, truth) >= (0.99 if kind != "ivf_pq" else 0.5)
+    assert describe(index)["vectors"] == len(vectors)
+
+
+def test_few_vectors_fall_back_to_simpler_indexes(vectors):
+    assert isinstance(create_index(spec("ivf_flat"), vectors[:50]), faiss.IndexFlatL2)
+    assert isinstance(create_index(spec("ivf_pq"), vectors[:1000]), faiss.IndexIVFFlat)
+
+
+def test_search_parameters_are_applied_at_load(vectors):
+    ivf = create_index(spec("ivf_flat"), vectors)
+    configure_search(ivf, spec("ivf_flat", nprobe=3))
+    assert describe(ivf)["nprobe"] == 3
+    hnsw = create_index(spec("hnsw"), vectors)
+    configure_search(hnsw, spec("hnsw", ef_search=17))
+    assert describe(hnsw)["ef_search"] == 17
+    assert not supports_removal(hnsw) and supports_removal(ivf)
+
+
+def test_build_key_ignores_search_parameters():
+    assert build_key(spec("ivf_flat", nprobe=1)) == build_key(spec("ivf_flat", nprobe=64))
+    assert build_key(spec("hnsw", hnsw_m=16)) != build_key(spec("hnsw", hnsw_m=32))
+    assert build_key(spec("flat")) == {"type": "flat"}
+
+
+def test_unknown_index_type_is_rejected(monkeypatch):
+    monkeypatch.setenv("RAG_INDEX_TYPE", "annoy")
+    with pytest.raises(ValueError):
+        index_spec_from_env()
+
+
+def test_each_index_type_gets_its_own_artifact(make_rag, monkeypatch):
+    flat = make_rag()
+    flat.load()
+    monkeypatch.setenv("RAG_INDEX_TYPE", "hnsw")
+    hnsw = make_rag()
+    hnsw.load()
+    assert hnsw.index_path != flat.index_path
+    assert isinstance(hnsw.vector_store.index, faiss.IndexHNSW)
+    assert hnsw.vector_store.index.ntotal == flat.vector_store.index.ntotal
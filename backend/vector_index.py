@@ -0,0 +1,122 @@
+import os
+import math
+from typing import Any, Dict
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+# FAISS warns below ~39 training points per IVF list
+MIN_POINTS_PER_LIST = 39
+
+
+def index_spec_from_env() -> Dict[str, Any]:
+    """Index type and build/search parameters from RAG_INDEX_* variables"""
+    kind = os.environ.get("RAG_INDEX_TYPE", "flat")
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown RAG_INDEX_TYPE '{kind}', expected one of {', '.join(INDEX_TYPES)}")
+    return {
+        "type": kind,
+        "nlist": int(os.environ.get("RAG_INDEX_NLIST", 0)),  # 0 picks ~4 * sqrt(n)
+        "hnsw_m": int(os.environ.get("RAG_INDEX_HNSW_M", 32)),
+        "ef_construction": int(os.environ.get("RAG_INDEX_EF_CONSTRUCTION", 80)),
+        "pq_m": int(os.environ.get("RAG_INDEX_PQ_M", 0)),  # 0 picks from the dimension
+        "pq_nbits": int(os.environ.get("RAG_INDEX_PQ_NBITS", 8)),
+        "train_sample": int(os.environ.get("RAG_INDEX_TRAIN_SAMPLE", 50_000)),
+        "nprobe": int(os.environ.get("RAG_INDEX_NPROBE", 8)),
+        "ef_search": int(os.environ.get("RAG_INDEX_EF_SEARCH", 64)),
+    }
+
+
+def build_key(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """The parameters that change what is written to disk; search parameters are applied at load"""
+    kind = spec["type"]
+    key = {"type": kind}
+    if kind in ("ivf_flat", "ivf_pq"):
+        key["nlist"] = spec["nlist"]
+    if kind == "hnsw":
+        key.update(hnsw_m=spec["hnsw_m"], ef_construction=spec["ef_construction"])
+    if kind == "ivf_pq":
+        key.update(pq_m=spec["pq_m"], pq_nbits=spec["pq_nbits"])
+    return key
+
+
+def _nlist(spec: Dict[str, Any], n: int) -> int:
+    nlist = spec["nlist"] or int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // MIN_POINTS_PER_LIST))
+
+
+def _pq_m(spec: Dict[str, Any], dim: int) -> int:
+    if spec["pq_m"]:
+        return spec["pq_m"]
+    # Sub-quantizers of 8 dimensions, like 48 for MiniLM's 384; m must divide the dimension
+    return next(m for m in (dim // 8, 64, 48, 32, 24, 16, 8, 4, 2, 1) if m and dim % m == 0)
+
+
+def create_index(spec: Dict[str, Any], vectors: np.ndarray, seed: int = 0) -> faiss.Index:
+    """Empty index of the configured type, trained on a sample of ``vectors``.
+
+    Falls back to a flat index when there are too few vectors to train the quantizers.
+    """
+    n, dim = vectors.shape
+    kind = spec["type"]
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, spec["hnsw_m"])
+        index.hnsw.efConstruction = spec["ef_construction"]
+        configure_search(index, spec)
+        return index
+    if kind == "flat" or n < MIN_POINTS_PER_LIST * 2:
+        if kind != "flat":
+            print(f"Only {n} vectors, using a flat index instead of {kind}")
+        return faiss.IndexFlatL2(dim)
+
+    if kind == "ivf_pq" and n < MIN_POINTS_PER_LIST * 2 ** spec["pq_nbits"]:
+        # Each PQ codebook has 2^nbits centroids to train
+        print(f"Only {n} vectors, using ivf_flat instead of ivf_pq")
+        kind = "ivf_flat"
+
+    nlist = _nlist(spec, n)
+    quantizer = faiss.IndexFlatL2(dim)
+    if kind == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_m(spec, dim), spec["pq_nbits"])
+    sample = vectors
+    if n > spec["train_sample"]:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, spec["train_sample"], replace=False)]
+    index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    configure_search(index, spec)
+    return index
+
+
+def configure_search(index: faiss.Index, spec: Dict[str, Any]):
+    """Apply nprobe / efSearch; a no-op for flat indexes"""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = spec["ef_search"]
+        return
+    try:
+        faiss.extract_index_ivf(index).nprobe = spec["nprobe"]
+    except RuntimeError:
+        pass
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """Whether vectors can be deleted from the index; HNSW graphs can't drop nodes"""
+    return not isinstance(index, faiss.IndexHNSW)
+
+
+def describe(index: faiss.Index) -> Dict[str, Any]:
+    """Type, size and search parameters of an index; serializes it, so not for hot paths"""
+    info = {"class": type(index).__name__, "vectors": int(index.ntotal),
+            "bytes": int(faiss.serialize_index(index).nbytes)}
+    if isinstance(index, faiss.IndexHNSW):
+        info["ef_search"] = int(index.hnsw.efSearch)
+    else:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+            info.update(nlist=int(ivf.nlist), nprobe=int(ivf.nprobe))
+        except RuntimeError:
+            pass
+    return info
@@ -13,7 +13,9 @@ const ChatInterface = () => {
   ]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [streamingId, setStreamingId] = useState(null);
   const messagesEndRef = useRef(null);
+  const abortRef = useRef(null);
   const { user, isSignedIn } = useUser();
 
   // Set up user in local storage for API calls
@@ -55,6 +57,9 @@ const ChatInterface = () => {
     scrollToBottom();
   }, [messages]);
 
+  // Cancel any in-flight stream when the component unmounts
+  useEffect(() => () => abortRef.current?.abort(), []);
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     if (!input.trim()) return;
@@ -65,23 +70,33 @@ const ChatInterface = () => {
     setInput('');
     setIsLoading(true);
 
+    const botId = Date.now() + 1;
+    const controller = new AbortController();
+    abortRef.current = controller;
+
     try {
-      // Call API to get response
-      const response = await chatService.sendMessage(input);
-      
-      setMessages(prev => [...prev, { 
-        id: Date.now(), 
-        text: response, 
-        sender: 'bot' 
-      }]);
+      // Stream the response, showing tokens as they arrive
+      await chatService.streamMessage(input, (token) => {
+        setStreamingId(botId);
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          if (last && last.id === botId) {
+            return [...prev.slice(0, -1), { ...last, text: last.text + token }];
+          }
+          return [...prev, { id: botId, text: token, sender: 'bot' }];
+        });
+      }, controller.signal);
     } catch (error) {
+      if (error.name === 'AbortError') return;
       console.error('Error getting response:', error);
-      setMessages(prev => [...prev, { 
-        id: Date.now(), 
+      setMessages(prev => [...prev.filter(msg => msg.id !== botId), { 
+        id: botId, 
         text: "I'm having trouble connecting to the analytics service. Please try again.", 
         sender: 'bot' 
       }]);
     } finally {
+      abortRef.current = null;
+      setStreamingId(null);
       setIsLoading(false);
     }
   };
@@ -119,7 +134,7 @@ const ChatInterface = () => {
             </div>
           </div>
         ))}
-        {isLoading && (
+        {isLoading && streamingId === null && (
           <div className="flex justify-start">
             <div className="bg-white shadow-md border border-gray-200 text-gray-800 p-3 rounded-lg rounded-bl-none max-w-xs lg:max-w-md">
               <div className="flex space-x-2">
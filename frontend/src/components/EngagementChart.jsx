@@ -1,78 +1,189 @@
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
+import { analyticsService } from '../services/apiService';
+
+const COLORS = ['rgb(79, 70, 229)', 'rgb(129, 140, 248)', 'rgb(165, 180, 252)', 'rgb(199, 210, 254)', 'rgb(224, 231, 255)'];
+
+const formatValue = (value) => (value >= 1000 ? `${(value / 1000).toFixed(1)}K` : `${Math.round(value * 10) / 10}`);
+
+const average = (values) => values.reduce((sum, v) => sum + v, 0) / (values.length || 1);
+
+// Heatmaps also draw as bars (average by day) or a line (average by hour)
+const toSeries = (data, view) => {
+  if (data.kind !== 'heatmap') return { labels: data.labels, series: data.series };
+  if (view === 'line') {
+    return {
+      labels: data.columns,
+      series: [{ name: 'Engagement rate', values: data.columns.map((_, h) => average(data.values.map((row) => row[h]))) }],
+    };
+  }
+  return { labels: data.rows, series: [{ name: 'Engagement rate', values: data.values.map(average) }] };
+};
+
+const BarChart = ({ labels, series }) => {
+  const [active, setActive] = useState(0);
+  const values = (series[active] || series[0]).values;
+  const max = Math.max(...values, 0) || 1;
+  return (
+    <div className="w-full px-4">
+      {series.length > 1 && (
+        <div className="flex justify-center space-x-2 mb-2">
+          {series.map((s, i) => (
+            <button
+              key={s.name}
+              onClick={() => setActive(i)}
+              className={`text-xs px-2 py-1 rounded ${i === active ? 'bg-indigo-600 text-white' : 'bg-white text-gray-600'}`}
+            >
+              {s.name}
+            </button>
+          ))}
+        </div>
+      )}
+      <div className="flex items-end justify-center h-44 space-x-2">
+        {values.map((value, i) => (
+          <div key={labels[i]} className="flex flex-col items-center flex-1 max-w-[4rem]">
+            <span className="text-xs text-gray-600 mb-1">{formatValue(value)}</span>
+            <div className="w-full bg-indigo-500 rounded-t" style={{ height: `${(value / max) * 8}rem` }}></div>
+            <span className="text-xs mt-1 capitalize truncate w-full text-center">{labels[i]}</span>
+          </div>
+        ))}
+      </div>
+    </div>
+  );
+};
+
+const LineChart = ({ labels, series }) => {
+  const values = series[0].values;
+  const max = Math.max(...values);
+  const min = Math.min(...values);
+  const range = max - min || 1;
+  const step = 400 / Math.max(values.length - 1, 1);
+  const points = values.map((v, i) => `${i * step},${90 - ((v - min) / range) * 80}`).join(' L ');
+  return (
+    <div className="w-full h-48 px-4 flex flex-col justify-center">
+      <svg className="w-full h-32" viewBox="0 0 400 100" preserveAspectRatio="none">
+        <path d={`M ${points}`} fill="none" stroke="rgb(79, 70, 229)" strokeWidth="3" />
+      </svg>
+      <div className="flex justify-between text-xs text-gray-500 mt-1">
+        <span>{labels[0]}</span>
+        <span>{series[0].name}: {formatValue(min)} – {formatValue(max)}</span>
+        <span>{labels[labels.length - 1]}</span>
+      </div>
+    </div>
+  );
+};
+
+const PieChart = ({ labels, series }) => {
+  const values = series[0].values;
+  const total = values.reduce((sum, v) => sum + v, 0) || 1;
+  let offset = 0;
+  return (
+    <div className="flex items-center space-x-6">
+      <svg className="w-32 h-32 -rotate-90" viewBox="0 0 32 32">
+        {values.map((value, i) => {
+          const share = (value / total) * 100;
+          const slice = (
+            <circle key={labels[i]} r="16" cx="16" cy="16" fill="transparent"
+              stroke={COLORS[i % COLORS.length]} strokeWidth="32"
+              strokeDasharray={`${share} 100`} strokeDashoffset={-offset} pathLength="100" />
+          );
+          offset += share;
+          return slice;
+        })}
+      </svg>
+      <ul className="text-xs space-y-1">
+        {values.map((value, i) => (
+          <li key={labels[i]} className="flex items-center capitalize">
+            <span className="w-3 h-3 mr-2 rounded-sm" style={{ backgroundColor: COLORS[i % COLORS.length] }}></span>
+            {labels[i]} ({((value / total) * 100).toFixed(1)}%)
+          </li>
+        ))}
+      </ul>
+    </div>
+  );
+};
+
+const Heatmap = ({ data }) => {
+  const flat = data.values.flat();
+  const max = Math.max(...flat);
+  const min = Math.min(...flat);
+  const range = max - min || 1;
+  return (
+    <div className="w-full px-2">
+      {data.values.map((row, d) => (
+        <div key={data.rows[d]} className="flex items-center">
+          <span className="w-10 text-xs text-gray-600">{data.rows[d].slice(0, 3)}</span>
+          {row.map((value, h) => (
+            <div key={h} className="flex-1 h-6 m-px rounded-sm" title={`${data.rows[d]} ${data.columns[h]}: ${value}%`}
+              style={{ backgroundColor: `rgba(79, 70, 229, ${0.1 + ((value - min) / range) * 0.9})` }}></div>
+          ))}
+        </div>
+      ))}
+      <div className="flex justify-between text-xs text-gray-500 ml-10 mt-1">
+        <span>{data.columns[0]}</span>
+        <span>{data.columns[data.columns.length - 1]}</span>
+      </div>
+    </div>
+  );
+};
+
+// Draws chart data from /api/charts client-side; `chartType` picks the data, `type` the initial view.
+// Pass `data` (e.g. from the dashboard response) to skip the request.
+const EngagementChart = ({ title, chartType = 'engagement_by_post_type', type = 'bar', filters = {}, data: preloaded }) => {
+  const [view, setView] = useState(type);
+  const [data, setData] = useState(preloaded || null);
+  const [isLoading, setIsLoading] = useState(!preloaded);
+  // Compared by value: callers usually pass a new filters object on every render
+  const filterKey = JSON.stringify(filters);
+
+  useEffect(() => {
+    if (preloaded) {
+      setData(preloaded);
+      setIsLoading(false);
+      return undefined;
+    }
+    let cancelled = false;
+    setIsLoading(true);
+    analyticsService.getChartData(chartType, JSON.parse(filterKey)).then((chartData) => {
+      if (!cancelled) {
+        setData(chartData);
+        setIsLoading(false);
+      }
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [chartType, filterKey, preloaded]);
+
+  const views = data?.kind === 'heatmap' ? ['heatmap', 'bar', 'line'] : ['bar', 'line', 'pie'];
+  const { labels, series } = data ? toSeries(data, view) : {};
 
-// Note: In a real application, you'd use a charting library like Chart.js or Recharts
-// This component simulates a chart with a simple UI since we're focusing on structure
-const EngagementChart = ({ title, type = 'bar' }) => {
-  const [chartType, setChartType] = useState(type);
-  
   return (
     <div className="bg-white rounded-lg shadow-md p-6">
       <div className="flex justify-between items-center mb-4">
         <h3 className="text-lg font-medium text-gray-900">{title}</h3>
         <select
-          value={chartType}
-          onChange={(e) => setChartType(e.target.value)}
+          value={view}
+          onChange={(e) => setView(e.target.value)}
           className="rounded border-gray-300 text-sm"
         >
-          <option value="bar">Bar Chart</option>
-          <option value="line">Line Chart</option>
-          <option value="pie">Pie Chart</option>
+          {views.map((v) => (
+            <option key={v} value={v}>{`${v.charAt(0).toUpperCase()}${v.slice(1)}`} Chart</option>
+          ))}
         </select>
       </div>
-      
+
       <div className="h-64 bg-gray-100 rounded flex items-center justify-center">
-        {chartType === 'bar' && (
-          <div className="flex items-end h-48 space-x-4 px-8">
-            <div className="flex flex-col items-center">
-              <div className="w-12 bg-indigo-500 rounded-t h-32"></div>
-              <span className="text-xs mt-1">Reels</span>
-            </div>
-            <div className="flex flex-col items-center">
-              <div className="w-12 bg-indigo-400 rounded-t h-16"></div>
-              <span className="text-xs mt-1">Images</span>
-            </div>
-            <div className="flex flex-col items-center">
-              <div className="w-12 bg-indigo-300 rounded-t h-24"></div>
-              <span className="text-xs mt-1">Carousels</span>
-            </div>
-            <div className="flex flex-col items-center">
-              <div className="w-12 bg-indigo-200 rounded-t h-20"></div>
-              <span className="text-xs mt-1">Videos</span>
-            </div>
-          </div>
-        )}
-        
-        {chartType === 'line' && (
-          <div className="w-full h-48 px-4 relative">
-            <div className="absolute inset-0 flex items-center">
-              <svg className="w-full h-32" viewBox="0 0 400 100">
-                <path
-                  d="M 0,80 L 100,30 L 200,60 L 300,10 L 400,50"
-                  fill="none"
-                  stroke="rgb(79, 70, 229)"
-                  strokeWidth="3"
-                />
-              </svg>
-            </div>
-          </div>
-        )}
-        
-        {chartType === 'pie' && (
-          <div className="w-32 h-32 relative">
-            <svg viewBox="0 0 32 32">
-              <circle r="16" cx="16" cy="16" fill="rgb(79, 70, 229)" />
-              <circle r="16" cx="16" cy="16" fill="transparent" 
-                stroke="rgb(129, 140, 248)" strokeWidth="32" 
-                strokeDasharray="20 100" />
-              <circle r="16" cx="16" cy="16" fill="transparent" 
-                stroke="rgb(165, 180, 252)" strokeWidth="32" 
-                strokeDasharray="15 100" strokeDashoffset="-20" />
-              <circle r="16" cx="16" cy="16" fill="transparent" 
-                stroke="rgb(224, 231, 255)" strokeWidth="32" 
-                strokeDasharray="10 100" strokeDashoffset="-35" />
-            </svg>
-          </div>
-        )}
+        {isLoading && <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-indigo-600"></div>}
+        {!isLoading && !data && <span className="text-sm text-gray-500">Chart data unavailable</span>}
+        {!isLoading && data && (data.kind === 'heatmap' && view === 'heatmap' ? (
+          <Heatmap data={data} />
+        ) : view === 'line' ? (
+          <LineChart labels={labels} series={series} />
+        ) : view === 'pie' ? (
+          <PieChart labels={labels} series={series} />
+        ) : (
+          <BarChart labels={labels} series={series} />
+        ))}
       </div>
     </div>
   );
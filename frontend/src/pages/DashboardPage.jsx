@@ -8,6 +8,7 @@ const DashboardPage = () => {
   const [dateRange, setDateRange] = useState('30');
   const [metrics, setMetrics] = useState([]);
   const [recommendations, setRecommendations] = useState([]);
+  const [charts, setCharts] = useState({});
   const [isLoading, setIsLoading] = useState(true);
   const { isSignedIn } = useUser();
 
@@ -16,8 +17,12 @@ const DashboardPage = () => {
       if (isSignedIn) {
         setIsLoading(true);
         try {
-          // Fetch metrics summary
-          const metricsData = await analyticsService.getMetricsSummary();
+          // Summary, recommendations and chart data arrive in one response
+          const dashboard = await analyticsService.getDashboard(
+            { days: dateRange },
+            ['metrics_summary', 'recommendations', 'charts']
+          );
+          const metricsData = dashboard.metrics_summary;
           
           if (metricsData) {
             // Format metrics for display
@@ -36,13 +41,13 @@ const DashboardPage = () => {
               },
               { 
                 name: 'Best Post Type', 
-                value: metricsData.best_post_type, 
+                value: metricsData.best_post_type ?? 'No data', 
                 change: '', 
                 positive: true 
               },
               { 
                 name: 'Best Posting Time', 
-                value: metricsData.best_time_overall, 
+                value: metricsData.best_time_overall ?? 'No data', 
                 change: '', 
                 positive: true 
               },
@@ -51,11 +56,8 @@ const DashboardPage = () => {
             setMetrics(formattedMetrics);
           }
           
-          // Fetch recommendations
-          const recommendationsData = await analyticsService.getRecommendations();
-          if (recommendationsData) {
-            setRecommendations(recommendationsData);
-          }
+          setRecommendations(dashboard.recommendations || []);
+          setCharts(dashboard.charts || {});
         } catch (error) {
           console.error('Error loading dashboard data:', error);
         } finally {
@@ -122,13 +124,13 @@ const DashboardPage = () => {
             
             {/* Charts Section */}
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-6 mb-6">
-              <EngagementChart title="Engagement by Post Type" type="bar" />
-              <EngagementChart title="Engagement Trends" type="line" />
+              <EngagementChart title="Engagement by Post Type" chartType="engagement_by_post_type" data={charts.engagement_by_post_type} type="bar" />
+              <EngagementChart title="Engagement Trends" chartType="best_times" data={charts.best_times} type="line" />
             </div>
             
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
-              <EngagementChart title="Post Type Distribution" type="pie" />
-              <EngagementChart title="Best Posting Times" type="bar" />
+              <EngagementChart title="Post Type Distribution" chartType="post_type_distribution" data={charts.post_type_distribution} type="pie" />
+              <EngagementChart title="Best Posting Times" chartType="best_times" data={charts.best_times} type="heatmap" />
             </div>
             
             {/* Recommendations Section */}
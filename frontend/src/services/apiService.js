@@ -47,6 +47,64 @@ const chatService = {
     }
   },
   
+  // Stream a response from the RAG system, calling onToken for each chunk.
+  // Resolves with the full response text once the server sends the `done` event.
+  streamMessage: async (message, onToken, signal) => {
+    const userId = localStorage.getItem('user_id') || 'demo-user';
+
+    const response = await fetch(`${API_URL}/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Authorization: 'Bearer test-token',
+      },
+      credentials: 'include',
+      body: JSON.stringify({ message, user_id: userId }),
+      signal,
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error('Failed to send message. Please try again.');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let fullText = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Server-sent events are separated by a blank line
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+
+      for (const rawEvent of events) {
+        let eventType = 'message';
+        let data = '';
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event: ')) eventType = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (!data) continue;
+
+        const payload = JSON.parse(data);
+        if (eventType === 'error') {
+          throw new Error(payload.detail || 'Failed to send message. Please try again.');
+        }
+        if (eventType === 'done') {
+          return payload.response;
+        }
+        fullText += payload.token;
+        onToken(payload.token);
+      }
+    }
+
+    return fullText;
+  },
+  
   // Get chat history
   getChatHistory: async () => {
     try {
@@ -72,6 +130,19 @@ const analyticsService = {
     }
   },
   
+  // Load everything the dashboard shows in one request; `fields` picks sections,
+  // `filters` takes post_type, start_date, end_date or days
+  getDashboard: async (filters = {}, fields = null) => {
+    try {
+      const params = fields ? { ...filters, fields: fields.join(',') } : filters;
+      const response = await api.get('/dashboard', { params });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching dashboard:', error);
+      throw new Error('Failed to load dashboard data.');
+    }
+  },
+  
   // Get recommendations
   getRecommendations: async (postType = null) => {
     try {
@@ -96,6 +167,17 @@ const analyticsService = {
     }
   },
   
+  // Get the data behind a chart (bars, pie slices or a day x hour heatmap)
+  getChartData: async (chartType, params = {}) => {
+    try {
+      const response = await api.get(`/charts/${chartType}`, { params });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching chart data:', error);
+      return null;
+    }
+  },
+  
   // Get metrics summary
   getMetricsSummary: async () => {
     try {